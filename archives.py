@@ -0,0 +1,264 @@
+"""
+压缩包章节（CBZ/ZIP、CBT/TAR）
+
+压缩包作为虚拟目录出现在文件树和文件列表中，成员路径写成
+"压缩包路径/成员名"，例如 /漫画/第1话.cbz/001.jpg。
+
+成员列表来自 ZIP 的中央目录（TAR 没有中央目录，打开时顺序读取一次成员头），
+按压缩包缓存。读取页面时不解压到磁盘：未压缩的成员（ZIP 的 stored 条目、
+未压缩的 TAR）直接从内存映射中读取，压缩的成员从成员流中读取。
+
+open_image / stat / exists 对普通文件和压缩包成员都适用，页面缓存、预取和
+缩略图通过它们访问文件，不需要区分两者。压缩包中只读取图片，不支持视频。
+"""
+import io
+import mmap
+import os
+import struct
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict, namedtuple
+
+from PIL import Image
+
+ARCHIVE_EXTENSIONS = {'.cbz', '.zip', '.cbt', '.tar'}
+_ZIP_EXTENSIONS = {'.cbz', '.zip'}
+_OPEN_ARCHIVES = 8  # 同时保持打开的压缩包数量
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")  # ZIP 本地文件头
+
+MemberStat = namedtuple("MemberStat", ["st_size", "st_mtime", "st_mtime_ns"])
+
+
+def is_archive_name(name):
+    """文件名是否是支持的压缩包"""
+    return os.path.splitext(name)[1].lower() in ARCHIVE_EXTENSIONS
+
+
+def is_archive(path):
+    """路径是否是支持的压缩包文件"""
+    return is_archive_name(path) and os.path.isfile(path)
+
+
+def split_member_path(path):
+    """把成员路径拆成 (压缩包路径, 成员名)，不是压缩包成员时返回 (None, None)"""
+    lowered = path.lower()
+    if not any(ext + os.sep in lowered for ext in ARCHIVE_EXTENSIONS):
+        return None, None
+    start = 0
+    while True:
+        sep = path.find(os.sep, start)
+        if sep < 0:
+            return None, None
+        prefix = path[:sep]
+        if is_archive_name(prefix) and os.path.isfile(prefix):
+            return prefix, path[sep + 1:].replace(os.sep, "/")
+        start = sep + 1
+
+
+def open_image(path):
+    """打开图片（普通文件或压缩包成员），返回未解码的PIL图片"""
+    archive_path, member = split_member_path(path)
+    if archive_path is None:
+        return Image.open(path)
+    return Image.open(get_archive(archive_path).open(member))
+
+
+def stat(path):
+    """文件状态，压缩包成员的大小为成员大小，修改时间为压缩包的修改时间"""
+    archive_path, member = split_member_path(path)
+    if archive_path is None:
+        return os.stat(path)
+    return get_archive(archive_path).stat(member)
+
+
+def exists(path):
+    """文件（或压缩包成员）是否存在"""
+    archive_path, member = split_member_path(path)
+    if archive_path is None:
+        return os.path.exists(path)
+    try:
+        return member in get_archive(archive_path).members
+    except OSError:
+        return False
+
+
+class MemberEntry:
+    """压缩包成员，接口与 os.DirEntry 相同，可以直接参与目录扫描和排序"""
+
+    __slots__ = ("path", "name", "_stat")
+
+    def __init__(self, path, stat_result):
+        self.path = path
+        self.name = os.path.basename(path)
+        self._stat = stat_result
+
+    def stat(self):
+        return self._stat
+
+    def is_dir(self):
+        return False
+
+    def is_file(self):
+        return True
+
+
+def scan_archive(archive_path, image_extensions):
+    """列出压缩包中的图片成员（MemberEntry 列表，成员目录结构展开为一层）"""
+    archive = get_archive(archive_path)
+    entries = []
+    for member in archive.names:
+        if os.path.splitext(member)[1].lower() in image_extensions:
+            path = os.path.join(archive_path, member.replace("/", os.sep))
+            entries.append(MemberEntry(path, archive.stat(member)))
+    return entries
+
+
+# 打开的压缩包
+
+_archives = OrderedDict()  # 路径 -> _Archive
+_archives_lock = threading.Lock()
+
+
+def get_archive(path):
+    """获取打开的压缩包（按修改时间和大小检查是否需要重新打开）
+
+    淘汰的压缩包不主动关闭，其他线程可能还在读取，最后一个引用释放时自动关闭。
+    """
+    st = os.stat(path)
+    with _archives_lock:
+        archive = _archives.get(path)
+        if archive is not None and archive.is_current(st):
+            _archives.move_to_end(path)
+            return archive
+    # 打开和读取成员列表在锁外进行，不阻塞其他压缩包的读取
+    archive = _Archive(path, st)
+    with _archives_lock:
+        existing = _archives.get(path)
+        if existing is not None and existing.is_current(st):
+            return existing  # 其他线程同时打开了同一个压缩包
+        _archives[path] = archive
+        _archives.move_to_end(path)
+        while len(_archives) > _OPEN_ARCHIVES:
+            _archives.popitem(last=False)
+    return archive
+
+
+class _Archive:
+    """一个打开的压缩包，成员列表只读取一次"""
+
+    def __init__(self, path, st):
+        self.path = path
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self._member_stat_time = st.st_mtime
+        self._lock = threading.Lock()
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+            if os.path.splitext(path)[1].lower() in _ZIP_EXTENSIONS:
+                self._open_zip()
+            else:
+                self._open_tar()
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            self._file.close()
+            raise OSError(f"无法读取压缩包: {path}, {str(e)}") from e
+        except Exception:
+            self._file.close()
+            raise
+        self.names = list(self.members)
+
+    def _open_zip(self):
+        self._zip = zipfile.ZipFile(self._file)
+        self._tar = None
+        # 成员名 -> (ZipInfo, 数据偏移)，数据偏移只对未压缩的成员在第一次读取时计算
+        self.members = {
+            info.filename: [info, None] for info in self._zip.infolist() if not info.is_dir()
+        }
+
+    def _open_tar(self):
+        self._zip = None
+        try:
+            # 未压缩的 TAR：成员数据在文件中是连续的，可以直接映射
+            self._tar = tarfile.open(fileobj=self._file, mode="r:")
+            mapped = True
+        except tarfile.ReadError:
+            self._file.seek(0)
+            self._tar = tarfile.open(fileobj=self._file, mode="r:*")
+            mapped = False
+        self.members = {
+            info.name: [info, info.offset_data if mapped else None]
+            for info in self._tar.getmembers() if info.isfile()
+        }
+
+    def is_current(self, st):
+        return self.mtime_ns == st.st_mtime_ns and self.size == st.st_size
+
+    def stat(self, member):
+        info = self.members[member][0]
+        size = info.file_size if self._zip is not None else info.size
+        return MemberStat(size, self._member_stat_time, self.mtime_ns)
+
+    def open(self, member):
+        """返回成员内容的只读文件对象"""
+        record = self.members[member]
+        info = record[0]
+        if self._zip is not None:
+            if info.compress_type == zipfile.ZIP_STORED and self._map is not None:
+                if record[1] is None:
+                    record[1] = self._zip_data_offset(info)
+                return _MappedMember(self._map, record[1], info.file_size)
+            with self._lock:
+                return io.BytesIO(self._zip.read(info))
+        if record[1] is not None and self._map is not None:
+            return _MappedMember(self._map, record[1], info.size)
+        with self._lock:
+            return io.BytesIO(self._tar.extractfile(info).read())
+
+    def _zip_data_offset(self, info):
+        """从本地文件头计算成员数据的偏移（文件名和扩展字段长度可能与中央目录不同）"""
+        header = _LOCAL_HEADER.unpack_from(self._map, info.header_offset)
+        if header[0] != b"PK\x03\x04":
+            raise zipfile.BadZipFile(f"本地文件头损坏: {info.filename}")
+        name_length, extra_length = header[9], header[10]
+        return info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+
+
+class _MappedMember(io.RawIOBase):
+    """内存映射中一个未压缩成员的只读文件对象（不复制数据）"""
+
+    def __init__(self, mapping, offset, size):
+        super().__init__()
+        self._view = memoryview(mapping)[offset:offset + size]
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), len(self._view) - self._pos)
+        if count <= 0:
+            return 0
+        buffer[:count] = self._view[self._pos:self._pos + count]
+        self._pos += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(offset, 0)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
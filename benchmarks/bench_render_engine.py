@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染引擎基准测试（不需要显示器）
+
+生成一个JPEG章节（默认60页），在指定视口下比较：
+1. 翻页模式：快速预览（render_fast）和最终质量（render）的每页耗时
+2. 全屏模式：按屏幕尺寸等比缩放的每页耗时
+3. 连续模式：整章渲染，逐页和线程池并行
+
+用法: python benchmarks/bench_render_engine.py [--count 60] [--viewport 1280x900] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_thumbnails import make_chapter  # noqa: E402
+from page_cache import PageCache  # noqa: E402
+from render_engine import RenderEngine  # noqa: E402
+
+
+def run(name, func, items, workers=None):
+    start = time.perf_counter()
+    if workers:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(func, items))
+    else:
+        for item in items:
+            func(item)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {elapsed:8.2f} s  {elapsed / len(items) * 1000:8.1f} ms/页")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="渲染引擎基准测试")
+    parser.add_argument("--count", type=int, default=60)
+    parser.add_argument("--width", type=int, default=2000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--viewport", default="1280x900")
+    parser.add_argument("--screen", default="1920x1080")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    viewport = tuple(int(value) for value in args.viewport.split("x"))
+    screen = tuple(int(value) for value in args.screen.split("x"))
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"生成 {args.count} 张 {args.width}x{args.height} JPEG ...")
+        paths = make_chapter(directory, args.count, args.width, args.height)
+
+        # 每项使用新的缓存，互不命中
+        engine = RenderEngine(PageCache(budget_mb=64))
+
+        def preview(path):
+            engine.render_fast(path, engine.plan_page(path, viewport, "fit").size)
+
+        run("翻页 快速预览", preview, paths)
+        run("翻页 最终质量", lambda path: engine.render(path, engine.plan_page(path, viewport, "fit").size), paths)
+
+        engine = RenderEngine(PageCache(budget_mb=64))
+        run("全屏 最终质量", lambda path: engine.render(path, engine.plan_fullscreen(path, screen).size), paths)
+
+        layout = RenderEngine.continuous_layout(paths, viewport[0])
+
+        def continuous(i):
+            placement = RenderEngine.continuous_placement(layout, i)
+            engine.render(paths[i], (placement.width, placement.height), keep_original=False)
+
+        for workers in (None, args.workers):
+            engine = RenderEngine(PageCache(budget_mb=64))
+            name = f"连续 线程池({workers})" if workers else "连续 逐页"
+            run(name, continuous, range(len(paths)), workers)
+
+
+if __name__ == "__main__":
+    main()
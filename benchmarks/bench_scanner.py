@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录扫描基准测试
+
+生成一个包含大量条目（默认10万）的合成目录，比较旧的
+listdir + isfile + Path.suffix + getmtime 排序方式与 scan_directory。
+
+用法: python benchmarks/bench_scanner.py [--count 100000] [--no-digit-ratio 0.1] [--dir 路径]
+      指定 --dir 可以在网络共享等实际存储上测试（会在其中创建测试文件）。
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_scanner import scan_directory  # noqa: E402
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff', '.tif'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv'}
+
+
+def make_directory(directory, count, no_digit_ratio):
+    """生成图片、视频、其他文件和子目录混合的目录"""
+    no_digit_every = max(int(1 / no_digit_ratio), 1) if no_digit_ratio > 0 else 0
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for i in range(count):
+        if i % 100 == 99:
+            os.mkdir(os.path.join(directory, f"sub_{i}"))
+            continue
+        if no_digit_every and i % no_digit_every == 0:
+            stem = "page_" + "".join(letters[int(c)] for c in str(i))
+        else:
+            stem = f"page_{i}"
+        ext = (".jpg", ".png", ".txt", ".mp4")[i % 4]
+        open(os.path.join(directory, stem + ext), "wb").close()
+
+
+def old_smart_sort_key(filepath):
+    filename = os.path.basename(filepath)
+    numbers = re.findall(r'\d+', filename)
+    if numbers:
+        try:
+            return (0, int(numbers[0]), filename)
+        except ValueError:
+            pass
+    try:
+        mtime = os.path.getmtime(filepath)
+        return (1, mtime, filename)
+    except OSError:
+        return (2, 0, filename)
+
+
+def old_scan(directory):
+    """旧的 load_files_from_directory 实现"""
+    image_files = []
+    video_files = []
+    for file in os.listdir(directory):
+        file_path = os.path.join(directory, file)
+        if os.path.isfile(file_path):
+            ext = Path(file).suffix.lower()
+            if ext in IMAGE_EXTENSIONS:
+                image_files.append(file_path)
+            elif ext in VIDEO_EXTENSIONS:
+                video_files.append(file_path)
+    image_files.sort(key=old_smart_sort_key)
+    video_files.sort(key=old_smart_sort_key)
+    return image_files, video_files
+
+
+def new_scan(directory):
+    scan = scan_directory(directory, IMAGE_EXTENSIONS, VIDEO_EXTENSIONS)
+    return scan.images, scan.videos
+
+
+def best_of(func, directory, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(directory)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="目录扫描基准测试")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--no-digit-ratio", type=float, default=0.1, help="文件名不含数字的比例（需要按修改时间排序）")
+    parser.add_argument("--dir", help="在指定位置创建测试目录")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="scan_bench_", dir=args.dir)
+    try:
+        print(f"生成 {args.count} 个条目 ...")
+        make_directory(directory, args.count, args.no_digit_ratio)
+
+        old_time, old_result = best_of(old_scan, directory, args.repeat)
+        new_time, new_result = best_of(new_scan, directory, args.repeat)
+        # 排序规则已改为自然排序，与旧实现只比较文件集合
+        assert [sorted(files) for files in old_result] == [sorted(files) for files in new_result], "扫描结果不一致"
+
+        print(f"旧实现 listdir + isfile + getmtime : {old_time:8.3f} s")
+        print(f"scan_directory                   : {new_time:8.3f} s")
+        print(f"加速: {old_time / new_time:.1f}x  （图片 {len(new_result[0])}，视频 {len(new_result[1])}）")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排序键基准测试
+
+生成大量（默认100万）合成文件名和目录名，比较旧的排序键
+（每次调用 re.findall / re.search + strptime，只按第一个数字排序）
+与 sort_keys 中按名称缓存的自然排序键和日期键。
+新的排序键分别测试首次计算（缓存为空）和缓存命中（再次排序同一批名称）。
+
+文件名都含数字，不会触发按修改时间排序，测试不访问文件系统。
+
+用法: python benchmarks/bench_sort_keys.py [--count 1000000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sort_keys import date_key, file_sort_key, name_sort_key  # noqa: E402
+
+
+def make_file_names(count):
+    """vol/ch/页码组合的文件名，顺序打乱"""
+    names = []
+    for i in range(count):
+        volume, rest = divmod(i, 10000)
+        chapter, page = divmod(rest, 100)
+        pattern = i % 3
+        if pattern == 0:
+            names.append(f"vol{volume}_ch{chapter}_p{page}.jpg")
+        elif pattern == 1:
+            names.append(f"Vol{volume:02d} Ch{chapter} - {page:03d}.png")
+        else:
+            names.append(f"{volume}-{chapter}-{page}.webp")
+    random.shuffle(names)
+    return names
+
+
+def make_dir_names(count):
+    """大部分带 yyyy-mm-dd 日期的章节目录名，少部分没有日期"""
+    names = []
+    for i in range(count):
+        if i % 10 == 0:
+            names.append(f"番外 {i}")
+        else:
+            day = i % 3650
+            names.append(f"{2015 + day // 365}-{day % 365 // 31 + 1:02d}-{day % 28 + 1:02d} 第{i}话")
+    random.shuffle(names)
+    return names
+
+
+def old_file_key(name):
+    numbers = re.findall(r'\d+', name)
+    if numbers:
+        return (0, int(numbers[0]), name)
+    return (2, 0, name)
+
+
+def old_date_key(name):
+    match = re.search(r'(\d{4}-\d{2}-\d{2})', name)
+    if match:
+        try:
+            return datetime.strptime(match.group(1), '%Y-%m-%d')
+        except ValueError:
+            pass
+    return datetime.min
+
+
+def timed_sort(names, key):
+    start = time.perf_counter()
+    result = sorted(names, key=key)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="排序键基准测试")
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    # 自然排序的正确性
+    sample = sorted(["vol2_ch10.jpg", "vol1_ch3.jpg", "vol1_ch12.jpg", "Vol1_ch4.jpg"], key=file_sort_key)
+    assert sample == ["vol1_ch3.jpg", "Vol1_ch4.jpg", "vol1_ch12.jpg", "vol2_ch10.jpg"], sample
+
+    print(f"生成 {args.count} 个文件名和目录名 ...")
+    file_names = make_file_names(args.count)
+    dir_names = make_dir_names(args.count)
+
+    old_time, _ = timed_sort(file_names, old_file_key)
+    name_sort_key.cache_clear()
+    cold_time, _ = timed_sort(file_names, file_sort_key)
+    warm_time, _ = timed_sort(file_names, file_sort_key)
+    print("文件名")
+    print(f"  旧排序键（只比较第一个数字）: {old_time:8.3f} s")
+    print(f"  自然排序键（首次）          : {cold_time:8.3f} s")
+    print(f"  自然排序键（缓存命中）      : {warm_time:8.3f} s")
+
+    old_time, old_result = timed_sort(dir_names, old_date_key)
+    date_key.cache_clear()
+    cold_time, _ = timed_sort(dir_names, date_key)
+    warm_time, new_result = timed_sort(dir_names, date_key)
+    assert old_result == new_result, "目录排序结果不一致"
+    print("目录名")
+    print(f"  re.search + strptime        : {old_time:8.3f} s")
+    print(f"  日期键（首次）              : {cold_time:8.3f} s")
+    print(f"  日期键（缓存命中）          : {warm_time:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缩略图生成基准测试
+
+生成一个JPEG章节（默认300页），比较：
+1. 完整解码后缩放（旧代码在图片已加载时的行为）
+2. 旧代码：Image.open + thumbnail，逐张执行
+3. 快速解码 open_reduced，逐张执行
+4. 快速解码 open_reduced，线程池并行（缩略图列表实际使用的方式）
+
+用法: python benchmarks/bench_thumbnails.py [--count 300] [--width 2000] [--height 3000] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from image_decode import open_reduced  # noqa: E402
+
+THUMB = (120, 120)
+
+
+def make_chapter(directory, count, width, height):
+    """生成测试用的JPEG页面"""
+    base = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(base)
+    for y in range(0, height, 40):
+        draw.line((0, y, width, y + 200), fill=(y % 255, 80, 160), width=6)
+    for x in range(0, width, 120):
+        draw.rectangle((x, x, x + 80, x + 300), outline="black", width=4)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"{i+1:04d}.jpg")
+        base.save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def full_decode(path):
+    img = Image.open(path)
+    img.load()
+    img.thumbnail(THUMB, Image.Resampling.LANCZOS)
+    return img
+
+
+def old_thumbnail(path):
+    img = Image.open(path)
+    img.thumbnail(THUMB, Image.Resampling.LANCZOS)
+    return img
+
+
+def fast_thumbnail(path):
+    return open_reduced(path, THUMB)
+
+
+def run(name, func, paths, workers=None):
+    start = time.perf_counter()
+    if workers:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(func, paths))
+    else:
+        for path in paths:
+            func(path)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {elapsed:8.2f} s  {elapsed / len(paths) * 1000:8.1f} ms/页")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缩略图生成基准测试")
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--width", type=int, default=2000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"生成 {args.count} 张 {args.width}x{args.height} JPEG ...")
+        paths = make_chapter(directory, args.count, args.width, args.height)
+
+        baseline = run("完整解码 + thumbnail", full_decode, paths)
+        old = run("旧代码 open + thumbnail", old_thumbnail, paths)
+        fast = run("open_reduced 逐张", fast_thumbnail, paths)
+        pooled = run(f"open_reduced 线程池({args.workers})", fast_thumbnail, paths, args.workers)
+
+        print()
+        print(f"相对完整解码: 逐张 {baseline / fast:.1f}x, 线程池 {baseline / pooled:.1f}x")
+        print(f"相对旧代码:   逐张 {old / fast:.1f}x, 线程池 {old / pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
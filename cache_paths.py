@@ -0,0 +1,26 @@
+"""
+本地缓存目录
+
+缩略图库、索引等持久化缓存统一放在用户缓存目录下，不写入漫画目录。
+"""
+import hashlib
+import os
+
+
+def cache_dir(*parts):
+    """返回（并创建）缓存目录下的子目录"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        root = os.path.join(base, "MangaReader")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        root = os.path.join(base, "MangaReader")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def library_key(directory):
+    """根据目录路径生成缓存文件名"""
+    normalized = os.path.normcase(os.path.abspath(directory))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
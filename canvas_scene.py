@@ -0,0 +1,101 @@
+"""
+保留模式的画布场景
+
+显示区域的画布项目按键保存（例如 "page"、("page", 序号)），重新绘制时
+同一个键的项目只修改发生变化的坐标和选项，不再 delete("all") 后全部重建。
+键是元组时第一个元素是图层名，切换显示内容时只保留需要的图层。
+
+场景统计创建、删除和修改的项目数，用于衡量每次翻页对画布的改动。
+"""
+
+_MISSING = object()
+
+
+def layer_of(key):
+    """键所属的图层"""
+    return key[0] if isinstance(key, tuple) else key
+
+
+class CanvasScene:
+    """按键管理一个画布上的项目，只提交变化的部分"""
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self._items = {}  # 键 -> [项目ID, 类型, 坐标, 选项]
+        self.created = 0
+        self.deleted = 0
+        self.updated = 0
+
+    def image(self, key, x, y, **options):
+        return self._put(key, "image", (x, y), options)
+
+    def text(self, key, x, y, **options):
+        return self._put(key, "text", (x, y), options)
+
+    def line(self, key, *coords, **options):
+        return self._put(key, "line", coords, options)
+
+    def rectangle(self, key, *coords, **options):
+        return self._put(key, "rectangle", coords, options)
+
+    def polygon(self, key, *coords, **options):
+        return self._put(key, "polygon", coords, options)
+
+    def _put(self, key, kind, coords, options):
+        """创建项目，或者只修改已有项目变化的坐标和选项，返回项目ID"""
+        record = self._items.get(key)
+        if record is not None and record[1] != kind:
+            self.remove(key)
+            record = None
+        if record is None:
+            item = getattr(self.canvas, "create_" + kind)(*coords, **options)
+            self._items[key] = [item, kind, coords, dict(options)]
+            self.created += 1
+            return item
+
+        item, _, old_coords, old_options = record
+        changed = False
+        if coords != old_coords:
+            self.canvas.coords(item, *coords)
+            record[2] = coords
+            changed = True
+        # 位图对象按身份比较（PhotoImage 没有定义相等）
+        diff = {name: value for name, value in options.items()
+                if old_options.get(name, _MISSING) is not value and old_options.get(name, _MISSING) != value}
+        if diff:
+            self.canvas.itemconfigure(item, **diff)
+            old_options.update(diff)
+            changed = True
+        if changed:
+            self.updated += 1
+        return item
+
+    def get(self, key):
+        """键对应的项目ID，不存在时返回None"""
+        record = self._items.get(key)
+        return record[0] if record is not None else None
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def remove(self, *keys):
+        """删除键对应的项目（不存在的键忽略）"""
+        for key in keys:
+            record = self._items.pop(key, None)
+            if record is not None:
+                self.canvas.delete(record[0])
+                self.deleted += 1
+
+    def keep_layers(self, *layers):
+        """删除不属于指定图层的所有项目"""
+        self.remove(*[key for key in self._items if layer_of(key) not in layers])
+
+    def clear(self):
+        """删除所有项目"""
+        self.remove(*list(self._items))
+
+    def take_counts(self):
+        """返回上次调用以来 (创建数, 删除数, 修改数) 并清零"""
+        counts = (self.created, self.deleted, self.updated)
+        self.created = self.deleted = self.updated = 0
+        return counts
@@ -0,0 +1,323 @@
+"""
+目录变化监视
+
+Linux 上使用 inotify（通过 ctypes 调用，无需额外依赖），其他平台或
+inotify 不可用时退回到定时轮询。短时间内的大量变化（例如复制500个文件）
+会合并成一次变化通知，在界面线程中回调。
+
+监视开始时记录目录快照（名称、修改时间、大小），手动刷新（rescan）时与
+当前快照比较，得到与自动通知相同的增量变化。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# inotify 事件掩码
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE
+              | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class DirectoryDelta:
+    """合并后的一次目录变化"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.added = set()  # 新增的文件/目录路径
+        self.removed = set()  # 删除的路径
+        self.modified = set()  # 内容变化的文件路径
+        self.renamed = {}  # 旧路径 -> 新路径
+        self.dirs = set()  # 以上路径中属于目录的
+        self.overflow = False  # 事件丢失，需要完整重新加载
+        self.gone = False  # 被监视的目录本身被删除或移走
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified or self.renamed
+                    or self.overflow or self.gone)
+
+    def add(self, path, is_dir=False):
+        if path in self.removed:
+            # 删除后又创建，视为修改
+            self.removed.discard(path)
+            self.modified.add(path)
+        else:
+            self.added.add(path)
+        if is_dir:
+            self.dirs.add(path)
+
+    def remove(self, path, is_dir=False):
+        if path in self.added:
+            # 创建后又删除，相互抵消
+            self.added.discard(path)
+            self.modified.discard(path)
+            return
+        self.modified.discard(path)
+        self.removed.add(path)
+        if is_dir:
+            self.dirs.add(path)
+
+    def modify(self, path):
+        if path not in self.added:
+            self.modified.add(path)
+
+    def rename(self, old_path, new_path, is_dir=False):
+        if old_path in self.added:
+            self.added.discard(old_path)
+            self.add(new_path, is_dir)
+            return
+        self.renamed[old_path] = new_path
+        if is_dir:
+            self.dirs.update((old_path, new_path))
+
+
+class DirectoryWatcher:
+    """监视一个目录（不递归）的变化"""
+
+    def __init__(self, root, directory, on_change, quiet_ms=400, max_delay_ms=2000, poll_interval=2.0):
+        """
+        on_change(delta) 在界面线程中调用。变化停止 quiet_ms 毫秒后发出通知，
+        持续变化时最迟 max_delay_ms 毫秒通知一次。
+        """
+        self.root = root
+        self.directory = directory
+        self.on_change = on_change
+        self.quiet = quiet_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.poll_interval = poll_interval
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._delta = DirectoryDelta(directory)
+        self._first_event = None
+        self._last_event = None
+        self._baseline = None  # 上次比较时的目录快照
+
+        self._inotify = _Inotify.create(directory)
+        self.backend = "inotify" if self._inotify is not None else "polling"
+        target = self._run_inotify if self._inotify is not None else self._run_polling
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._inotify is not None:
+            self._inotify.wake()
+
+    def rescan(self):
+        """手动刷新：在后台比较目录快照，立即发出通知（没有变化时也通知一次空变化）
+
+        inotify 已经通知过的变化可能再次出现在结果中，增量更新对重复的变化不敏感。
+        """
+        threading.Thread(target=self._rescan, daemon=True).start()
+
+    def _rescan(self):
+        current = self._snapshot()
+        with self._lock:
+            previous, self._baseline = self._baseline, current
+        if current is None:
+            self._record(lambda d: setattr(d, "gone", True))
+        elif previous is not None:
+            self._record(lambda d: _diff_snapshots(d, previous, current))
+        self._flush_if_due(force=True)
+
+    # 事件合并
+
+    def _record(self, update):
+        with self._lock:
+            update(self._delta)
+            now = time.monotonic()
+            if self._first_event is None:
+                self._first_event = now
+            self._last_event = now
+
+    def _flush_if_due(self, force=False):
+        """变化已经安静下来（或等待太久）时发出通知，force 为True时立即通知"""
+        with self._lock:
+            if self._first_event is None and not force:
+                return
+            now = time.monotonic()
+            if not force and now - self._last_event < self.quiet and now - self._first_event < self.max_delay:
+                return
+            delta = self._delta
+            self._delta = DirectoryDelta(self.directory)
+            self._first_event = self._last_event = None
+        if (delta or force) and not self._stop.is_set():
+            try:
+                self.root.after(0, self._deliver, delta)
+            except RuntimeError:
+                # 主窗口已关闭
+                self._stop.set()
+
+    def _deliver(self, delta):
+        if not self._stop.is_set():
+            self.on_change(delta)
+
+    # inotify 后端
+
+    def _run_inotify(self):
+        inotify = self._inotify
+        with self._lock:
+            if self._baseline is None:
+                self._baseline = self._snapshot()
+        moved_from = {}  # cookie -> (路径, 是否目录)
+        try:
+            while not self._stop.is_set():
+                timeout = self.quiet / 2 if self._first_event is not None else None
+                events = inotify.read(timeout)
+                for mask, cookie, name in events:
+                    path = os.path.join(self.directory, name) if name else self.directory
+                    is_dir = bool(mask & IN_ISDIR)
+                    if mask & IN_Q_OVERFLOW:
+                        self._record(lambda d: setattr(d, "overflow", True))
+                    elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        self._record(lambda d: setattr(d, "gone", True))
+                    elif mask & IN_CREATE:
+                        self._record(lambda d, p=path, i=is_dir: d.add(p, i))
+                    elif mask & IN_DELETE:
+                        self._record(lambda d, p=path, i=is_dir: d.remove(p, i))
+                    elif mask & IN_MOVED_FROM:
+                        moved_from[cookie] = (path, is_dir)
+                    elif mask & IN_MOVED_TO:
+                        source = moved_from.pop(cookie, None)
+                        if source is not None:
+                            # 目录内重命名
+                            self._record(lambda d, s=source, p=path, i=is_dir: d.rename(s[0], p, i))
+                        else:
+                            self._record(lambda d, p=path, i=is_dir: d.add(p, i))
+                    elif mask & (IN_CLOSE_WRITE | IN_ATTRIB) and not is_dir:
+                        self._record(lambda d, p=path: d.modify(p))
+                # 同一批事件中没有配对的 MOVED_FROM 是移出了目录，按删除处理
+                for path, is_dir in moved_from.values():
+                    self._record(lambda d, p=path, i=is_dir: d.remove(p, i))
+                moved_from.clear()
+                self._flush_if_due()
+        finally:
+            inotify.close()
+
+    # 轮询后端
+
+    def _snapshot(self):
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    try:
+                        stat = entry.stat()
+                        snapshot[entry.path] = (entry.is_dir(), stat.st_mtime_ns, stat.st_size)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return snapshot
+
+    def _run_polling(self):
+        with self._lock:
+            if self._baseline is None:
+                self._baseline = self._snapshot()
+        while not self._stop.wait(min(self.poll_interval, self.quiet) if self._first_event else self.poll_interval):
+            current = self._snapshot()
+            with self._lock:
+                previous, self._baseline = self._baseline, current
+            if current is None:
+                if previous is not None:
+                    self._record(lambda d: setattr(d, "gone", True))
+                self._flush_if_due()
+                continue
+            if previous is not None and current != previous:
+                self._record(lambda d, previous=previous, current=current: _diff_snapshots(d, previous, current))
+            self._flush_if_due()
+
+
+def _diff_snapshots(delta, previous, current):
+    """把两次目录快照之间的差别记录到 delta"""
+    for path, info in current.items():
+        old = previous.get(path)
+        if old is None:
+            delta.add(path, info[0])
+        elif old != info and not info[0]:
+            delta.modify(path)
+    for path, info in previous.items():
+        if path not in current:
+            delta.remove(path, info[0])
+
+
+class _Inotify:
+    """inotify 文件描述符的简单封装"""
+
+    _libc = None
+
+    def __init__(self, fd, wake_r, wake_w):
+        self.fd = fd
+        self._wake_r = wake_r
+        self._wake_w = wake_w
+
+    @classmethod
+    def create(cls, directory):
+        """创建并开始监视，不支持时返回None"""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            if cls._libc is None:
+                cls._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc = cls._libc
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                os.close(fd)
+                return None
+        except (OSError, AttributeError):
+            return None
+        wake_r, wake_w = os.pipe()
+        return cls(fd, wake_r, wake_w)
+
+    def read(self, timeout):
+        """等待并读取事件，返回 [(mask, cookie, name)]"""
+        ready, _, _ = select.select([self.fd, self._wake_r], [], [], timeout)
+        if self.fd not in ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            events.append((mask, cookie, os.fsdecode(name)))
+        return events
+
+    def wake(self):
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+
+    def close(self):
+        for fd in (self.fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
@@ -0,0 +1,256 @@
+"""
+基于 os.scandir 的目录扫描
+
+一次遍历完成分类、过滤和排序：文件类型和扩展名直接从 DirEntry 获取，
+排序需要的修改时间使用 DirEntry 缓存的 stat 结果，不再逐个调用
+os.path.isfile / os.path.getmtime。
+"""
+import heapq
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from archives import is_archive, is_archive_name, scan_archive
+from sort_keys import file_sort_key, name_sort_key
+
+
+class DirectoryScan:
+    """单个目录的扫描结果"""
+
+    __slots__ = ("path", "images", "videos", "subdirs")
+
+    def __init__(self, path, images, videos, subdirs):
+        self.path = path
+        self.images = images  # 已排序的图片路径
+        self.videos = videos  # 已排序的视频路径
+        self.subdirs = subdirs  # 子目录路径（scandir 顺序）
+
+
+def smart_sort_key(entry):
+    """智能排序键：名称含数字时自然排序，否则按修改时间排序（使用 DirEntry 缓存的 stat 结果）"""
+    return file_sort_key(entry.name, lambda: entry.stat().st_mtime)
+
+
+def path_sort_key(path, mtime=None):
+    """与 smart_sort_key 相同的排序键，用于只有路径的情况（例如目录变化通知）
+
+    已知修改时间时通过 mtime 传入，否则在需要时调用 os.stat。
+    """
+    if mtime is not None:
+        return file_sort_key(os.path.basename(path), lambda: mtime)
+    return file_sort_key(os.path.basename(path), lambda: os.stat(path).st_mtime)
+
+
+def insert_sorted(paths, new_paths, mtimes=None):
+    """把新路径插入已按 path_sort_key 排序的列表
+
+    二分查找插入位置，不重新排序整个列表。每个路径的排序键最多计算一次：
+    名称含数字时不需要修改时间；名称不含数字时使用 mtimes（{路径: 修改时间}，
+    例如调用方刚取得的 stat 结果），没有记录时才调用 os.stat。名称含数字的
+    新路径总是排在名称不含数字的路径之前，与这些路径比较时不需要它们的修改时间。
+    """
+    mtimes = mtimes or {}
+    keys = {}
+
+    def key_of(path):
+        key = keys.get(path)
+        if key is None:
+            key = keys[path] = path_sort_key(path, mtimes.get(path))
+        return key
+
+    for path in sorted(new_paths, key=key_of):
+        key = key_of(path)
+        low, high = 0, len(paths)
+        while low < high:
+            middle = (low + high) // 2
+            probe = paths[middle]
+            if key[0] == 0 and probe not in keys and name_sort_key(os.path.basename(probe)) is None:
+                high = middle
+            elif key_of(probe) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        paths.insert(low, path)
+
+
+def first_visit(path, visited, st=None):
+    """遍历时记录目录的 (设备号, inode)，返回是否第一次到达（已到达过时跳过，避免循环链接）"""
+    if st is None:
+        st = os.stat(path)
+    identity = (st.st_dev, st.st_ino)
+    if identity in visited:
+        return False
+    visited.add(identity)
+    return True
+
+
+def scan_entries(directory, image_extensions, video_extensions):
+    """扫描一个目录，返回 (图片, 视频, 子目录) 三个 DirEntry 列表
+
+    图片和视频已按智能排序，子目录保持 scandir 顺序（包括指向目录的符号链接）。压缩包作为子目录返回；
+    directory 本身是压缩包时返回其中的图片成员（与 DirEntry 接口相同）。
+    """
+    if is_archive(directory):
+        images = scan_archive(directory, image_extensions)
+        images.sort(key=smart_sort_key)
+        return images, [], []
+
+    images = []
+    videos = []
+    subdirs = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    subdirs.append(entry)
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+
+            if is_archive_name(entry.name):
+                subdirs.append(entry)
+                continue
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext in image_extensions:
+                images.append(entry)
+            elif ext in video_extensions:
+                videos.append(entry)
+
+    images.sort(key=smart_sort_key)
+    videos.sort(key=smart_sort_key)
+    return images, videos, subdirs
+
+
+def scan_directory(directory, image_extensions, video_extensions):
+    """扫描一个目录，返回分类并排序后的结果"""
+    images, videos, subdirs = scan_entries(directory, image_extensions, video_extensions)
+    return DirectoryScan(
+        directory,
+        [entry.path for entry in images],
+        [entry.path for entry in videos],
+        [entry.path for entry in subdirs]
+    )
+
+
+def walk(directory, image_extensions, video_extensions):
+    """自顶向下遍历目录树（与 os.walk 顺序相同），每个目录只扫描一次
+
+    会进入指向目录的符号链接，但同一个目录只扫描一次，循环链接不会导致无限递归。
+    无法访问的目录会被跳过。
+    """
+    visited = set()
+    stack = [directory]
+    while stack:
+        path = stack.pop()
+        try:
+            if not first_visit(path, visited):
+                continue
+            scan = scan_directory(path, image_extensions, video_extensions)
+        except OSError:
+            continue
+        yield scan
+        stack.extend(reversed(scan.subdirs))
+
+
+def walk_by_date(directory, image_extensions, video_extensions, date_key, cancel=None):
+    """按路径日期顺序遍历目录树，边扫描边产出
+
+    产出顺序与「先序遍历后按路径日期稳定排序」相同：路径日期取路径中第一个
+    带日期的部分（date_key(名称) 返回 date_key("") 表示没有日期），子目录的
+    路径日期不早于父目录，所以按 (路径日期, 先序位置) 从堆中逐个取出即可，
+    日期最早的目录扫描完立即产出，不需要先遍历整棵树。
+    cancel() 返回True时停止。同一个目录（例如经由符号链接再次到达）只扫描一次，
+    无法访问的目录会被跳过。
+    """
+    no_date = date_key("")
+    root_date = no_date
+    for part in directory.split(os.sep):
+        root_date = date_key(part)
+        if root_date != no_date:
+            break
+
+    # (路径日期, 先序位置, 路径)，先序位置为从根开始每层的子目录序号
+    visited = set()
+    heap = [(root_date, (), directory)]
+    while heap:
+        if cancel is not None and cancel():
+            return
+        path_date, order, path = heapq.heappop(heap)
+        try:
+            if not first_visit(path, visited):
+                continue
+            scan = scan_directory(path, image_extensions, video_extensions)
+        except OSError:
+            continue
+        yield scan
+        for pos, subdir in enumerate(scan.subdirs):
+            child_date = path_date
+            if child_date == no_date:
+                child_date = date_key(os.path.basename(subdir))
+            heapq.heappush(heap, (child_date, order + (pos,), subdir))
+
+
+def walk_each(directories, image_extensions, video_extensions, workers=8, cancel=None):
+    """并行遍历多个目录树，按 directories 的顺序逐棵产出扫描结果列表
+
+    每棵树在线程池中用 walk 遍历（适合高延迟的网络盘），同时进行的
+    遍历数量受 workers 限制，已完成但还没轮到产出的结果最多保留 2*workers 棵。
+    cancel() 返回True时停止。
+    """
+    def walk_tree(directory):
+        scans = []
+        for scan in walk(directory, image_extensions, video_extensions):
+            if cancel is not None and cancel():
+                break
+            scans.append(scan)
+        return scans
+
+    pending = iter(directories)
+    window = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as executor:
+        try:
+            for directory in pending:
+                window.append(executor.submit(walk_tree, directory))
+                if len(window) >= 2 * workers:
+                    break
+            while window:
+                scans = window.popleft().result()
+                if cancel is not None and cancel():
+                    return
+                yield scans
+                for directory in pending:
+                    window.append(executor.submit(walk_tree, directory))
+                    break
+        finally:
+            for future in window:
+                future.cancel()
+
+
+def list_subdirs(directory):
+    """列出子目录路径（包括作为虚拟目录的压缩包）"""
+    subdirs = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                if entry.is_dir() or (is_archive_name(entry.name) and entry.is_file()):
+                    subdirs.append(entry.path)
+            except OSError:
+                continue
+    return subdirs
+
+
+def has_subdirs(directory):
+    """目录是否包含子目录或压缩包（找到第一个即返回）"""
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir() or (is_archive_name(entry.name) and entry.is_file()):
+                        return True
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return False
@@ -0,0 +1,66 @@
+"""
+小尺寸输出的快速解码
+
+JPEG 先用 draft 在DCT域按 1/2、1/4、1/8 缩小解码，
+其他格式用整数倍 reduce 快速缩小，最后再用高质量滤镜缩放到目标尺寸。
+用于缩略图和预览，不适合需要原始分辨率的场景。
+
+open_preview 生成翻页时先显示的低质量预览：DCT域直接缩小到接近目标尺寸，
+再用双线性缩放，高质量结果稍后替换它。
+"""
+from PIL import Image
+
+from archives import open_image
+
+REDUCING_GAP = 2  # 快速缩小后至少保留目标尺寸的倍数，保证最终滤镜质量
+
+
+def open_reduced(path, target_size, resample=Image.Resampling.LANCZOS, keep_aspect=True,
+                 reducing_gap=REDUCING_GAP):
+    """快速解码为目标尺寸的图片
+
+    keep_aspect 为 True 时等比缩放到不超过 target_size（同 thumbnail），
+    否则缩放到恰好 target_size。reducing_gap 越小解码越快，最终质量越低。
+    """
+    target_width, target_height = max(int(target_size[0]), 1), max(int(target_size[1]), 1)
+    with open_image(path) as source:
+        img = source
+        if keep_aspect:
+            scale = min(target_width / img.width, target_height / img.height, 1.0)
+            target_width = max(int(img.width * scale), 1)
+            target_height = max(int(img.height * scale), 1)
+
+        # JPEG：DCT域缩小解码，得到的尺寸不小于请求的尺寸
+        if img.format == "JPEG":
+            mode = "RGB" if img.mode in ("RGB", "CMYK", "YCbCr") else None
+            img.draft(mode, (target_width * reducing_gap, target_height * reducing_gap))
+
+        # 整数倍快速缩小
+        factor = min(img.width // (target_width * reducing_gap), img.height // (target_height * reducing_gap))
+        if img.mode not in ("RGB", "RGBA", "L", "LA"):
+            # 调色板等模式无法高质量缩放，先转换
+            img = img.convert("RGBA" if "transparency" in img.info or "A" in img.mode else "RGB")
+        if factor >= 2:
+            img = img.reduce(factor)
+
+        if img.size != (target_width, target_height):
+            img = img.resize((target_width, target_height), resample)
+        # 关闭文件前读出数据：仍是打开的原图时复制一份
+        return img.copy() if img is source else img
+
+
+def open_preview(path, target_size, fallback=None):
+    """快速生成恰好 target_size 的预览图片
+
+    JPEG 在DCT域缩小解码；其他格式无法缩小解码，fallback() 能提供一张小图
+    （例如已保存的缩略图）时直接放大它，否则完整解码后用双线性缩放。
+    """
+    size = (max(int(target_size[0]), 1), max(int(target_size[1]), 1))
+    if fallback is not None:
+        with open_image(path) as header:
+            is_jpeg = header.format == "JPEG"
+        if not is_jpeg:
+            small = fallback()
+            if small is not None:
+                return small.resize(size, Image.Resampling.BILINEAR)
+    return open_reduced(path, size, Image.Resampling.BILINEAR, keep_aspect=False, reducing_gap=1)
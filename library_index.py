@@ -0,0 +1,474 @@
+"""
+漫画库持久化索引
+
+每个根目录一个SQLite文件，记录目录、文件、大小、修改时间、媒体类型、
+目录日期、排序位置和图片尺寸。重新扫描是增量的：目录的修改时间和其中每个
+文件的大小、修改时间都没有变化时沿用记录的内容，不再列出该目录（原地修改
+文件不会改变目录的修改时间；压缩包的修改时间已经涵盖其成员；子目录仍会逐个
+检查，因为子目录内的变化不会反映到父目录的修改时间上）。
+
+重新打开后不等待完整扫描，上次的记录立即可用：查询前用 validate 校验要查询
+的目录，完整扫描在后台补齐其余变化；图片尺寸只在文件大小和修改时间未变时
+返回。
+
+文件树、递归查找和后续目录查找都可以直接查询索引完成。
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import archives
+from archives import is_archive, open_image
+from cache_paths import cache_dir, library_key
+from file_scanner import first_visit, scan_entries
+from sort_keys import SORT_VERSION
+
+MEDIA_IMAGE = "image"
+MEDIA_VIDEO = "video"
+
+
+def _subtree_bounds(directory):
+    """目录下所有后代路径的字符串范围（二进制排序下的前缀范围）"""
+    prefix = os.path.join(directory, "")
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class LibraryIndex:
+    """一个根目录的持久化索引"""
+
+    def __init__(self, root, image_extensions, video_extensions, date_key, db_path=None):
+        """
+        date_key(目录名) 返回目录名中的日期（datetime），用于目录排序。
+        """
+        self.root = os.path.normpath(root)
+        self.image_extensions = image_extensions
+        self.video_extensions = video_extensions
+        self.date_key = date_key
+        if db_path is None:
+            db_path = os.path.join(cache_dir("library"), library_key(root) + ".db")
+        self.db_path = db_path
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " path TEXT PRIMARY KEY,"
+            " parent TEXT,"
+            " mtime_ns INTEGER NOT NULL,"
+            " scan_pos INTEGER NOT NULL,"  # 在父目录中的 scandir 顺序
+            " date_key TEXT NOT NULL,"  # 目录名中的日期
+            " path_date TEXT NOT NULL,"  # 路径中第一个带日期的部分的日期
+            " has_subdirs INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);"
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " dir TEXT NOT NULL,"
+            " media TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " sort_rank INTEGER NOT NULL,"  # 目录内智能排序的位置
+            " width INTEGER,"
+            " height INTEGER);"
+            "CREATE INDEX IF NOT EXISTS files_dir ON files(dir, media, sort_rank);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        # 排序规则变化后所有目录都需要重新列出，按新规则记录 sort_rank
+        row = self._conn.execute("SELECT value FROM meta WHERE key='sort_version'").fetchone()
+        if row is None or row[0] != str(SORT_VERSION):
+            self._conn.execute("UPDATE dirs SET mtime_ns=-1")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('sort_version', ?)", (str(SORT_VERSION),)
+            )
+        self._conn.commit()
+
+    @classmethod
+    def for_library(cls, root, image_extensions, video_extensions, date_key):
+        """打开某个漫画库的索引"""
+        return cls(root, image_extensions, video_extensions, date_key)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # 扫描
+
+    def is_ready(self):
+        """是否已完成过至少一次完整扫描（可以是之前打开时完成的，查询前用 validate 校验）"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key='last_scan'").fetchone()
+        return row is not None
+
+    def covers(self, directory):
+        """目录是否在索引的根目录下"""
+        directory = os.path.normpath(directory)
+        return directory == self.root or directory.startswith(os.path.join(self.root, ""))
+
+    def _date_text(self, name):
+        return self.date_key(name).isoformat()
+
+    def rescan(self, cancel=None, progress=None):
+        """增量扫描整个根目录
+
+        cancel() 返回True时中止扫描；progress(已检查目录数, 已重新列出目录数) 定期调用。
+        返回是否完成。
+        """
+        with self._lock:
+            known = dict(self._conn.execute("SELECT path, mtime_ns FROM dirs"))
+
+        seen = set()
+        visited = set()  # (设备号, inode)，经由符号链接再次到达的目录不重复记录
+        checked = rescanned = 0
+        min_date = self._min_date()
+        # (路径, 父目录, 在父目录中的位置, 父目录的 path_date)
+        stack = [(self.root, None, 0, None)]
+        while stack:
+            if cancel is not None and cancel():
+                return False
+            path, parent, scan_pos, parent_path_date = stack.pop()
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not first_visit(path, visited, st):
+                continue
+            mtime_ns = st.st_mtime_ns
+            seen.add(path)
+            checked += 1
+
+            date_text = self._date_text(os.path.basename(path))
+            if parent is None:
+                path_date = self._path_date(path)
+            elif parent_path_date != min_date:
+                path_date = parent_path_date
+            else:
+                path_date = date_text
+
+            if known.get(path) == mtime_ns and not self._files_changed(path):
+                # 目录内容未变化，沿用记录的子目录
+                with self._lock:
+                    subdirs = [
+                        row[0] for row in self._conn.execute(
+                            "SELECT path FROM dirs WHERE parent=? ORDER BY scan_pos", (path,)
+                        )
+                    ]
+            else:
+                subdirs = self._rescan_directory(path, parent, scan_pos, mtime_ns, date_text, path_date)
+                if subdirs is None:
+                    continue
+                rescanned += 1
+
+            for pos in range(len(subdirs) - 1, -1, -1):
+                stack.append((subdirs[pos], path, pos, path_date))
+
+            if progress is not None and checked % 200 == 0:
+                progress(checked, rescanned)
+
+        # 删除已不存在的目录及其文件
+        removed = [(path,) for path in known if path not in seen]
+        with self._lock:
+            self._conn.executemany("DELETE FROM dirs WHERE path=?", removed)
+            self._conn.executemany("DELETE FROM files WHERE dir=?", removed)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan', ?)",
+                (str(int(time.time())),)
+            )
+            self._conn.commit()
+        if progress is not None:
+            progress(checked, rescanned)
+        return True
+
+    def _files_changed(self, directory):
+        """目录中记录的文件是否有大小或修改时间变化（或已不存在）"""
+        if is_archive(directory):
+            # 压缩包的修改时间已经涵盖其成员
+            return False
+        with self._lock:
+            rows = self._conn.execute("SELECT path, size, mtime_ns FROM files WHERE dir=?", (directory,)).fetchall()
+        for path, size, mtime_ns in rows:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return True
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                return True
+        return False
+
+    def validate(self, directory):
+        """查询前校验一个目录：修改时间或其中的文件有变化时立即重新列出
+
+        新出现的子目录也列出一层，文件树能正确显示它们是否有子目录；更深的
+        变化由后台的完整扫描补齐。目录不在索引中时不做任何事，返回是否更新。
+        """
+        directory = os.path.normpath(directory)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT parent, scan_pos, mtime_ns, path_date FROM dirs WHERE path=?", (directory,)
+            ).fetchone()
+        if row is None:
+            return False
+        parent, scan_pos, known_mtime, path_date = row
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return False
+        if mtime_ns == known_mtime and not self._files_changed(directory):
+            return False
+
+        subdirs = self._rescan_directory(
+            directory, parent, scan_pos, mtime_ns, self._date_text(os.path.basename(directory)), path_date
+        )
+        with self._lock:
+            new = {row[0] for row in self._conn.execute(
+                "SELECT path FROM dirs WHERE parent=? AND mtime_ns=-1", (directory,)
+            )}
+        min_date = self._min_date()
+        for pos, subdir in enumerate(subdirs or ()):
+            if subdir not in new:
+                continue
+            try:
+                subdir_mtime = os.stat(subdir).st_mtime_ns
+            except OSError:
+                continue
+            date_text = self._date_text(os.path.basename(subdir))
+            self._rescan_directory(subdir, directory, pos, subdir_mtime, date_text,
+                                   path_date if path_date != min_date else date_text)
+        return True
+
+    def refresh_directory(self, directory):
+        """目录内容变化后更新其记录（包括新出现或已变化的子目录）
+
+        目录不在索引中时不做任何事，返回是否更新。
+        """
+        directory = os.path.normpath(directory)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT parent, scan_pos, path_date FROM dirs WHERE path=?", (directory,)
+            ).fetchone()
+        if row is None:
+            return False
+
+        visited = set()
+        stack = [(directory, row[0], row[1], row[2])]
+        while stack:
+            path, parent, scan_pos, path_date = stack.pop()
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not first_visit(path, visited, st):
+                continue
+            mtime_ns = st.st_mtime_ns
+            with self._lock:
+                known = self._conn.execute("SELECT mtime_ns FROM dirs WHERE path=?", (path,)).fetchone()
+            if path != directory and known is not None and known[0] == mtime_ns and not self._files_changed(path):
+                continue
+            date_text = self._date_text(os.path.basename(path))
+            if path != directory and path_date == self._min_date():
+                path_date = date_text
+            subdirs = self._rescan_directory(path, parent, scan_pos, mtime_ns, date_text, path_date)
+            for pos, subdir in enumerate(subdirs or ()):
+                stack.append((subdir, path, pos, path_date))
+        return True
+
+    def _min_date(self):
+        return self.date_key("").isoformat()
+
+    def _path_date(self, path):
+        """路径中第一个带日期的部分的日期"""
+        min_date = self._min_date()
+        for part in path.split(os.sep):
+            date_text = self._date_text(part)
+            if date_text != min_date:
+                return date_text
+        return min_date
+
+    def _rescan_directory(self, path, parent, scan_pos, mtime_ns, date_text, path_date):
+        """重新列出一个目录，更新其文件和子目录记录，返回子目录列表"""
+        try:
+            images, videos, subdir_entries = scan_entries(path, self.image_extensions, self.video_extensions)
+        except OSError:
+            return None
+
+        rows = []
+        for media, entries in ((MEDIA_IMAGE, images), (MEDIA_VIDEO, videos)):
+            for rank, entry in enumerate(entries):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                rows.append((entry.path, path, media, stat.st_size, stat.st_mtime_ns, rank))
+        subdirs = [entry.path for entry in subdir_entries]
+
+        with self._lock:
+            # 保留未变化图片的尺寸
+            old_dims = {
+                row[0]: (row[1], row[2], row[3], row[4])
+                for row in self._conn.execute(
+                    "SELECT path, size, mtime_ns, width, height FROM files WHERE dir=?", (path,)
+                )
+            }
+            self._conn.execute("DELETE FROM files WHERE dir=?", (path,))
+            self._conn.executemany(
+                "INSERT INTO files (path, dir, media, size, mtime_ns, sort_rank, width, height)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [row + self._kept_dims(old_dims.get(row[0]), row[3], row[4]) for row in rows]
+            )
+
+            # 删除已消失的子目录（及其后代）
+            old_subdirs = [
+                row[0] for row in self._conn.execute("SELECT path FROM dirs WHERE parent=?", (path,))
+            ]
+            current = set(subdirs)
+            for old in old_subdirs:
+                if old not in current:
+                    self._delete_subtree(old)
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns, scan_pos, date_key, path_date, has_subdirs)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, parent, mtime_ns, scan_pos, date_text, path_date, 1 if subdirs else 0)
+            )
+            # 子目录的 mtime 记为 -1，保证接下来会被重新列出
+            for pos, subdir in enumerate(subdirs):
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO dirs (path, parent, mtime_ns, scan_pos, date_key, path_date, has_subdirs)"
+                    " VALUES (?, ?, -1, ?, ?, ?, 0)",
+                    (subdir, path, pos, self._date_text(os.path.basename(subdir)), path_date)
+                )
+                self._conn.execute("UPDATE dirs SET scan_pos=? WHERE path=?", (pos, subdir))
+            self._conn.commit()
+        return subdirs
+
+    @staticmethod
+    def _kept_dims(old, size, mtime_ns):
+        if old is not None and old[0] == size and old[1] == mtime_ns:
+            return (old[2], old[3])
+        return (None, None)
+
+    def _delete_subtree(self, directory):
+        low, high = _subtree_bounds(directory)
+        self._conn.execute("DELETE FROM files WHERE dir=? OR (dir>=? AND dir<?)", (directory, low, high))
+        self._conn.execute("DELETE FROM dirs WHERE path=? OR (path>=? AND path<?)", (directory, low, high))
+
+    def fill_dimensions(self, cancel=None, batch=500):
+        """后台补充图片尺寸（只读取文件头）"""
+        while True:
+            if cancel is not None and cancel():
+                return False
+            with self._lock:
+                paths = [
+                    row[0] for row in self._conn.execute(
+                        "SELECT path FROM files WHERE media=? AND width IS NULL LIMIT ?", (MEDIA_IMAGE, batch)
+                    )
+                ]
+            if not paths:
+                return True
+            updates = []
+            for path in paths:
+                try:
+                    with open_image(path) as img:
+                        width, height = img.size
+                except Exception:
+                    # 无法读取的图片记为0，避免反复尝试
+                    width, height = 0, 0
+                updates.append((width, height, path))
+            with self._lock:
+                self._conn.executemany("UPDATE files SET width=?, height=? WHERE path=?", updates)
+                self._conn.commit()
+
+    # 查询
+
+    def subdirs(self, directory):
+        """子目录列表（按日期排序），每项为 (路径, 是否有子目录)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, has_subdirs FROM dirs WHERE parent=? ORDER BY date_key, scan_pos",
+                (os.path.normpath(directory),)
+            ).fetchall()
+        return [(row[0], bool(row[1])) for row in rows]
+
+    def files(self, directory):
+        """目录内的 (图片列表, 视频列表)，已智能排序"""
+        images, videos = [], []
+        with self._lock:
+            for path, media in self._conn.execute(
+                "SELECT path, media FROM files WHERE dir=? ORDER BY media, sort_rank",
+                (os.path.normpath(directory),)
+            ):
+                (images if media == MEDIA_IMAGE else videos).append(path)
+        return images, videos
+
+    def recursive_files(self, directory):
+        """目录及所有子目录中的 (图片列表, 视频列表)
+
+        目录按路径日期排序（日期相同时保持遍历顺序），目录内按智能排序。
+        """
+        directory = os.path.normpath(directory)
+        low, high = _subtree_bounds(directory)
+        with self._lock:
+            dir_rows = self._conn.execute(
+                "SELECT path, parent, scan_pos, path_date FROM dirs WHERE path=? OR (path>=? AND path<?)",
+                (directory, low, high)
+            ).fetchall()
+            file_rows = self._conn.execute(
+                "SELECT dir, path, media FROM files WHERE dir=? OR (dir>=? AND dir<?)"
+                " ORDER BY dir, media, sort_rank",
+                (directory, low, high)
+            ).fetchall()
+
+        # 还原遍历顺序（先序），再按路径日期稳定排序
+        children = {}
+        path_dates = {}
+        for path, parent, scan_pos, path_date in dir_rows:
+            children.setdefault(parent, []).append((scan_pos, path))
+            path_dates[path] = path_date
+        order = []
+        stack = [directory] if directory in path_dates else []
+        while stack:
+            path = stack.pop()
+            order.append(path)
+            for _, child in sorted(children.get(path, ()), reverse=True):
+                stack.append(child)
+        order.sort(key=lambda path: path_dates[path])
+
+        by_dir = {}
+        for dir_path, path, media in file_rows:
+            lists = by_dir.setdefault(dir_path, ([], []))
+            lists[0 if media == MEDIA_IMAGE else 1].append(path)
+
+        images, videos = [], []
+        for path in order:
+            lists = by_dir.get(path)
+            if lists:
+                images.extend(lists[0])
+                videos.extend(lists[1])
+        return images, videos
+
+    def dimensions(self, paths):
+        """已知的图片尺寸 {路径: (宽, 高)}
+
+        只返回记录的大小和修改时间与文件当前状态一致的图片（文件被替换后
+        记录的尺寸已经失效）。
+        """
+        rows = []
+        with self._lock:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(self._conn.execute(
+                    "SELECT path, size, mtime_ns, width, height FROM files"
+                    f" WHERE width IS NOT NULL AND path IN ({placeholders})",
+                    chunk
+                ))
+        result = {}
+        for path, size, mtime_ns, width, height in rows:
+            try:
+                st = archives.stat(path)
+            except (OSError, KeyError):
+                continue
+            if (st.st_size, st.st_mtime_ns) == (size, mtime_ns):
+                result[path] = (width, height)
+        return result
@@ -1,17 +1,34 @@
 import os
+import stat
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 from PIL import Image, ImageTk
 import threading
 import time
-from pathlib import Path
-import re
-from datetime import datetime
-try:
-    import cv2
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
+import sqlite3
+from collections import OrderedDict
+from itertools import chain
+import archives
+from archives import is_archive, is_archive_name
+from canvas_scene import CanvasScene
+from dir_watcher import DirectoryWatcher
+from file_scanner import has_subdirs, insert_sorted, list_subdirs, scan_directory, walk_by_date, walk_each
+from library_index import LibraryIndex
+from page_bundle import PageBundle
+from page_cache import PageCache
+from page_layout import PageLayout
+from page_prefetcher import PagePrefetcher
+from poster_frames import PosterFrames
+from render_engine import PAGE_MARGIN, RenderEngine
+from slice_pyramid import SlicePyramid
+from sort_keys import date_key
+from thumbnail_store import THUMBNAIL_SIZE, ThumbnailStore
+from thumbnail_strip import ThumbnailStrip
+from tile_renderer import TileRenderer
+from video_index import VideoIndexes, format_time
+from video_player import CV2_AVAILABLE, VideoPlayer
+
+if not CV2_AVAILABLE:
     print("警告: OpenCV未安装，视频功能将受限")
 
 class EnhancedMangaReader:
@@ -27,8 +44,9 @@ class EnhancedMangaReader:
         self.video_files = []
         self.current_index = 0
         self.is_playing_video = False
-        self.video_cap = None
-        self.video_thread = None
+        self.video_player = None
+        self.video_photo = None
+        self._video_stats_time = 0
         self.is_fullscreen = False
         
         # 显示设置
@@ -41,7 +59,77 @@ class EnhancedMangaReader:
         
         # 缩放设置
         self.zoom_factor = 1.0
-        self.original_image = None
+        self.current_image_path = None
+        
+        # 页面缓存（翻页、连续、全屏模式共用），预算单位MB
+        self.page_cache = PageCache(budget_mb=512)
+        
+        # 尺寸计算、位置和缩放由无界面的渲染引擎完成，界面只负责放到画布上
+        # （放大后的页面超过画布面积 tile_threshold 倍时分块渲染）
+        self.render_engine = RenderEngine(self.page_cache, tile_threshold=4.0)
+        
+        # 翻页模式预取：阅读方向上预取的页数和反方向预取的页数
+        self.prefetcher = PagePrefetcher(self.root, self.page_cache, ahead=3, behind=1)
+        self.prepared_photos = OrderedDict()  # (路径, 尺寸) -> 已准备好的位图
+        self._pending_final = None  # 只显示了预览的当前页: (路径, 尺寸, 开始时间, 显示函数)
+        self._render_timing = None  # 当前页 (首帧毫秒, 最终质量毫秒)
+        
+        # 放大后的翻页模式分块渲染
+        self.tile_renderer = TileRenderer(self.root, self.page_cache)
+        self._tile_path = None
+        self._tile_grid = None  # 当前页的图块划分，未分块显示时为None
+        self._tile_origin = (0, 0)
+        self._tile_photos = {}  # 已显示的图块: (列, 行) -> photo
+        self._tile_wanted = set()
+        self._tile_render_pending = None
+        
+        # 持久化缩略图库（每个根目录一个文件），视频封面也保存在其中
+        self.thumbnail_store = None
+        self.poster_frames = PosterFrames(self.root, self._get_thumbnail_store)
+        
+        # 视频关键帧索引和拖动预览图（当前项目是视频时在后台读取或生成）
+        self.video_indexes = VideoIndexes(self.root)
+        self.seek_video_path = None  # 进度条对应的视频
+        self._seek_range = 0.0
+        self._seek_dragging = False
+        self._scrub_photo = None
+        
+        # 连续模式设置
+        self.continuous_margin = 1.0  # 可见区域上下额外预渲染的屏数
+        self.continuous_release = 3.0  # 超出可见区域多少屏后释放图片
+        self.continuous_items = {}  # 已渲染的图片: 序号 -> photo（画布项目在显示场景中）
+        self.page_layout = None  # 当前文件列表的页面布局表
+        self._scene_layout = None  # 已渲染页面所属的布局表
+        self._page_layouts = OrderedDict()
+        self._continuous_ready = False
+        self._relayout_pending = None
+        self._continuous_render_pending = None
+        
+        # 超长条漫按分片显示：序号 -> {分片序号: photo}，金字塔按路径保留最近几张
+        self.continuous_slices = {}
+        self.slice_pyramids = OrderedDict()
+        self._slicing = set()  # 正在打开或生成金字塔的路径
+        self._slice_failed = {}  # 生成金字塔失败的路径 -> 失败时的修改时间，文件变化前不再重试
+        
+        # 漫画库索引（每个根目录一个文件）
+        self.library_index = None
+        self._index_generation = 0
+        
+        # 文件树按需加载状态
+        self._tree_generation = 0
+        self._tree_loading = set()
+        
+        # 当前目录的变化监视（增量刷新）
+        self.dir_watcher = None
+        self._layout_size_hints = {}  # 增量刷新后沿用的图片尺寸 {路径: (宽, 高)}
+        
+        # 后台递归查找（切换目录时通过代数取消）
+        self._discovery_generation = 0
+        
+        # 预渲染章节包（只用于从单个目录加载的文件列表）
+        self.chapter_directory = None
+        self.page_bundle = None
+        self._bundle_generation = 0
         
         self.setup_ui()
         
@@ -81,6 +169,7 @@ class EnhancedMangaReader:
         ttk.Button(row1, text="递归查找图片", command=self.recursive_find_images).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(row1, text="后续目录查找", command=self.find_subsequent_directories).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(row1, text="刷新", command=self.refresh_current_directory).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(row1, text="烘焙章节", command=self.bake_chapter).pack(side=tk.LEFT, padx=(0, 5))
         
         # 当前目录显示
         self.dir_label = ttk.Label(row1, text="未选择目录")
@@ -126,21 +215,24 @@ class EnhancedMangaReader:
         tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         self.file_tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        self.file_tree.bind("<<TreeviewOpen>>", self.on_tree_open)
         
         # 缩略图面板
         thumbnail_frame = ttk.LabelFrame(left_panel, text="缩略图")
         thumbnail_frame.pack(fill=tk.BOTH, expand=True)
         
-        # 缩略图滚动区域
-        self.thumbnail_canvas = tk.Canvas(thumbnail_frame)
+        # 缩略图滚动区域（只绘制可见单元格的虚拟列表）
+        self.thumbnail_canvas = tk.Canvas(thumbnail_frame, bg="white", highlightthickness=0)
         thumbnail_scrollbar = ttk.Scrollbar(thumbnail_frame, orient="vertical", command=self.thumbnail_canvas.yview)
-        self.thumbnail_frame_inner = ttk.Frame(self.thumbnail_canvas)
         
-        self.thumbnail_canvas.configure(yscrollcommand=thumbnail_scrollbar.set)
         self.thumbnail_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         thumbnail_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.thumbnail_canvas.create_window((0, 0), window=self.thumbnail_frame_inner, anchor="nw")
+        self.thumbnail_strip = ThumbnailStrip(
+            self.thumbnail_canvas, thumbnail_scrollbar,
+            on_select=self.jump_to_image,
+            load_thumbnail=self._load_strip_thumbnail
+        )
         
     def setup_display_area(self, parent):
         # 右侧显示区域
@@ -163,14 +255,25 @@ class EnhancedMangaReader:
         
         # 图片显示区域
         self.display_canvas = tk.Canvas(display_frame, bg="black")
-        display_scrollbar_v = ttk.Scrollbar(display_frame, orient="vertical", command=self.display_canvas.yview)
-        display_scrollbar_h = ttk.Scrollbar(display_frame, orient="horizontal", command=self.display_canvas.xview)
+        self.display_scrollbar_v = ttk.Scrollbar(display_frame, orient="vertical", command=self.display_canvas.yview)
+        self.display_scrollbar_h = ttk.Scrollbar(display_frame, orient="horizontal", command=self.display_canvas.xview)
+        
+        self.display_canvas.configure(yscrollcommand=self._on_display_yscroll, xscrollcommand=self._on_display_xscroll)
         
-        self.display_canvas.configure(yscrollcommand=display_scrollbar_v.set, xscrollcommand=display_scrollbar_h.set)
+        # 显示区域的画布项目按键保留，重新显示时只修改变化的部分
+        self.display_scene = CanvasScene(self.display_canvas)
+        self._scene_counts = (0, 0, 0)
         
         self.display_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        display_scrollbar_v.pack(side=tk.RIGHT, fill=tk.Y)
-        display_scrollbar_h.pack(side=tk.BOTTOM, fill=tk.X)
+        self.display_scrollbar_v.pack(side=tk.RIGHT, fill=tk.Y)
+        self.display_scrollbar_h.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        # 视频进度条（当前项目是视频时显示在画布下方）
+        self.seek_frame = ttk.Frame(display_frame)
+        self.seek_time_label = ttk.Label(self.seek_frame, text="--:-- / --:--")
+        self.seek_time_label.pack(side=tk.RIGHT, padx=(5, 0))
+        self.seek_scale = ttk.Scale(self.seek_frame, from_=0, to=1, orient="horizontal")
+        self.seek_scale.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
     def setup_status_bar(self):
         # 底部状态栏
@@ -184,6 +287,10 @@ class EnhancedMangaReader:
         self.progress_label = ttk.Label(status_frame, text="")
         self.progress_label.pack(side=tk.RIGHT)
         
+        # 渲染统计（本次翻页画布项目的创建/删除/修改数）
+        self.render_stats_label = ttk.Label(status_frame, text="", foreground="gray")
+        self.render_stats_label.pack(side=tk.RIGHT, padx=(0, 10))
+        
     def bind_events(self):
         # 绑定键盘事件
         self.root.bind('<Key>', self.on_key_press)
@@ -192,6 +299,14 @@ class EnhancedMangaReader:
         # 绑定鼠标滚轮事件
         self.display_canvas.bind("<MouseWheel>", self.on_mousewheel)
         self.display_canvas.bind("<Button-1>", self.on_canvas_click)
+        self.display_canvas.bind("<Configure>", self._on_display_configure)
+        
+        # 视频进度条：悬停和拖动时显示预览图，松开时跳转
+        self.seek_scale.bind("<Motion>", self._on_seek_hover)
+        self.seek_scale.bind("<Leave>", self._on_seek_leave)
+        self.seek_scale.bind("<Button-1>", self._on_seek_drag)
+        self.seek_scale.bind("<B1-Motion>", self._on_seek_drag)
+        self.seek_scale.bind("<ButtonRelease-1>", self._on_seek_release)
         
         # 绑定窗口事件
         self.root.bind('<F11>', lambda e: self.toggle_fullscreen())
@@ -204,12 +319,57 @@ class EnhancedMangaReader:
             self.root_directory = directory
             self.current_directory = directory
             self.dir_label.config(text=f"根目录: {os.path.basename(directory)}")
+            self._open_thumbnail_store(directory)
+            self._open_library_index(directory)
             self.populate_file_tree()
             self.load_files_from_directory(directory)
             
+    def _open_library_index(self, directory):
+        """打开漫画库索引，并在后台增量扫描"""
+        self._index_generation += 1
+        if self.library_index is not None:
+            self.library_index.close()
+        self.library_index = LibraryIndex.for_library(
+            directory, self.image_extensions, self.video_extensions, date_key
+        )
+        threading.Thread(
+            target=self._update_library_index,
+            args=(self.library_index, self._index_generation),
+            daemon=True
+        ).start()
+        
+    def _update_library_index(self, index, generation):
+        """后台线程：增量扫描索引并补充图片尺寸"""
+        cancelled = lambda: generation != self._index_generation
+        
+        def progress(checked, rescanned):
+            self.root.after(0, lambda: self._show_index_progress(
+                generation, f"索引: 已检查 {checked} 个目录，更新 {rescanned} 个"))
+            
+        try:
+            if index.rescan(cancel=cancelled, progress=progress):
+                self.root.after(0, lambda: self._show_index_progress(generation, "索引已更新"))
+                index.fill_dimensions(cancel=cancelled)
+        except sqlite3.ProgrammingError:
+            # 扫描期间索引已被关闭（切换了根目录）
+            pass
+            
+    def _show_index_progress(self, generation, text):
+        if generation == self._index_generation:
+            self.progress_label.config(text=text)
+            
+    def _index_for(self, directory):
+        """目录在已完成扫描的索引范围内时返回索引，否则返回None"""
+        index = self.library_index
+        if index is not None and index.covers(directory) and index.is_ready():
+            return index
+        return None
+        
     def populate_file_tree(self):
-        """填充文件树"""
-        # 清空文件树
+        """填充文件树（子目录在展开时才加载）"""
+        # 清空文件树，丢弃之前未完成的加载
+        self._tree_generation += 1
+        self._tree_loading = set()
         for item in self.file_tree.get_children():
             self.file_tree.delete(item)
             
@@ -219,51 +379,87 @@ class EnhancedMangaReader:
         # 添加根节点
         root_name = os.path.basename(self.root_directory)
         root_item = self.file_tree.insert("", "end", text=root_name, values=[self.root_directory])
+        self._add_tree_placeholder(root_item)
         
-        # 递归添加子目录
-        self._add_tree_children(root_item, self.root_directory)
-        
-        # 展开根节点
+        # 展开根节点（程序展开不会触发 <<TreeviewOpen>>，直接加载）
         self.file_tree.item(root_item, open=True)
-        
-    def _add_tree_children(self, parent_item, directory):
-        """递归添加文件树子节点"""
+        self._load_tree_children(root_item)
+        
+    def _add_tree_placeholder(self, tree_item):
+        """添加占位子节点，使节点显示展开标记"""
+        self.file_tree.insert(tree_item, "end", text="加载中...", tags=("placeholder",))
+        
+    def on_tree_open(self, event):
+        """展开节点时加载子目录"""
+        tree_item = self.file_tree.focus()
+        if tree_item:
+            self._load_tree_children(tree_item)
+            
+    def _load_tree_children(self, tree_item):
+        """在后台线程中列出子目录，分批插入文件树"""
+        children = self.file_tree.get_children(tree_item)
+        if not children or "placeholder" not in self.file_tree.item(children[0], "tags"):
+            return  # 已加载
+        if tree_item in self._tree_loading:
+            return
+        self._tree_loading.add(tree_item)
+        
+        directory = self.file_tree.item(tree_item, "values")[0]
+        generation = self._tree_generation
+        threading.Thread(
+            target=self._list_tree_children,
+            args=(generation, tree_item, directory),
+            daemon=True
+        ).start()
+        
+    def _list_tree_children(self, generation, tree_item, directory):
+        """后台线程：列出并排序子目录，逐批交给界面线程插入"""
+        chunk_size = 200
+        index = self._index_for(directory)
+        if index is not None:
+            # 索引中已按日期排序，并记录了是否有子目录
+            index.validate(directory)
+            children = index.subdirs(directory)
+            for start in range(0, len(children), chunk_size):
+                if generation != self._tree_generation:
+                    return
+                self.root.after(0, self._insert_tree_chunk, generation, tree_item, children[start:start + chunk_size], False)
+            self.root.after(0, self._insert_tree_chunk, generation, tree_item, [], True)
+            return
+            
         try:
-            items = os.listdir(directory)
-            # 按目录名排序（考虑日期格式）
-            dirs = [item for item in items if os.path.isdir(os.path.join(directory, item))]
-            dirs.sort(key=self._extract_date_from_dirname)
-            
-            for item in dirs:
-                item_path = os.path.join(directory, item)
-                tree_item = self.file_tree.insert(parent_item, "end", text=item, values=[item_path])
-                
-                # 检查是否有子目录
-                try:
-                    sub_items = os.listdir(item_path)
-                    has_subdirs = any(os.path.isdir(os.path.join(item_path, sub)) for sub in sub_items)
-                    if has_subdirs:
-                        self._add_tree_children(tree_item, item_path)
-                except PermissionError:
-                    pass
-                    
-        except PermissionError:
-            pass
+            subdirs = list_subdirs(directory)
+        except OSError:
+            subdirs = []
             
-    def _extract_date_from_dirname(self, dirname):
-        """从目录名提取日期用于排序"""
-        # 匹配 yyyy-mm-dd 格式
-        date_pattern = r'(\d{4}-\d{2}-\d{2})'
-        match = re.search(date_pattern, dirname)
-        if match:
-            try:
-                return datetime.strptime(match.group(1), '%Y-%m-%d')
-            except ValueError:
-                pass
+        # 按目录名排序（考虑日期格式）
+        subdirs.sort(key=lambda d: date_key(os.path.basename(d)))
         
-        # 如果没有日期格式，按字母顺序
-        return datetime.min
+        for start in range(0, len(subdirs), chunk_size):
+            if generation != self._tree_generation:
+                return
+            chunk = [(path, has_subdirs(path)) for path in subdirs[start:start + chunk_size]]
+            self.root.after(0, self._insert_tree_chunk, generation, tree_item, chunk, False)
+        self.root.after(0, self._insert_tree_chunk, generation, tree_item, [], True)
         
+    def _insert_tree_chunk(self, generation, tree_item, chunk, finished):
+        """界面线程：插入一批子节点"""
+        if generation != self._tree_generation or not self.file_tree.exists(tree_item):
+            return
+            
+        # 第一批到达（或加载结束）时移除占位节点
+        for child in self.file_tree.get_children(tree_item):
+            if "placeholder" in self.file_tree.item(child, "tags"):
+                self.file_tree.delete(child)
+                
+        for item_path, item_has_subdirs in chunk:
+            child = self.file_tree.insert(tree_item, "end", text=os.path.basename(item_path), values=[item_path])
+            if item_has_subdirs:
+                self._add_tree_placeholder(child)
+                
+        if finished:
+            self._tree_loading.discard(tree_item)
+            
     def on_tree_select(self, event):
         """文件树选择事件"""
         selection = self.file_tree.selection()
@@ -276,116 +472,412 @@ class EnhancedMangaReader:
                 self.dir_label.config(text=f"当前: {os.path.basename(directory)}")
                 self.load_files_from_directory(directory)
                 
-    def load_files_from_directory(self, directory):
-        """从目录加载文件"""
+    def load_files_from_directory(self, directory, keep_path=None):
+        """从目录加载文件，keep_path 仍在目录中时停在该文件"""
+        self._cancel_discovery()
         self.image_files = []
         self.video_files = []
+        self._layout_size_hints = {}
         
         try:
-            files = os.listdir(directory)
-            for file in files:
-                file_path = os.path.join(directory, file)
-                if os.path.isfile(file_path):
-                    ext = Path(file).suffix.lower()
-                    
-                    if ext in self.image_extensions:
-                        self.image_files.append(file_path)
-                    elif ext in self.video_extensions:
-                        self.video_files.append(file_path)
-            
-            # 智能排序
-            self.image_files.sort(key=self._smart_sort_key)
-            self.video_files.sort(key=self._smart_sort_key)
+            # 一次扫描完成分类和智能排序
+            scan = scan_directory(directory, self.image_extensions, self.video_extensions)
+            self.image_files = scan.images
+            self.video_files = scan.videos
             
-            self.current_index = 0
+            files = self.image_files + self.video_files
+            self.current_index = files.index(keep_path) if keep_path in files else 0
             self.update_thumbnails()
             self.display_current_item()
             self.update_status()
+            self._watch_directory(directory)
+            self.chapter_directory = directory
+            self._open_page_bundle(directory)
             
         except Exception as e:
             messagebox.showerror("错误", f"加载目录失败: {str(e)}")
             
-    def _smart_sort_key(self, filepath):
-        """智能排序键"""
-        filename = os.path.basename(filepath)
+    def _open_page_bundle(self, directory):
+        """在后台打开章节的预渲染包（检查源文件是否变化）"""
+        self._close_page_bundle()
+        threading.Thread(
+            target=self._load_page_bundle,
+            args=(self._bundle_generation, directory, list(self.image_files)),
+            daemon=True
+        ).start()
+        
+    def _load_page_bundle(self, generation, directory, image_files):
+        """后台线程：打开并检查预渲染包"""
+        bundle = PageBundle.open(directory, image_files)
+        if bundle is not None:
+            self.root.after(0, self._use_page_bundle, generation, bundle)
+            
+    def _use_page_bundle(self, generation, bundle):
+        """界面线程：开始使用预渲染包"""
+        if generation != self._bundle_generation:
+            bundle.close()
+            return
+        self.page_bundle = bundle
+        self.page_cache.set_bundle(bundle)
+        self.progress_label.config(text=f"使用预渲染章节（宽度 {bundle.target_width}）")
+        
+    def _close_page_bundle(self):
+        """停止使用当前的预渲染包，取消正在进行的打开或烘焙"""
+        self._bundle_generation += 1
+        self.page_cache.set_bundle(None)
+        if self.page_bundle is not None:
+            self.page_bundle.close()
+            self.page_bundle = None
+            
+    def bake_chapter(self):
+        """把当前章节的所有页面按目标宽度预渲染到一个文件中"""
+        if not self.chapter_directory or not self.image_files:
+            messagebox.showwarning("警告", "请先打开一个章节目录")
+            return
+            
+        default_width = max(int(self.display_canvas.winfo_width() * PAGE_MARGIN * self.zoom_factor), 100)
+        target_width = simpledialog.askinteger(
+            "烘焙章节", "目标宽度（像素）:",
+            initialvalue=default_width, minvalue=100, maxvalue=10000, parent=self.root
+        )
+        if not target_width:
+            return
+            
+        # 替换包文件前先关闭旧的包（Windows 上不能替换已映射的文件）
+        self._close_page_bundle()
+        threading.Thread(
+            target=self._bake_chapter_thread,
+            args=(self._bundle_generation, self.chapter_directory, list(self.image_files), target_width),
+            daemon=True
+        ).start()
         
-        # 尝试提取数字
-        numbers = re.findall(r'\d+', filename)
-        if numbers:
-            # 如果有数字，按第一个数字排序
+    def _bake_chapter_thread(self, generation, directory, image_files, target_width):
+        """后台线程：烘焙章节，完成后开始使用"""
+        cancelled = lambda: generation != self._bundle_generation
+        
+        def progress(done, total):
+            self.root.after(0, lambda: self._show_bake_progress(generation, f"烘焙章节: {done}/{total}"))
+            
+        try:
+            bundle = PageBundle.bake(directory, image_files, target_width, cancel=cancelled, progress=progress)
+        except OSError as e:
+            self.root.after(0, lambda: self._show_bake_progress(generation, f"烘焙章节失败: {str(e)}"))
+            return
+        if bundle is not None:
+            self.root.after(0, self._use_page_bundle, generation, bundle)
+            
+    def _show_bake_progress(self, generation, text):
+        if generation == self._bundle_generation:
+            self.progress_label.config(text=text)
+            
+    def _watch_directory(self, directory):
+        """监视目录的变化，directory 为 None 时停止监视"""
+        if self.dir_watcher is not None:
+            self.dir_watcher.stop()
+            self.dir_watcher = None
+        if directory and not is_archive(directory):
             try:
-                return (0, int(numbers[0]), filename)
-            except ValueError:
-                pass
+                self.dir_watcher = DirectoryWatcher(self.root, directory, self._on_directory_changed)
+            except OSError as e:
+                print(f"无法监视目录: {directory}, {str(e)}")
+                
+    def _on_directory_changed(self, delta):
+        """当前目录内容变化：增量更新文件列表、文件树和缓存，保持当前页"""
+        if self.dir_watcher is None or delta.directory != self.dir_watcher.directory:
+            return  # 已切换到其他目录
+        directory = delta.directory
+        if delta.gone:
+            self._watch_directory(None)
+            self.progress_label.config(text=f"目录已被删除或移动: {os.path.basename(directory)}")
+            return
+            
+        old_files = self.image_files + self.video_files
+        current_path = old_files[self.current_index] if self.current_index < len(old_files) else None
         
-        # 按文件修改时间排序
+        if delta.overflow:
+            # 事件丢失，重新列出目录并丢弃该目录的缓存
+            try:
+                scan = scan_directory(directory, self.image_extensions, self.video_extensions)
+            except OSError:
+                return
+            images, videos = scan.images, scan.videos
+            changed = set(old_files)
+        else:
+            images, videos = self._apply_directory_delta(delta)
+            changed = (delta.removed | delta.modified | set(delta.renamed)) - delta.dirs
+            
+        # 丢弃已变化文件的缓存
+        for path in changed:
+            self.page_cache.invalidate(path)
+            self.tile_renderer.invalidate(path)
+            self._close_slice_pyramid(path)
+            self._slice_failed.pop(path, None)
+            self.thumbnail_strip.forget(path)
+        for key in [key for key in self.prepared_photos if key[0] in changed]:
+            del self.prepared_photos[key]
+        if self.thumbnail_store is not None:
+            for path in (delta.removed | set(delta.renamed)) - delta.dirs:
+                self.thumbnail_store.invalidate(path)
+                
+        images_changed = images != self.image_files or bool(changed & set(self.image_files))
+        if images_changed:
+            self._carry_layout_sizes(delta, changed)
+            
+        # 保持当前页（跟随重命名），当前页被删除时停在原来的位置
+        current_path = delta.renamed.get(current_path, current_path)
+        new_files = images + videos
         try:
-            mtime = os.path.getmtime(filepath)
-            return (1, mtime, filename)
-        except OSError:
-            return (2, 0, filename)
+            new_index = new_files.index(current_path)
+        except ValueError:
+            new_index = min(self.current_index, max(len(new_files) - 1, 0))
+        current_changed = (new_index >= len(new_files) or new_files[new_index] != current_path
+                           or current_path in changed)
+                           
+        self.image_files, self.video_files = images, videos
+        self.current_index = new_index
+        self.thumbnail_strip.set_items(images, videos, new_index, keep_position=True)
+        
+        if not new_files:
+            self.stop_video()
+            self._show_layers()
+            self.current_image_path = None
+        elif self.reading_mode.get() == "continuous" and images_changed:
+            self.display_current_item()
+        elif current_changed:
+            self.display_current_item()
+        self.update_status()
+        
+        self._update_tree_for_delta(delta)
+        index = self._index_for(directory)
+        if index is not None:
+            threading.Thread(target=self._refresh_library_index, args=(index, directory), daemon=True).start()
+            
+        added = len(set(new_files) - set(old_files))
+        removed = len(set(old_files) - set(new_files))
+        self.progress_label.config(text=f"目录已更新: 新增 {added} 个，删除 {removed} 个")
+        
+    def _apply_directory_delta(self, delta):
+        """把一次目录变化应用到当前文件列表，返回新的 (图片列表, 视频列表)"""
+        gone = (delta.removed | set(delta.renamed)) - delta.dirs
+        new = (delta.added | set(delta.renamed.values())) - delta.dirs
+        result = []
+        for files, extensions in ((self.image_files, self.image_extensions),
+                                  (self.video_files, self.video_extensions)):
+            kept = [path for path in files if path not in gone]
+            present = set(kept)
+            added = []
+            mtimes = {}  # 新文件的修改时间，排序时不再重复 stat
+            for path in new:
+                if path in present or os.path.splitext(path)[1].lower() not in extensions:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if stat.S_ISREG(st.st_mode):
+                    added.append(path)
+                    mtimes[path] = st.st_mtime
+            insert_sorted(kept, added, mtimes)
+            result.append(kept)
+        return result
+        
+    def _carry_layout_sizes(self, delta, changed):
+        """记录未变化图片的尺寸，新的布局表不必重新读取这些文件头"""
+        layout = self.page_layout
+        self.page_layout = None
+        if layout is None:
+            return
+        self._page_layouts.pop(tuple(layout.image_files), None)
+        if delta.overflow:
+            return  # 不知道哪些文件变化了
+        hints = {}
+        for path, width, height in zip(layout.image_files, layout.native_widths, layout.native_heights):
+            if width and path not in delta.modified:
+                hints[delta.renamed.get(path, path)] = (width, height)
+        self._layout_size_hints = hints
+        
+    def _refresh_library_index(self, index, directory):
+        """后台线程：更新索引中变化的目录"""
+        try:
+            index.refresh_directory(directory)
+        except sqlite3.ProgrammingError:
+            # 索引已被关闭（切换了根目录）
+            pass
+            
+    def _find_tree_item(self, directory):
+        """在已加载的文件树中查找目录对应的节点"""
+        directory = os.path.normpath(directory)
+        items = self.file_tree.get_children("")
+        while items:
+            for item in items:
+                values = self.file_tree.item(item, "values")
+                if not values:
+                    continue
+                path = os.path.normpath(values[0])
+                if path == directory:
+                    return item
+                if directory.startswith(os.path.join(path, "")):
+                    items = self.file_tree.get_children(item)
+                    break
+            else:
+                return None
+        return None
+        
+    def _update_tree_for_delta(self, delta):
+        """把子目录（和压缩包）的新增、删除和重命名应用到文件树"""
+        is_node = lambda path: path in delta.dirs or is_archive_name(path)
+        removed = {path for path in delta.removed | set(delta.renamed) if is_node(path)}
+        added = {path for path in delta.added | set(delta.renamed.values()) if is_node(path)}
+        if not removed and not added and not delta.overflow:
+            return
+        tree_item = self._find_tree_item(delta.directory)
+        if tree_item is None:
+            return
+        children = self.file_tree.get_children(tree_item)
+        if children and "placeholder" in self.file_tree.item(children[0], "tags"):
+            return  # 尚未展开，展开时会重新列出
+        if tree_item in self._tree_loading:
+            return
+            
+        if delta.overflow:
+            # 重新加载该节点的子目录
+            for child in children:
+                self.file_tree.delete(child)
+            self._add_tree_placeholder(tree_item)
+            if self.file_tree.item(tree_item, "open"):
+                self._load_tree_children(tree_item)
+            return
+            
+        for child in children:
+            if self.file_tree.item(child, "values")[0] in removed:
+                self.file_tree.delete(child)
+                
+        dir_key = lambda path: date_key(os.path.basename(path))
+        for path in sorted(added, key=dir_key):
+            if not os.path.isdir(path) and not is_archive(path):
+                continue
+            # 插入到同日期目录之后，保持按日期排序
+            siblings = self.file_tree.get_children(tree_item)
+            position = 0
+            while (position < len(siblings)
+                   and dir_key(self.file_tree.item(siblings[position], "values")[0]) <= dir_key(path)):
+                position += 1
+            child = self.file_tree.insert(tree_item, position, text=os.path.basename(path), values=[path])
+            if has_subdirs(path):
+                self._add_tree_placeholder(child)
             
     def recursive_find_images(self):
-        """递归查找当前目录下所有图片"""
+        """递归查找当前目录下所有图片（后台按日期顺序扫描，边扫描边显示）"""
         if not self.current_directory:
             messagebox.showwarning("警告", "请先选择目录")
             return
             
+        self._cancel_discovery()
+        self._watch_directory(None)
+        self._close_page_bundle()
+        self.chapter_directory = None
         self.image_files = []
         self.video_files = []
+        self.current_index = 0
         
-        # 获取所有子目录并排序
-        all_dirs = []
-        for root, dirs, files in os.walk(self.current_directory):
-            all_dirs.append(root)
+        index = self._index_for(self.current_directory)
+        if index is not None:
+            # 直接查询索引
+            index.validate(self.current_directory)
+            self.image_files, self.video_files = index.recursive_files(self.current_directory)
+            self.update_thumbnails()
+            self.display_current_item()
+            self.update_status()
+            return
             
-        # 按目录路径中的日期排序
-        all_dirs.sort(key=lambda d: self._extract_date_from_path(d))
+        generation = self._discovery_generation
+        scans = walk_by_date(
+            self.current_directory, self.image_extensions, self.video_extensions,
+            date_key, cancel=lambda: generation != self._discovery_generation
+        )
+        self._start_discovery(generation, scans, "正在查找图片...")
         
-        # 从每个目录收集文件
-        for directory in all_dirs:
-            try:
-                files = os.listdir(directory)
-                dir_images = []
-                dir_videos = []
-                
-                for file in files:
-                    file_path = os.path.join(directory, file)
-                    if os.path.isfile(file_path):
-                        ext = Path(file).suffix.lower()
-                        
-                        if ext in self.image_extensions:
-                            dir_images.append(file_path)
-                        elif ext in self.video_extensions:
-                            dir_videos.append(file_path)
-                
-                # 对每个目录内的文件排序
-                dir_images.sort(key=self._smart_sort_key)
-                dir_videos.sort(key=self._smart_sort_key)
-                
-                self.image_files.extend(dir_images)
-                self.video_files.extend(dir_videos)
-                
-            except PermissionError:
-                continue
+    def _cancel_discovery(self):
+        """取消正在进行的后台查找"""
+        self._discovery_generation += 1
         
-        self.current_index = 0
+    def _start_discovery(self, generation, scans, message):
+        """清空显示，在后台线程中逐个读取扫描结果（第一批结果到达后再显示）"""
+        self.stop_video()
+        self._show_layers()
+        self.current_image_path = None
         self.update_thumbnails()
-        self.display_current_item()
+        self.update_status()
+        self.progress_label.config(text=message)
+        
+        threading.Thread(target=self._discover, args=(generation, scans), daemon=True).start()
+        
+    def _discover(self, generation, scans):
+        """后台线程：读取目录扫描结果，分批交给界面线程"""
+        cancelled = lambda: generation != self._discovery_generation
+        images, videos = [], []
+        directories = 0
+        last_batch = None
+        for scan in scans:
+            directories += 1
+            images.extend(scan.images)
+            videos.extend(scan.videos)
+            
+            # 第一批文件立即显示，之后最多每0.2秒追加一次
+            now = time.monotonic()
+            if (images or videos) and (last_batch is None or now - last_batch >= 0.2):
+                self.root.after(0, self._on_discovery_batch, generation, images, videos, directories, False)
+                images, videos = [], []
+                last_batch = now
+                
+        if not cancelled():
+            self.root.after(0, self._on_discovery_batch, generation, images, videos, directories, True)
+            
+    def _on_discovery_batch(self, generation, images, videos, directories, finished):
+        """界面线程：追加一批查找结果"""
+        if generation != self._discovery_generation:
+            return  # 已取消
+            
+        first = not self.image_files and not self.video_files
+        if not first and self.current_index >= len(self.image_files):
+            # 当前是视频，前面插入了图片
+            self.current_index += len(images)
+        self.image_files.extend(images)
+        self.video_files.extend(videos)
+        
+        if first and (images or videos):
+            self.current_index = 0
+            self.update_thumbnails()
+            self.display_current_item()
+        elif images or videos:
+            self.thumbnail_strip.set_items(self.image_files, self.video_files, self.current_index, keep_position=True)
+            if images:
+                self._extend_continuous_layout(images)
         self.update_status()
         
-    def _extract_date_from_path(self, path):
-        """从路径提取日期"""
-        # 从路径的各个部分提取日期
-        parts = path.split(os.sep)
-        for part in parts:
-            date_match = re.search(r'(\d{4}-\d{2}-\d{2})', part)
-            if date_match:
-                try:
-                    return datetime.strptime(date_match.group(1), '%Y-%m-%d')
-                except ValueError:
-                    pass
-        return datetime.min
+        total = len(self.image_files) + len(self.video_files)
+        if finished:
+            self.progress_label.config(text=f"共找到 {total} 个文件（{directories} 个目录）")
+        else:
+            self.progress_label.config(text=f"已找到 {total} 个文件（{directories} 个目录），继续查找...")
+            
+    def _extend_continuous_layout(self, images):
+        """连续模式：把新找到的图片追加到布局末尾，已显示的页面位置不变"""
+        layout = self.page_layout
+        if not self._continuous_ready or layout is None or len(layout) + len(images) != len(self.image_files):
+            return
+        for key, value in list(self._page_layouts.items()):
+            if value is layout:
+                del self._page_layouts[key]
+        index = self._index_for(self.current_directory)
+        known_sizes = index.dimensions(images) if index is not None else None
+        last = len(layout) - 1
+        layout.extend(images, known_sizes)
+        self._page_layouts[tuple(layout.image_files)] = layout
+        self.display_canvas.configure(scrollregion=(0, 0, layout.canvas_width, layout.total_height))
+        # 原来的最后一页需要补上分隔线
+        if last in self.continuous_items:
+            self._materialize_continuous_page(last)
         
     def find_subsequent_directories(self):
         """查找当前目录后续的同级目录"""
@@ -399,20 +891,23 @@ class EnhancedMangaReader:
             parent_dir = self.root_directory
             
         try:
-            # 获取同级目录
-            all_dirs = []
-            for item in os.listdir(parent_dir):
-                item_path = os.path.join(parent_dir, item)
-                if os.path.isdir(item_path):
-                    all_dirs.append(item_path)
-                    
-            # 按日期排序
-            all_dirs.sort(key=lambda d: self._extract_date_from_dirname(os.path.basename(d)))
+            index = self._index_for(parent_dir)
+            if index is not None:
+                # 索引中的同级目录已按日期排序
+                index.validate(parent_dir)
+                all_dirs = [path for path, _ in index.subdirs(parent_dir)]
+            else:
+                # 获取同级目录
+                all_dirs = list_subdirs(parent_dir)
+                        
+                # 按日期排序
+                all_dirs.sort(key=lambda d: date_key(os.path.basename(d)))
             
-            # 找到当前目录的位置
+            # 用规范化的路径比较找到当前目录的位置（不需要逐个 stat）
+            current = os.path.normcase(os.path.normpath(self.current_directory))
             current_index = -1
             for i, dir_path in enumerate(all_dirs):
-                if os.path.samefile(dir_path, self.current_directory):
+                if os.path.normcase(os.path.normpath(dir_path)) == current:
                     current_index = i
                     break
                     
@@ -428,93 +923,93 @@ class EnhancedMangaReader:
                 return
                 
             # 从后续目录递归收集图片
+            self._cancel_discovery()
             self.image_files = []
             self.video_files = []
+            self.current_index = 0
+            self._watch_directory(None)
+            self._close_page_bundle()
+            self.chapter_directory = None
             
-            for directory in subsequent_dirs:
-                for root, dirs, files in os.walk(directory):
-                    dir_images = []
-                    dir_videos = []
-                    
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        ext = Path(file).suffix.lower()
-                        
-                        if ext in self.image_extensions:
-                            dir_images.append(file_path)
-                        elif ext in self.video_extensions:
-                            dir_videos.append(file_path)
-                    
-                    dir_images.sort(key=self._smart_sort_key)
-                    dir_videos.sort(key=self._smart_sort_key)
-                    
+            if index is not None:
+                for directory in subsequent_dirs:
+                    dir_images, dir_videos = index.recursive_files(directory)
                     self.image_files.extend(dir_images)
                     self.video_files.extend(dir_videos)
                     
-            self.current_index = 0
-            self.update_thumbnails()
-            self.display_current_item()
-            self.update_status()
-            
-            messagebox.showinfo("信息", f"已加载 {len(subsequent_dirs)} 个后续目录的内容")
+                self.update_thumbnails()
+                self.display_current_item()
+                self.update_status()
+                messagebox.showinfo("信息", f"已加载 {len(subsequent_dirs)} 个后续目录的内容")
+                return
+                
+            # 各个后续目录在线程池中并行遍历，按目录顺序合并，先完成的部分先显示
+            generation = self._discovery_generation
+            scans = chain.from_iterable(walk_each(
+                subsequent_dirs, self.image_extensions, self.video_extensions,
+                cancel=lambda: generation != self._discovery_generation
+            ))
+            self._start_discovery(generation, scans, f"正在扫描 {len(subsequent_dirs)} 个后续目录...")
             
         except Exception as e:
             messagebox.showerror("错误", f"查找后续目录失败: {str(e)}")
             
     def refresh_current_directory(self):
-        """刷新当前目录"""
+        """刷新当前目录（与目录监视相同的增量更新，保持当前页）"""
         if self.current_directory:
-            self.load_files_from_directory(self.current_directory)
+            watcher = self.dir_watcher
+            if watcher is not None and watcher.directory == self.current_directory:
+                self.progress_label.config(text="正在检查目录变化...")
+                watcher.rescan()
+                return
+            # 没有监视的列表（压缩包、递归查找的结果）重新加载，停在原来的文件
+            files = self.image_files + self.video_files
+            current_path = files[self.current_index] if self.current_index < len(files) else None
+            self.page_layout = None
+            self._page_layouts.clear()
+            self.page_cache.clear()
+            self.load_files_from_directory(self.current_directory, keep_path=current_path)
         else:
             messagebox.showwarning("警告", "请先选择目录")
             
     def update_thumbnails(self):
-        """更新缩略图"""
-        # 清除现有缩略图
-        for widget in self.thumbnail_frame_inner.winfo_children():
-            widget.destroy()
-            
-        # 创建新缩略图
-        for i, file_path in enumerate(self.image_files[:50]):  # 限制显示数量以提高性能
-            try:
-                # 创建缩略图
-                img = Image.open(file_path)
-                img.thumbnail((120, 120), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-                
-                # 创建缩略图按钮
-                frame = ttk.Frame(self.thumbnail_frame_inner)
-                frame.pack(fill=tk.X, pady=1)
-                
-                # 高亮当前选中的缩略图
-                bg_color = "lightblue" if i == self.current_index else "white"
-                btn = tk.Button(frame, image=photo, command=lambda idx=i: self.jump_to_image(idx), bg=bg_color)
-                btn.image = photo  # 保持引用
-                btn.pack(side=tk.LEFT)
-                
-                # 添加序号和文件名
-                info_frame = ttk.Frame(frame)
-                info_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
-                
-                ttk.Label(info_frame, text=f"{i+1}", font=("Arial", 8, "bold")).pack(anchor="w")
-                filename = os.path.basename(file_path)
-                if len(filename) > 20:
-                    filename = filename[:17] + "..."
-                ttk.Label(info_frame, text=filename, font=("Arial", 7)).pack(anchor="w")
-                
-            except Exception as e:
-                print(f"创建缩略图失败: {file_path}, {str(e)}")
-                
-        # 更新滚动区域
-        self.thumbnail_frame_inner.update_idletasks()
-        self.thumbnail_canvas.configure(scrollregion=self.thumbnail_canvas.bbox("all"))
+        """文件列表变化后更新缩略图列表"""
+        self._get_thumbnail_store()
+        self.thumbnail_strip.set_items(self.image_files, self.video_files, self.current_index)
+        
+    def _load_strip_thumbnail(self, index, file_path, is_video):
+        """为缩略图列表提供缩略图（在后台线程调用），视频使用封面帧"""
+        if is_video:
+            if not CV2_AVAILABLE:
+                return None
+            return self.poster_frames.get_or_create(file_path, THUMBNAIL_SIZE)
+        # 从缩略图库读取，不存在或已失效时生成
+        return self._get_thumbnail_store().get_or_create(file_path)
+        
+    def _open_thumbnail_store(self, directory):
+        """打开漫画库对应的缩略图库，并在后台清理已删除文件的记录"""
+        if self.thumbnail_store is not None:
+            self.thumbnail_store.close()
+        self.thumbnail_store = ThumbnailStore.for_library(directory)
+        threading.Thread(target=self.thumbnail_store.compact_if_due, daemon=True).start()
+        
+    def _get_thumbnail_store(self):
+        """获取缩略图库，未选择根目录时按当前目录打开"""
+        if self.thumbnail_store is None:
+            self._open_thumbnail_store(self.root_directory or self.current_directory)
+        return self.thumbnail_store
         
     def jump_to_image(self, index):
         """跳转到指定图片"""
         self.current_index = index
-        self.display_current_item()
+        self.prefetcher.cancel()
+        if self._continuous_ready and self.current_index < len(self.image_files):
+            self.scroll_to_current_image()
+            self._update_continuous_highlight()
+        else:
+            self.display_current_item()
         self.update_status()
-        self.update_thumbnails()
+        self.thumbnail_strip.set_current(self.current_index)
         
     def display_current_item(self):
         """显示当前项目"""
@@ -525,16 +1020,18 @@ class EnhancedMangaReader:
         self.stop_video()
         
         if self.current_index < len(self.image_files):
+            self._set_seek_video(None)
             self.display_image(self.image_files[self.current_index])
         elif self.current_index - len(self.image_files) < len(self.video_files):
             video_index = self.current_index - len(self.image_files)
+            self._set_seek_video(self.video_files[video_index])
             self.display_video_thumbnail(self.video_files[video_index])
             
     def display_image(self, image_path):
         """显示图片"""
         try:
-            # 加载原始图片
-            self.original_image = Image.open(image_path)
+            # 记录当前图片，像素数据从页面缓存获取
+            self.current_image_path = image_path
             
             # 根据阅读模式显示
             if self.reading_mode.get() == "continuous":
@@ -547,11 +1044,11 @@ class EnhancedMangaReader:
             
     def display_page_image(self):
         """翻页模式显示图片"""
-        if not self.original_image:
+        if not self.current_image_path:
             return
             
-        # 清除画布
-        self.display_canvas.delete("all")
+        # 只保留翻页模式的图片或图块项目
+        self._show_layers("page", "tile")
         
         # 获取画布尺寸
         canvas_width = self.display_canvas.winfo_width()
@@ -561,200 +1058,587 @@ class EnhancedMangaReader:
             self.root.after(100, self.display_page_image)
             return
             
-        # 计算缩放
-        img = self.original_image.copy()
-        img_width, img_height = img.size
-        
-        if self.align_mode.get() == "width":
-            # 按宽度对齐
-            scale = (canvas_width * 0.95) / img_width
-        elif self.align_mode.get() == "height":
-            # 按高度对齐
-            scale = (canvas_height * 0.95) / img_height
-        else:
-            # 适应窗口
-            scale_x = (canvas_width * 0.95) / img_width
-            scale_y = (canvas_height * 0.95) / img_height
-            scale = min(scale_x, scale_y)
-            
-        # 应用用户缩放
-        scale *= self.zoom_factor
+        # 按对齐方式和缩放计算尺寸和居中位置（只需要原始尺寸）
+        plan = self.render_engine.plan_page(self.current_image_path, (canvas_width, canvas_height),
+                                            self.align_mode.get(), self.zoom_factor)
         
-        new_width = int(img_width * scale)
-        new_height = int(img_height * scale)
-        
-        # 高质量缩放
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        # 放大到远超画布时只渲染可见区域的图块
+        if plan.tiled:
+            self._show_tiled_page(canvas_width, canvas_height, plan)
+            return
+        self._show_layers("page")
         
-        self.current_photo = ImageTk.PhotoImage(img)
+        def show(photo):
+            self.current_photo = photo
+            self.display_scene.image("page", plan.placement.x, plan.placement.y, anchor="nw", image=photo)
+            
+        preview = self._present_page(self.current_image_path, plan.size, show)
         
-        # 居中显示
-        x = max(0, (canvas_width - new_width) // 2)
-        y = max(0, (canvas_height - new_height) // 2)
+        # 更新滚动区域
+        self.display_canvas.configure(scrollregion=plan.scroll_region)
         
-        self.display_canvas.create_image(x, y, anchor="nw", image=self.current_photo)
+        # 后台预取阅读方向上的页面（只显示了预览时先处理当前页）
+        if self.current_index < len(self.image_files):
+            self.prefetcher.update(self.image_files, self.current_index, plan.size_for, self._on_page_prefetched,
+                                   include_current=preview)
+        
+    def _show_tiled_page(self, canvas_width, canvas_height, plan):
+        """分块显示放大的当前页，同一页改变缩放时保持视口中心"""
+        path = self.current_image_path
+        grid = self.render_engine.tile_grid(path, plan.size)
+        
+        old_grid = self._tile_grid if self._tile_path == path else None
+        center = None
+        if old_grid is not None:
+            old_x, old_y = self._tile_origin
+            center = ((self.display_canvas.canvasx(0) + canvas_width / 2 - old_x) / old_grid.width,
+                      (self.display_canvas.canvasy(0) + canvas_height / 2 - old_y) / old_grid.height)
+        
+        self._show_layers("tile")
+        if old_grid is None or (old_grid.width, old_grid.height) != (grid.width, grid.height):
+            # 其他页面或其他尺寸的图块位置都不对，全部删除
+            self.display_scene.clear()
+            self._tile_photos = {}
+        self._tile_path, self._tile_grid = path, grid
+        self._tile_origin = (plan.placement.x, plan.placement.y)
+        self.tile_renderer.set_viewport(canvas_width, canvas_height)
+        
+        # 放大时不预取整页位图，也没有整页预览
+        self.prefetcher.cancel()
+        self._pending_final = None
+        self._render_timing = None
+        
+        _, _, scroll_width, scroll_height = plan.scroll_region
+        self.display_canvas.configure(scrollregion=plan.scroll_region)
+        if center is not None:
+            origin_x, origin_y = self._tile_origin
+            self.display_canvas.xview_moveto((origin_x + center[0] * grid.width - canvas_width / 2) / scroll_width)
+            self.display_canvas.yview_moveto((origin_y + center[1] * grid.height - canvas_height / 2) / scroll_height)
+        self._update_visible_tiles()
+        
+    def _schedule_tile_update(self):
+        if self._tile_grid is not None and self._tile_render_pending is None:
+            self._tile_render_pending = self.root.after_idle(self._update_visible_tiles)
+            
+    def _update_visible_tiles(self):
+        """显示覆盖可见区域的图块，释放离开的图块，缺少的在后台生成"""
+        self._tile_render_pending = None
+        grid = self._tile_grid
+        if grid is None:
+            return
+            
+        origin_x, origin_y = self._tile_origin
+        left = self.display_canvas.canvasx(0) - origin_x
+        top = self.display_canvas.canvasy(0) - origin_y
+        wanted = grid.tiles_in(left, top,
+                               left + self.display_canvas.winfo_width(),
+                               top + self.display_canvas.winfo_height())
+        self._tile_wanted = set(wanted)
+        
+        for tile in list(self._tile_photos):
+            if tile not in self._tile_wanted:
+                del self._tile_photos[tile]
+                self.display_scene.remove(("tile",) + tile)
+                
+        missing = []
+        for tile in wanted:
+            if tile in self._tile_photos:
+                continue
+            img = self.tile_renderer.get(self._tile_path, grid, tile)
+            if img is None:
+                missing.append(tile)
+            else:
+                self._place_tile(tile, img)
+        if missing:
+            self.tile_renderer.request(self._tile_path, grid, missing, self._on_tile_ready)
+        self._show_render_stats()
+        
+    def _on_tile_ready(self, path, grid, tile, img):
+        """图块生成完成（界面线程）：仍是当前页当前尺寸且仍然需要时显示"""
+        current = self._tile_grid
+        if current is None or path != self._tile_path or (grid.width, grid.height) != (current.width, current.height):
+            return
+        if tile in self._tile_wanted and tile not in self._tile_photos:
+            self._place_tile(tile, img)
+            self._show_render_stats()
+            
+    def _place_tile(self, tile, img):
+        photo = ImageTk.PhotoImage(img)
+        self._tile_photos[tile] = photo
+        x0, y0, _, _ = self._tile_grid.tile_rect(*tile)
+        origin_x, origin_y = self._tile_origin
+        self.display_scene.image(("tile",) + tile, origin_x + x0, origin_y + y0, anchor="nw", image=photo)
+        
+    def _present_page(self, path, size, show):
+        """显示一页，只显示了预览时返回True
+        
+        有预取好的位图或已缓存（已烘焙）的缩放结果时直接显示；否则先显示快速预览，
+        高质量缩放由预取线程完成后替换（用户已经翻页时丢弃）。show(photo) 把位图放到画布上。
+        """
+        started = time.perf_counter()
+        self._pending_final = None
+        photo = self.prepared_photos.get((path, size))
+        if photo is None:
+            img, final = self.render_engine.render_fast(path, size, fallback=lambda: self._stored_thumbnail(path))
+            if not final:
+                self._pending_final = (path, size, started, show)
+            photo = ImageTk.PhotoImage(img)
+        show(photo)
+        
+        first = (time.perf_counter() - started) * 1000
+        self._render_timing = (first, None if self._pending_final else first)
+        self._show_render_stats()
+        return self._pending_final is not None
+        
+    def _stored_thumbnail(self, path):
+        """缩略图库中已有的缩略图（不生成），用作预览"""
+        if self.thumbnail_store is None:
+            return None
+        try:
+            return self.thumbnail_store.get(path)
+        except (OSError, sqlite3.Error):
+            return None
         
-        # 更新滚动区域
-        self.display_canvas.configure(scrollregion=(0, 0, max(canvas_width, new_width), max(canvas_height, new_height)))
+    def _on_page_prefetched(self, generation, index, path, size, img):
+        """预取完成（界面线程）：转换为位图备用"""
+        if generation != self.prefetcher.generation:
+            return
+        photo = ImageTk.PhotoImage(img)
+        self.prepared_photos[(path, size)] = photo
+        self.prepared_photos.move_to_end((path, size))
+        while len(self.prepared_photos) > self.prefetcher.ahead + self.prefetcher.behind + 1:
+            self.prepared_photos.popitem(last=False)
+            
+        # 当前页只显示了预览时换成高质量结果
+        pending = self._pending_final
+        if pending is not None and pending[:2] == (path, size):
+            self._pending_final = None
+            pending[3](photo)
+            self._render_timing = (self._render_timing[0], (time.perf_counter() - pending[2]) * 1000)
+            self._show_render_stats()
         
     def display_continuous_image(self):
-        """连续模式显示图片（显示所有图片）"""
-        # 清除画布
-        self.display_canvas.delete("all")
+        """连续模式显示图片（只渲染可见区域附近的图片）"""
+        self._continuous_ready = False
+        self._show_layers(*self.CONTINUOUS_LAYERS)
         
         canvas_width = self.display_canvas.winfo_width()
         if canvas_width <= 1:
             self.root.after(100, self.display_continuous_image)
             return
             
-        y_offset = 0
+        # 同一文件列表复用布局表，只读取图片头，不解码
+        layout = self._get_page_layout()
+        changed = layout.relayout(canvas_width) or layout is not self._scene_layout
+        self._scene_layout = layout
+        self._continuous_ready = True
+        
+        # 更新滚动区域
+        self.display_canvas.configure(scrollregion=(0, 0, canvas_width, layout.total_height))
         
-        # 显示所有图片，不限制数量
-        start_index = 0
-        end_index = len(self.image_files)
+        # 高亮框只创建一次，翻页时移动位置
+        self._update_continuous_highlight()
         
-        # 清空之前的图片引用
-        if hasattr(self, 'continuous_photos'):
-            self.continuous_photos.clear()
+        # 滚动到当前图片位置并渲染可见部分（布局未变化时已渲染的页面原样保留）
+        self.scroll_to_current_image()
+        if changed:
+            self._rerender_continuous_pages()
         else:
-            self.continuous_photos = []
+            self._render_visible_pages()
+        
+    # 连续模式的画布图层
+    CONTINUOUS_LAYERS = ("continuous_page", "slice", "page_number", "separator", "highlight")
+    SCRUB_LAYERS = ("scrub_preview", "scrub_time")
+    
+    def _show_layers(self, *layers):
+        """只保留指定图层的画布项目，离开连续模式时丢弃已渲染的连续页面"""
+        if "page" not in layers and not self.is_fullscreen:
+            self._pending_final = None
+            self._render_timing = None
+        if "tile" not in layers:
+            self._tile_path = self._tile_grid = None
+            self._tile_photos = {}
+            self._tile_wanted = set()
+            self.tile_renderer.cancel()
+        if "continuous_page" not in layers:
+            self._continuous_ready = False
+            self.continuous_items = {}
+            self.continuous_slices = {}
+            self._scene_layout = None
+        self.display_scene.keep_layers(*layers)
+        
+    def _show_render_stats(self, new_navigation=False):
+        """在状态栏显示本次翻页以来画布项目的创建、删除和修改数，以及首帧和最终质量的耗时"""
+        counts = self.display_scene.take_counts()
+        if not new_navigation:
+            counts = tuple(total + count for total, count in zip(self._scene_counts, counts))
+        self._scene_counts = counts
+        created, deleted, updated = counts
+        text = f"画布项目 +{created} -{deleted} ~{updated}"
+        if self._render_timing is not None:
+            first, final = self._render_timing
+            text += f" | 首帧 {first:.0f}ms 最终 " + (f"{final:.0f}ms" if final is not None else "...")
+        self.render_stats_label.config(text=text)
+        
+    def _get_page_layout(self):
+        """获取当前文件列表的页面布局表（按文件列表缓存最近使用的几个目录）"""
+        if self.page_layout is not None and self.page_layout.image_files == self.image_files:
+            return self.page_layout
+            
+        key = tuple(self.image_files)
+        layout = self._page_layouts.pop(key, None)
+        if layout is None:
+            # 索引中已有尺寸的图片（以及增量刷新前已读取的尺寸）不需要读取文件头
+            index = self._index_for(self.current_directory)
+            known_sizes = index.dimensions(self.image_files) if index is not None else {}
+            known_sizes.update(self._layout_size_hints)
+            self._layout_size_hints = {}
+            layout = PageLayout(self.image_files, known_sizes=known_sizes)
+        self._page_layouts[key] = layout
+        while len(self._page_layouts) > 8:
+            self._page_layouts.popitem(last=False)
+        self.page_layout = layout
+        return layout
+        
+    def _on_display_configure(self, event):
+        """画布尺寸变化时安排连续模式重新布局，分块显示时补充可见图块"""
+        if self._tile_grid is not None:
+            self.tile_renderer.set_viewport(event.width, event.height)
+            self._schedule_tile_update()
+            return
+        if not self._continuous_ready or event.width == self.page_layout.canvas_width:
+            return
+        if self._relayout_pending is not None:
+            self.root.after_cancel(self._relayout_pending)
+        self._relayout_pending = self.root.after(100, self._relayout_continuous)
+        
+    def _relayout_continuous(self):
+        """按新的画布宽度重新布局，保持当前阅读位置"""
+        self._relayout_pending = None
+        if not self._continuous_ready:
+            return
+            
+        layout = self.page_layout
+        canvas_width = self.display_canvas.winfo_width()
+        
+        # 记录顶部所在页面及页内相对位置
+        top = self.display_canvas.canvasy(0)
+        top_index = layout.page_at(top)
+        top_height = layout.extent(top_index)[1]
+        fraction = (top - layout.position(top_index)) / top_height if top_height else 0.0
+        
+        if not layout.relayout(canvas_width):
+            return
             
-        # 记录每张图片的位置，用于滚动定位
-        self.image_positions = {}
+        self.display_canvas.configure(scrollregion=(0, 0, canvas_width, layout.total_height))
+        self._update_continuous_highlight()
+        
+        if layout.total_height > 0:
+            new_top = layout.position(top_index) + fraction * layout.extent(top_index)[1]
+            self.display_canvas.yview_moveto(new_top / layout.total_height)
+        # 已渲染的图片尺寸失效
+        self._rerender_continuous_pages()
+        
+    def _rerender_continuous_pages(self):
+        """布局变化后重新渲染可见页面：沿用的画布项目只修改位置和图片，其余删除"""
+        stale = set(self.continuous_items)
+        self.continuous_items = {}
+        for i in list(self.continuous_slices):
+            self._release_slices(i)
+        self._render_visible_pages()
+        for i in stale.difference(self.continuous_items):
+            self.display_scene.remove(*self._continuous_keys(i))
+        self._show_render_stats()
+        
+    def _on_display_yscroll(self, first, last):
+        """画布纵向滚动回调，同步滚动条并安排渲染可见图片"""
+        self.display_scrollbar_v.set(first, last)
+        if self._continuous_ready and self._continuous_render_pending is None:
+            self._continuous_render_pending = self.root.after_idle(self._render_visible_pages)
+        self._schedule_tile_update()
+        
+    def _on_display_xscroll(self, first, last):
+        """画布横向滚动回调，同步滚动条并安排加载可见图块"""
+        self.display_scrollbar_h.set(first, last)
+        self._schedule_tile_update()
+            
+    def _render_visible_pages(self):
+        """渲染可见区域附近的图片，释放远离可见区域的图片"""
+        self._continuous_render_pending = None
+        if not self._continuous_ready:
+            return
             
-        for i in range(start_index, end_index):
-            try:
-                # 记录当前图片的Y位置
-                self.image_positions[i] = y_offset
-                
-                img = Image.open(self.image_files[i])
-                img_width, img_height = img.size
-                
-                # 按宽度缩放
-                scale = (canvas_width * 0.95) / img_width
-                new_width = int(img_width * scale)
-                new_height = int(img_height * scale)
-                
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-                
-                # 添加到画布
-                x = (canvas_width - new_width) // 2
-                self.display_canvas.create_image(x, y_offset, anchor="nw", image=photo)
+        layout = self.page_layout
+        canvas_height = max(self.display_canvas.winfo_height(), 1)
+        top = self.display_canvas.canvasy(0)
+        bottom = top + canvas_height
+        
+        # 释放超出保留范围的图片
+        keep_first, keep_last = layout.page_range(
+            top - canvas_height * self.continuous_release,
+            bottom + canvas_height * self.continuous_release
+        )
+        for i in list(self.continuous_items):
+            if i < keep_first or i > keep_last:
+                self._release_continuous_page(i)
                 
-                # 保存引用
-                self.continuous_photos.append(photo)
+        # 渲染可见区域及上下边距内的图片
+        first, last = layout.page_range(
+            top - canvas_height * self.continuous_margin,
+            bottom + canvas_height * self.continuous_margin
+        )
+        for i in range(first, last + 1):
+            if i not in self.continuous_items:
+                self._materialize_continuous_page(i)
                 
-                # 添加图片序号标识
-                self.display_canvas.create_text(
-                    10, y_offset + 10, 
-                    text=f"{i+1}", 
-                    fill="white", 
-                    font=("Arial", 12, "bold"),
-                    anchor="nw"
+        # 超长图片只保留可见区域附近的分片
+        for i in list(self.continuous_slices):
+            if i < first or i > last:
+                self._release_slices(i)
+        margin = canvas_height * (self.continuous_margin + 1)
+        for i in range(first, last + 1):
+            if self._is_tall_page(i):
+                self._render_page_slices(
+                    i,
+                    top - canvas_height * self.continuous_margin, bottom + canvas_height * self.continuous_margin,
+                    top - margin, bottom + margin
                 )
                 
-                # 高亮当前图片
-                if i == self.current_index:
-                    self.display_canvas.create_rectangle(
-                        x-2, y_offset-2, x+new_width+2, y_offset+new_height+2,
-                        outline="red", width=3
-                    )
-                
-                y_offset += new_height
-                
-                # 添加分隔线
-                if i < end_index - 1:
-                    y_offset += 10
-                    self.display_canvas.create_line(
-                        0, y_offset - 5, canvas_width, y_offset - 5, 
-                        fill="gray", width=2
-                    )
-                    
+        self.display_canvas.tag_raise("page_number")
+        self.display_canvas.tag_raise("highlight")
+        self._show_render_stats()
+        
+    def _materialize_continuous_page(self, i):
+        """解码、缩放并在画布上创建一张连续模式图片"""
+        layout = self.page_layout
+        placement = self.render_engine.continuous_placement(layout, i)
+        if placement.width <= 0 or placement.height <= 0:
+            return
+            
+        canvas_width = layout.canvas_width
+        y_offset = placement.y
+        scene = self.display_scene
+        
+        if self._is_tall_page(i):
+            # 超长图片不整张缩放，图片内容由分片显示
+            photo = None
+            scene.remove(("continuous_page", i))
+        else:
+            try:
+                img = self.render_engine.render(self.image_files[i], (placement.width, placement.height),
+                                                keep_original=False)
+                photo = ImageTk.PhotoImage(img)
             except Exception as e:
                 print(f"连续模式显示图片失败: {self.image_files[i]}, {str(e)}")
-                
-        # 更新滚动区域
-        self.display_canvas.configure(scrollregion=(0, 0, canvas_width, y_offset))
+                return
+            scene.image(("continuous_page", i), placement.x, y_offset, anchor="nw", image=photo)
+        
+        # 添加图片序号标识
+        scene.text(
+            ("page_number", i), 10, y_offset + 10, 
+            text=f"{i+1}", 
+            fill="white", 
+            font=("Arial", 12, "bold"),
+            anchor="nw",
+            tags="page_number"
+        )
         
-        # 滚动到当前图片位置
-        self.scroll_to_current_image()
+        # 添加分隔线
+        if i < len(self.image_files) - 1:
+            scene.line(
+                ("separator", i),
+                0, y_offset + placement.height + 5, canvas_width, y_offset + placement.height + 5, 
+                fill="gray", width=2
+            )
+        else:
+            scene.remove(("separator", i))
+            
+        # 保存引用
+        self.continuous_items[i] = photo
+        
+    @staticmethod
+    def _continuous_keys(i):
+        """一张连续模式图片的画布项目键"""
+        return ("continuous_page", i), ("page_number", i), ("separator", i)
+        
+    def _release_continuous_page(self, i):
+        """释放一张连续模式图片的画布项目和图片引用"""
+        del self.continuous_items[i]
+        self.display_scene.remove(*self._continuous_keys(i))
+        self._release_slices(i)
+        
+    def _is_tall_page(self, i):
+        return self.render_engine.is_tall_page(self.page_layout, i)
+        
+    def _render_page_slices(self, i, render_top, render_bottom, keep_top, keep_bottom):
+        """显示超长图片与渲染范围相交的分片，释放保留范围以外的分片
+        
+        按显示宽度选择金字塔层级，每个分片单独缩放；金字塔不存在时在后台生成，完成后再显示。
+        """
+        pyramid = self._get_slice_pyramid(self.image_files[i])
+        if pyramid is None:
+            return
+        engine = self.render_engine
+        placement = engine.continuous_placement(self.page_layout, i)
+        
+        slices = self.continuous_slices.setdefault(i, {})
+        keep = engine.slices_in(pyramid, placement, keep_top, keep_bottom)
+        for j in list(slices):
+            if j not in keep:
+                del slices[j]
+                self.display_scene.remove(("slice", i, j))
+                
+        for j in engine.slices_in(pyramid, placement, render_top, render_bottom):
+            if j in slices:
+                continue
+            try:
+                rendered = engine.render_slice(pyramid, placement, j)
+            except Exception as e:
+                print(f"读取分片失败: {self.image_files[i]}, {j}, {str(e)}")
+                continue
+            if rendered is None:
+                continue
+            slices[j] = ImageTk.PhotoImage(rendered.image)
+            self.display_scene.image(("slice", i, j), rendered.placement.x, rendered.placement.y,
+                                     anchor="nw", image=slices[j])
+            
+    def _release_slices(self, i):
+        for j in self.continuous_slices.pop(i, {}):
+            self.display_scene.remove(("slice", i, j))
+            
+    def _get_slice_pyramid(self, path):
+        """已打开的分片金字塔，没有时在后台打开或生成并返回None"""
+        pyramid = self.slice_pyramids.get(path)
+        if pyramid is not None:
+            self.slice_pyramids.move_to_end(path)
+            return pyramid
+        if path in self._slice_failed:
+            if self._slice_failed[path] == self._file_mtime(path):
+                return None
+            del self._slice_failed[path]
+        if path not in self._slicing:
+            self._slicing.add(path)
+            threading.Thread(target=self._load_slice_pyramid, args=(path,), daemon=True).start()
+        return None
+        
+    def _load_slice_pyramid(self, path):
+        """后台线程：打开金字塔，不存在或已失效时生成"""
+        failed = None
+        try:
+            pyramid = SlicePyramid.open(path) or SlicePyramid.build(path)
+        except Exception as e:
+            print(f"生成分片失败: {path}, {str(e)}")
+            pyramid = None
+            failed = self._file_mtime(path)
+        try:
+            self.root.after(0, self._on_slice_pyramid_ready, path, pyramid, failed)
+        except RuntimeError:
+            # 主窗口已关闭
+            pass
+            
+    def _on_slice_pyramid_ready(self, path, pyramid, failed=None):
+        """界面线程：保存金字塔并显示可见的分片，生成失败时记录文件的修改时间"""
+        self._slicing.discard(path)
+        if pyramid is None:
+            self._slice_failed[path] = failed
+            return
+        self.slice_pyramids[path] = pyramid
+        while len(self.slice_pyramids) > 8:
+            self._close_slice_pyramid(next(iter(self.slice_pyramids)))
+        if self._continuous_ready:
+            self._render_visible_pages()
+            
+    @staticmethod
+    def _file_mtime(path):
+        """文件（或压缩包成员）的修改时间，无法访问时返回None"""
+        try:
+            return archives.stat(path).st_mtime_ns
+        except (OSError, KeyError):
+            return None
+            
+    def _close_slice_pyramid(self, path):
+        """关闭金字塔（分片只在界面线程中读取，可以直接关闭）"""
+        pyramid = self.slice_pyramids.pop(path, None)
+        if pyramid is not None:
+            pyramid.close()
+            
+    def _update_continuous_highlight(self):
+        """移动高亮框到当前图片"""
+        if not self._continuous_ready:
+            return
+        layout = self.page_layout
+        if self.current_index >= len(layout):
+            coords = (0, 0, 0, 0)
+        else:
+            x, y_offset, new_width, new_height = self.render_engine.continuous_placement(layout, self.current_index)
+            coords = (x-2, y_offset-2, x+new_width+2, y_offset+new_height+2)
+        self.display_scene.rectangle("highlight", *coords, outline="red", width=3, tags="highlight")
         
     def scroll_to_current_image(self):
         """滚动到当前图片位置"""
-        if hasattr(self, 'image_positions') and self.current_index in self.image_positions:
-            # 获取当前图片的Y位置
-            current_y = self.image_positions[self.current_index]
-            
-            # 获取滚动区域的总高度
-            scroll_region = self.display_canvas.cget('scrollregion')
-            if scroll_region:
-                total_height = float(scroll_region.split()[3])
-                if total_height > 0:
-                    # 计算滚动比例
-                    scroll_ratio = current_y / total_height
-                    # 滚动到该位置
-                    self.display_canvas.yview_moveto(scroll_ratio)
+        layout = self.page_layout
+        if layout is None or not self._continuous_ready or self.current_index >= len(layout):
+            return
+        if layout.total_height > 0:
+            # 直接按布局表计算滚动比例
+            scroll_ratio = layout.position(self.current_index) / layout.total_height
+            self.display_canvas.yview_moveto(scroll_ratio)
         
     def display_video_thumbnail(self, video_path):
-        """显示视频缩略图"""
+        """显示视频封面（缓存中没有时先显示占位符，封面在后台生成后替换）"""
         canvas_width = self.display_canvas.winfo_width()
         canvas_height = self.display_canvas.winfo_height()
         
-        if CV2_AVAILABLE:
-            try:
-                cap = cv2.VideoCapture(video_path)
-                ret, frame = cap.read()
-                cap.release()
-                
-                if ret:
-                    # 转换颜色格式
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    img = Image.fromarray(frame)
-                    
-                    # 缩放图片
-                    if canvas_width > 1 and canvas_height > 1:
-                        img_width, img_height = img.size
-                        scale_x = canvas_width / img_width
-                        scale_y = canvas_height / img_height
-                        scale = min(scale_x, scale_y, 1.0)
-                        
-                        new_width = int(img_width * scale)
-                        new_height = int(img_height * scale)
-                        
-                        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    
-                    self.current_photo = ImageTk.PhotoImage(img)
-                    
-                    # 显示缩略图
-                    x = (canvas_width - img.width) // 2 if canvas_width > img.width else 0
-                    y = (canvas_height - img.height) // 2 if canvas_height > img.height else 0
-                    
-                    self.display_canvas.create_image(x, y, anchor="nw", image=self.current_photo)
-                else:
-                    self._show_video_placeholder(canvas_width, canvas_height, video_path)
-                    
-            except Exception as e:
-                print(f"显示视频缩略图失败: {str(e)}")
-                self._show_video_placeholder(canvas_width, canvas_height, video_path)
+        poster = self.poster_frames.get_cached(video_path) if CV2_AVAILABLE else None
+        if poster is not None:
+            self._show_video_poster(poster)
         else:
             self._show_video_placeholder(canvas_width, canvas_height, video_path)
-            
-        # 添加播放按钮提示
-        self.display_canvas.create_text(
-            canvas_width // 2, canvas_height - 50,
+            if CV2_AVAILABLE:
+                self.poster_frames.request(video_path, self._on_poster_ready)
+                
+    def _show_video_hint(self, canvas_width, canvas_height):
+        """添加播放按钮提示"""
+        self.display_scene.text(
+            "video_hint", canvas_width // 2, canvas_height - 50,
             text="点击'播放视频'按钮观看" if CV2_AVAILABLE else "需要安装OpenCV才能播放视频", 
             fill="white", font=("Arial", 16)
         )
         
+    def _on_poster_ready(self, video_path, poster):
+        """封面生成完成（界面线程）：仍停留在该视频且未开始播放时显示"""
+        if poster is None or self.is_playing_video or self.is_fullscreen:
+            return
+        video_index = self.current_index - len(self.image_files)
+        if 0 <= video_index < len(self.video_files) and self.video_files[video_index] == video_path:
+            self._show_video_poster(poster)
+            
+    def _show_video_poster(self, poster):
+        """把封面按画布尺寸缩小后居中显示"""
+        canvas_width = self.display_canvas.winfo_width()
+        canvas_height = self.display_canvas.winfo_height()
+        img = poster
+        if canvas_width > 1 and canvas_height > 1:
+            scale = min(canvas_width / img.width, canvas_height / img.height, 1.0)
+            if scale < 1.0:
+                img = img.resize((max(int(img.width * scale), 1), max(int(img.height * scale), 1)),
+                                 Image.Resampling.LANCZOS)
+        self.current_photo = ImageTk.PhotoImage(img)
+        
+        x = (canvas_width - img.width) // 2 if canvas_width > img.width else 0
+        y = (canvas_height - img.height) // 2 if canvas_height > img.height else 0
+        self._show_layers("video_frame", "video_hint", *self.SCRUB_LAYERS)
+        self.display_scene.image("video_frame", x, y, anchor="nw", image=self.current_photo)
+        self._show_video_hint(canvas_width, canvas_height)
+        
     def _show_video_placeholder(self, canvas_width, canvas_height, video_path):
         """显示视频占位符"""
-        # 清除画布
-        self.display_canvas.delete("all")
+        self._show_layers("video_box", "video_icon", "video_name", "video_hint", *self.SCRUB_LAYERS)
+        self._show_video_hint(canvas_width, canvas_height)
         
         # 创建一个简单的视频图标
-        self.display_canvas.create_rectangle(
-            canvas_width//4, canvas_height//4, 
+        self.display_scene.rectangle(
+            "video_box", canvas_width//4, canvas_height//4, 
             3*canvas_width//4, 3*canvas_height//4,
             fill="gray", outline="white", width=2
         )
@@ -762,8 +1646,8 @@ class EnhancedMangaReader:
         # 播放按钮图标
         center_x, center_y = canvas_width//2, canvas_height//2
         triangle_size = 30
-        self.display_canvas.create_polygon(
-            center_x - triangle_size//2, center_y - triangle_size//2,
+        self.display_scene.polygon(
+            "video_icon", center_x - triangle_size//2, center_y - triangle_size//2,
             center_x - triangle_size//2, center_y + triangle_size//2,
             center_x + triangle_size//2, center_y,
             fill="white"
@@ -771,8 +1655,8 @@ class EnhancedMangaReader:
         
         # 文件名
         filename = os.path.basename(video_path)
-        self.display_canvas.create_text(
-            canvas_width // 2, canvas_height // 2 + 60,
+        self.display_scene.text(
+            "video_name", canvas_width // 2, canvas_height // 2 + 60,
             text=filename, fill="white", font=("Arial", 12)
         )
         
@@ -782,8 +1666,6 @@ class EnhancedMangaReader:
         
     def update_reading_mode(self):
         """更新阅读模式"""
-        if hasattr(self, 'continuous_photos'):
-            self.continuous_photos = []
         self.display_current_item()
         
     def toggle_fullscreen(self):
@@ -809,6 +1691,16 @@ class EnhancedMangaReader:
             self.fullscreen_canvas.config(highlightthickness=0)
             self.root.bind("<Key>", self.on_key_press)
             
+            # 图片和信息文字各一个画布项目，翻页时只修改内容
+            screen_width = self.root.winfo_screenwidth()
+            screen_height = self.root.winfo_screenheight()
+            self.fullscreen_image_item = self.fullscreen_canvas.create_image(
+                screen_width // 2, screen_height // 2, anchor="center"
+            )
+            self.fullscreen_info_item = self.fullscreen_canvas.create_text(
+                screen_width // 2, screen_height - 30, fill="white", font=("Arial", 14)
+            )
+            
             # 显示当前图片
             self.display_fullscreen_image()
         else:
@@ -818,6 +1710,7 @@ class EnhancedMangaReader:
         """退出全屏模式"""
         if self.is_fullscreen:
             self.is_fullscreen = False
+            self._pending_final = None
             self.root.attributes('-fullscreen', False)
             
             # 解绑全屏模式的键盘事件
@@ -838,7 +1731,7 @@ class EnhancedMangaReader:
             self.display_current_item()
             
     def display_fullscreen_image(self):
-        """全屏显示图片"""
+        """全屏显示图片（使用预取好的屏幕尺寸位图，只更新已有的画布项目）"""
         if not hasattr(self, 'fullscreen_canvas'):
             return
             
@@ -846,49 +1739,31 @@ class EnhancedMangaReader:
         if self.current_index >= len(self.image_files):
             return
             
+        image_path = self.image_files[self.current_index]
+        
+        def show(photo):
+            if self.is_fullscreen:
+                self.fullscreen_photo = photo
+                self.fullscreen_canvas.itemconfigure(self.fullscreen_image_item, image=photo)
+                
         try:
-            # 重新加载当前图片
-            self.original_image = Image.open(self.image_files[self.current_index])
+            # 按屏幕尺寸等比缩放
+            plan = self.render_engine.plan_fullscreen(
+                image_path, (self.root.winfo_screenwidth(), self.root.winfo_screenheight())
+            )
+            preview = self._present_page(image_path, plan.size, show)
         except Exception as e:
             print(f"加载图片失败: {str(e)}")
             return
             
-        # 清除画布
-        self.fullscreen_canvas.delete("all")
-        
-        # 获取屏幕尺寸
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
-        
-        # 高质量缩放到全屏
-        img = self.original_image.copy()
-        img_width, img_height = img.size
-        
-        scale_x = screen_width / img_width
-        scale_y = screen_height / img_height
-        scale = min(scale_x, scale_y)  # 保持比例
-        
-        new_width = int(img_width * scale)
-        new_height = int(img_height * scale)
-        
-        # 使用最高质量缩放
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        self.fullscreen_photo = ImageTk.PhotoImage(img)
-        
-        # 居中显示
-        x = (screen_width - new_width) // 2
-        y = (screen_height - new_height) // 2
-        
-        self.fullscreen_canvas.create_image(x, y, anchor="nw", image=self.fullscreen_photo)
-        
         # 显示图片信息
-        filename = os.path.basename(self.image_files[self.current_index])
+        filename = os.path.basename(image_path)
         info_text = f"{self.current_index + 1}/{len(self.image_files)} - {filename}"
-        self.fullscreen_canvas.create_text(
-            screen_width // 2, screen_height - 30,
-            text=info_text, fill="white", font=("Arial", 14)
-        )
+        self.fullscreen_canvas.itemconfigure(self.fullscreen_info_item, text=info_text)
+        
+        # 后台预取后续页面（屏幕尺寸，只显示了预览时先处理当前页）
+        self.prefetcher.update(self.image_files, self.current_index, plan.size_for, self._on_page_prefetched,
+                               include_current=preview)
         
     def on_fullscreen_click(self, event):
         """全屏模式点击事件"""
@@ -914,8 +1789,8 @@ class EnhancedMangaReader:
                 else:
                     self.play_video(self.video_files[video_index])
                     
-    def play_video(self, video_path):
-        """播放视频"""
+    def play_video(self, video_path, start=0.0):
+        """播放视频（从 start 秒开始）"""
         if not CV2_AVAILABLE:
             messagebox.showwarning("警告", "需要安装OpenCV才能播放视频")
             return
@@ -923,73 +1798,166 @@ class EnhancedMangaReader:
         try:
             self.stop_video()  # 停止当前播放
             
-            self.video_cap = cv2.VideoCapture(video_path)
+            # 解码线程按画布尺寸缩放，界面线程按时钟显示
+            self.video_player = VideoPlayer(
+                self.root, video_path, self._on_video_frame, self.stop_video,
+                (self.display_canvas.winfo_width(), self.display_canvas.winfo_height()),
+                start=start, index=self.video_indexes.get(video_path)
+            )
             self.is_playing_video = True
             self.play_button.config(text="停止视频")
-            
-            # 启动视频播放线程
-            self.video_thread = threading.Thread(target=self._play_video_thread)
-            self.video_thread.daemon = True
-            self.video_thread.start()
+            self.video_player.start()
             
         except Exception as e:
             messagebox.showerror("错误", f"播放视频失败: {str(e)}")
             
-    def _play_video_thread(self):
-        """视频播放线程"""
-        if not CV2_AVAILABLE or not self.video_cap:
-            return
-            
-        fps = self.video_cap.get(cv2.CAP_PROP_FPS)
-        delay = 1.0 / fps if fps > 0 else 1.0 / 30
+    def _on_video_frame(self, img):
+        """显示一帧视频（界面线程），尺寸不变时直接更新已有的位图"""
+        canvas_width = self.display_canvas.winfo_width()
+        canvas_height = self.display_canvas.winfo_height()
+        self.video_player.target_size = (canvas_width, canvas_height)
         
-        while self.is_playing_video and self.video_cap.isOpened():
-            ret, frame = self.video_cap.read()
-            if not ret:
-                break
-                
-            # 转换颜色格式
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame)
-            
-            # 缩放图片
-            canvas_width = self.display_canvas.winfo_width()
-            canvas_height = self.display_canvas.winfo_height()
-            
-            if canvas_width > 1 and canvas_height > 1:
-                img_width, img_height = img.size
-                scale_x = canvas_width / img_width
-                scale_y = canvas_height / img_height
-                scale = min(scale_x, scale_y, 1.0)
-                
-                new_width = int(img_width * scale)
-                new_height = int(img_height * scale)
-                
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # 更新显示
-            self.current_photo = ImageTk.PhotoImage(img)
-            
-            def update_frame():
-                if self.is_playing_video:
-                    self.display_canvas.delete("all")
-                    x = (canvas_width - img.width) // 2 if canvas_width > img.width else 0
-                    y = (canvas_height - img.height) // 2 if canvas_height > img.height else 0
-                    self.display_canvas.create_image(x, y, anchor="nw", image=self.current_photo)
-            
-            self.root.after(0, update_frame)
-            time.sleep(delay)
+        photo = self.video_photo
+        if photo is not None and (photo.width(), photo.height()) == img.size:
+            photo.paste(img)
+        else:
+            photo = self.video_photo = ImageTk.PhotoImage(img)
+            
+        x = (canvas_width - img.width) // 2 if canvas_width > img.width else 0
+        y = (canvas_height - img.height) // 2 if canvas_height > img.height else 0
+        # 播放时只保留一个图片项目（和拖动预览）
+        self._show_layers("video_frame", *self.SCRUB_LAYERS)
+        self.display_scene.image("video_frame", x, y, anchor="nw", image=photo)
+        self._update_seek_position(self.video_player.position)
+        
+        # 每半秒在状态栏显示实际帧率和丢帧数
+        now = time.monotonic()
+        if now - self._video_stats_time >= 0.5:
+            self._video_stats_time = now
+            player = self.video_player
+            self.render_stats_label.config(
+                text=f"视频 {player.effective_fps():.1f}/{player.fps:.0f} fps | 丢帧 {player.dropped}"
+            )
             
-        self.stop_video()
-        
     def stop_video(self):
         """停止视频播放"""
         self.is_playing_video = False
         self.play_button.config(text="播放视频")
         
-        if self.video_cap:
-            self.video_cap.release()
-            self.video_cap = None
+        if self.video_player is not None:
+            self.video_player.stop()
+            self.video_player = None
+        self.video_photo = None
+        
+    # 视频进度条
+    def _set_seek_video(self, video_path):
+        """切换进度条对应的视频，当前项目不是视频时隐藏进度条"""
+        if video_path is None or not CV2_AVAILABLE:
+            self.seek_video_path = None
+            self.seek_frame.pack_forget()
+            return
+        if video_path != self.seek_video_path:
+            self.seek_video_path = video_path
+            self._update_seek_position(0.0)
+        self.seek_frame.pack(side=tk.BOTTOM, fill=tk.X, before=self.display_canvas)
+        if self.video_indexes.get(video_path) is None:
+            self.video_indexes.request(video_path, self._on_video_index_ready)
+            
+    def _on_video_index_ready(self, video_path, index):
+        """视频索引就绪（界面线程）：正在播放的视频之后的跳转使用关键帧索引"""
+        if index is None or video_path != self.seek_video_path:
+            return
+        if self.video_player is not None:
+            self.video_player.index = index
+            self._update_seek_position(self.video_player.position)
+        else:
+            self._update_seek_position(self.seek_scale.get())
+            
+    def _seek_duration(self):
+        """进度条对应视频的时长（秒），未知时为0"""
+        index = self.video_indexes.get(self.seek_video_path) if self.seek_video_path else None
+        if index is not None and index.duration > 0:
+            return index.duration
+        if self.video_player is not None:
+            return self.video_player.duration
+        return 0.0
+        
+    def _update_seek_position(self, seconds):
+        """把进度条和时间标签移动到指定时间（拖动时不跟随播放）"""
+        duration = self._seek_duration()
+        if duration > 0 and duration != self._seek_range:
+            self._seek_range = duration
+            self.seek_scale.configure(to=duration)
+        if self._seek_dragging:
+            return
+        self.seek_scale.set(min(seconds, duration) if duration > 0 else 0)
+        total = format_time(duration) if duration > 0 else "--:--"
+        self.seek_time_label.config(text=f"{format_time(seconds)} / {total}")
+        
+    def _seek_time_at(self, event):
+        """鼠标在进度条上的位置比例和对应的时间"""
+        fraction = min(max(event.x / max(self.seek_scale.winfo_width(), 1), 0.0), 1.0)
+        return fraction, fraction * self._seek_duration()
+        
+    def _on_seek_hover(self, event):
+        if self.seek_video_path is not None and not self._seek_dragging:
+            self._show_scrub_preview(*self._seek_time_at(event))
+            
+    def _on_seek_leave(self, event):
+        if not self._seek_dragging:
+            self.display_scene.remove(*self.SCRUB_LAYERS)
+            
+    def _on_seek_drag(self, event):
+        """按下或拖动：滑块跟随鼠标并显示预览图，松开时才跳转"""
+        if self.seek_video_path is None:
+            return "break"
+        fraction, seconds = self._seek_time_at(event)
+        self._update_seek_position(seconds)
+        self._seek_dragging = True
+        self._show_scrub_preview(fraction, seconds)
+        return "break"
+        
+    def _on_seek_release(self, event):
+        """松开：跳转到对应时间（未播放时从该时间开始播放）"""
+        if self.seek_video_path is None or not self._seek_dragging:
+            return "break"
+        self._seek_dragging = False
+        self.display_scene.remove(*self.SCRUB_LAYERS)
+        _, seconds = self._seek_time_at(event)
+        if self.video_player is not None:
+            self.video_player.seek(seconds)
+        else:
+            self.play_video(self.seek_video_path, start=seconds)
+        self._update_seek_position(seconds)
+        return "break"
+        
+    def _show_scrub_preview(self, fraction, seconds):
+        """在画布底部显示预览图集中最接近的小图和时间（不解码视频）"""
+        canvas_width = self.display_canvas.winfo_width()
+        canvas_height = self.display_canvas.winfo_height()
+        x = int(fraction * canvas_width)
+        y = canvas_height - 10
+        
+        index = self.video_indexes.get(self.seek_video_path)
+        preview = index.preview(seconds) if index is not None else None
+        if preview is not None:
+            img = preview[0]
+            photo = self._scrub_photo
+            if photo is not None and (photo.width(), photo.height()) == img.size:
+                photo.paste(img)
+            else:
+                photo = self._scrub_photo = ImageTk.PhotoImage(img)
+            left = min(max(x - img.width // 2, 0), max(canvas_width - img.width, 0))
+            item = self.display_scene.image("scrub_preview", left, y - 20 - img.height, anchor="nw", image=photo)
+            self.display_canvas.tag_raise(item)
+        else:
+            self.display_scene.remove("scrub_preview")
+            
+        item = self.display_scene.text(
+            "scrub_time", x, y, text=format_time(seconds), anchor="s",
+            fill="white", font=("Arial", 12)
+        )
+        self.display_canvas.tag_raise(item)
             
     # 导航方法
     def previous_image(self):
@@ -1005,16 +1973,14 @@ class EnhancedMangaReader:
                     self.exit_fullscreen()
                     self.display_current_item()
             else:
-                # 在连续阅读模式下，只需要滚动到对应位置
-                if self.reading_mode.get() == "continuous":
+                # 在连续阅读模式下，只需要滚动到对应位置并移动高亮框
+                if self._continuous_ready and self.current_index < len(self.image_files):
                     self.scroll_to_current_image()
-                    # 重新绘制以更新高亮
-                    self.display_current_item()
+                    self._update_continuous_highlight()
                 else:
                     self.display_current_item()
             self.update_status()
-            if not self.is_fullscreen:
-                self.update_thumbnails()
+            self.thumbnail_strip.set_current(self.current_index)
             
     def next_image(self):
         """下一张"""
@@ -1030,49 +1996,53 @@ class EnhancedMangaReader:
                     self.exit_fullscreen()
                     self.display_current_item()
             else:
-                # 在连续阅读模式下，只需要滚动到对应位置
-                if self.reading_mode.get() == "continuous":
+                # 在连续阅读模式下，只需要滚动到对应位置并移动高亮框
+                if self._continuous_ready and self.current_index < len(self.image_files):
                     self.scroll_to_current_image()
-                    # 重新绘制以更新高亮
-                    self.display_current_item()
+                    self._update_continuous_highlight()
                 else:
                     self.display_current_item()
             self.update_status()
-            if not self.is_fullscreen:
-                self.update_thumbnails()
+            self.thumbnail_strip.set_current(self.current_index)
             
     def first_image(self):
         """第一张"""
         if self.image_files or self.video_files:
             self.current_index = 0
+            self.prefetcher.cancel()
             if self.is_fullscreen:
                 if self.current_index < len(self.image_files):
                     self.display_fullscreen_image()
                 else:
                     self.exit_fullscreen()
                     self.display_current_item()
+            elif self._continuous_ready and self.current_index < len(self.image_files):
+                self.scroll_to_current_image()
+                self._update_continuous_highlight()
             else:
                 self.display_current_item()
             self.update_status()
-            if not self.is_fullscreen:
-                self.update_thumbnails()
+            self.thumbnail_strip.set_current(self.current_index)
             
     def last_image(self):
         """最后一张"""
         total_items = len(self.image_files) + len(self.video_files)
         if total_items > 0:
             self.current_index = total_items - 1
+            self.prefetcher.cancel()
             if self.is_fullscreen:
                 if self.current_index < len(self.image_files):
                     self.display_fullscreen_image()
                 else:
                     self.exit_fullscreen()
                     self.display_current_item()
+            elif self._continuous_ready and self.current_index < len(self.image_files):
+                self.scroll_to_current_image()
+                self._update_continuous_highlight()
             else:
                 self.display_current_item()
             self.update_status()
-            if not self.is_fullscreen:
-                self.update_thumbnails()
+            self.thumbnail_strip.set_current(self.current_index)
             
     # 缩放方法
     def zoom_in(self):
@@ -1101,6 +2071,7 @@ class EnhancedMangaReader:
             
     def update_status(self):
         """更新状态信息"""
+        self._show_render_stats(new_navigation=True)
         total_items = len(self.image_files) + len(self.video_files)
         if total_items > 0:
             current_type = "图片" if self.current_index < len(self.image_files) else "视频"
@@ -1195,6 +2166,13 @@ class EnhancedMangaReader:
     def __del__(self):
         """析构函数"""
         self.stop_video()
+        self._watch_directory(None)
+        self._cancel_discovery()
+        self.prefetcher.shutdown()
+        self.tile_renderer.shutdown()
+        self.poster_frames.shutdown()
+        self.video_indexes.shutdown()
+        self.thumbnail_strip.shutdown()
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,190 @@
+"""
+预渲染章节包
+
+把一个章节（目录或压缩包）的所有页面按目标宽度缩放后写入一个文件，
+文件末尾是偏移索引。打开章节时内存映射该文件，翻页时只需解码一张
+已缩放的小图，不再解码原始大图和高质量缩放。
+
+索引记录每页源文件的大小和修改时间以及烘焙时的目标宽度：打开时源文件列表
+或任一文件变化则整个包失效（删除），之后单页变化时只有该页回退到源文件。
+包保存在缓存目录中，每个章节一个。
+"""
+import io
+import json
+import mmap
+import os
+import struct
+
+from PIL import Image
+
+import archives
+from cache_paths import cache_dir, library_key
+from image_decode import open_reduced
+
+MAGIC = b"MRBNDL01"
+_TRAILER = struct.Struct("<Q8s")  # 索引偏移 + MAGIC
+
+
+class PageBundle:
+    """一个章节的预渲染包（只读，可在多个线程中读取）"""
+
+    def __init__(self, path, mapping, index):
+        self.path = path
+        self._map = mapping
+        self.directory = index["directory"]
+        self.target_width = index["target_width"]
+        self.pages = {page["path"]: page for page in index["pages"]}
+
+    @staticmethod
+    def path_for(directory):
+        """章节对应的包文件路径"""
+        return os.path.join(cache_dir("bundles"), library_key(directory) + ".bundle")
+
+    @classmethod
+    def open(cls, directory, image_files):
+        """打开章节的包并检查是否仍然有效，不存在或已失效时返回None（失效的包会被删除）"""
+        path = cls.path_for(directory)
+        try:
+            with open(path, "rb") as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            index_offset, magic = _TRAILER.unpack_from(mapping, len(mapping) - _TRAILER.size)
+            if mapping[:len(MAGIC)] != MAGIC or magic != MAGIC:
+                raise ValueError("文件头损坏")
+            index = json.loads(mapping[index_offset:len(mapping) - _TRAILER.size].decode("utf-8"))
+        except (struct.error, ValueError) as e:
+            print(f"章节包损坏: {path}, {str(e)}")
+            mapping.close()
+            cls.remove(directory)
+            return None
+
+        bundle = cls(path, mapping, index)
+        if not bundle._matches(directory, image_files):
+            mapping.close()
+            cls.remove(directory)
+            return None
+        return bundle
+
+    def _matches(self, directory, image_files):
+        """源文件列表和每个文件的大小、修改时间都与烘焙时相同"""
+        if self.directory != directory or len(self.pages) != len(image_files):
+            return False
+        for path in image_files:
+            page = self.pages.get(path)
+            if page is None:
+                return False
+            try:
+                st = archives.stat(path)
+            except OSError:
+                return False
+            if page["size"] != st.st_size or page["mtime_ns"] != st.st_mtime_ns:
+                return False
+        return True
+
+    @classmethod
+    def remove(cls, directory):
+        try:
+            os.remove(cls.path_for(directory))
+        except OSError:
+            pass
+
+    @classmethod
+    def bake(cls, directory, image_files, target_width, cancel=None, progress=None):
+        """按目标宽度烘焙章节，返回打开的包；取消时返回None
+
+        cancel() 返回True时中止；progress(已完成页数, 总页数) 每页调用一次。
+        先写入临时文件，完成后替换旧的包。
+        """
+        path = cls.path_for(directory)
+        temp_path = path + ".tmp"
+        pages = []
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(MAGIC)
+                for done, source in enumerate(image_files):
+                    if cancel is not None and cancel():
+                        f.close()
+                        os.remove(temp_path)
+                        return None
+                    page = {"path": source, "size": -1, "mtime_ns": -1, "offset": 0, "length": 0,
+                            "width": 0, "height": 0, "full": False}
+                    data = None
+                    try:
+                        st = archives.stat(source)
+                        page["size"], page["mtime_ns"] = st.st_size, st.st_mtime_ns
+                        with archives.open_image(source) as header:
+                            width, height = header.size
+                        if width > target_width:
+                            size = (target_width, max(round(height * target_width / width), 1))
+                        else:
+                            size = (width, height)
+                        img = open_reduced(source, size, keep_aspect=False)
+                        data = cls._encode(img)
+                    except Exception as e:
+                        # 失败的页面也记录下来（没有数据），读取时回退到源文件
+                        print(f"烘焙页面失败: {source}, {str(e)}")
+                    if data is not None:
+                        # 写入包文件的错误不按单页失败处理，整个烘焙失败
+                        page.update({
+                            "offset": f.tell(),
+                            "length": len(data),
+                            "width": img.width,
+                            "height": img.height,
+                            # 源图片不比目标宽度宽时保存的是原始尺寸，任何宽度都可以使用
+                            "full": width <= target_width,
+                        })
+                        f.write(data)
+                    pages.append(page)
+                    if progress is not None:
+                        progress(done + 1, len(image_files))
+
+                index_offset = f.tell()
+                index = {"directory": directory, "target_width": target_width, "pages": pages}
+                f.write(json.dumps(index, ensure_ascii=False).encode("utf-8"))
+                f.write(_TRAILER.pack(index_offset, MAGIC))
+        except BaseException:
+            # 写入失败或被中断时不留下临时文件
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        os.replace(temp_path, path)
+        return cls.open(directory, image_files)
+
+    @staticmethod
+    def _encode(img):
+        """有透明通道的页面保存为PNG，其他保存为JPEG"""
+        buffer = io.BytesIO()
+        if img.mode in ("RGBA", "LA"):
+            img.save(buffer, "PNG")
+        else:
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            img.save(buffer, "JPEG", quality=92)
+        return buffer.getvalue()
+
+    def load(self, path, mtime_ns, width):
+        """读取某页的预渲染图片
+
+        页面不在包中、源文件已变化、或需要的宽度超过烘焙宽度时返回None。
+        """
+        page = self.pages.get(path)
+        if page is None or not page["length"] or page["mtime_ns"] != mtime_ns:
+            return None
+        if width > page["width"] and not page["full"]:
+            return None
+        offset = page["offset"]
+        try:
+            data = self._map[offset:offset + page["length"]]
+        except ValueError:
+            return None  # 包已关闭（切换了章节或重新烘焙）
+        img = Image.open(io.BytesIO(data))
+        img.load()
+        return img
+
+    def close(self):
+        self._map.close()
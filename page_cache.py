@@ -0,0 +1,188 @@
+"""
+已解码/已缩放页面缓存
+
+按 (路径, 修改时间, 目标尺寸, 缩放滤镜) 缓存PIL图片，
+总内存超过预算时按最近最少使用（LRU）淘汰。
+翻页、连续、全屏模式共用同一个缓存，可在后台线程中使用。
+"""
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+import archives
+
+
+class PageCache:
+    """按内存预算淘汰的页面缓存"""
+
+    def __init__(self, budget_mb=512):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()  # key -> (image, nbytes)
+        self._sizes = {}  # (路径, 修改时间) -> 原始尺寸
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.bundle = None  # 当前章节的预渲染包
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _image_bytes(img):
+        """估算图片占用的内存字节数"""
+        return img.width * img.height * len(img.getbands())
+
+    @staticmethod
+    def _mtime(path):
+        return archives.stat(path).st_mtime_ns
+
+    def set_bundle(self, bundle):
+        """设置当前章节的预渲染包（None 取消），缩放页面时优先从包中读取"""
+        self.bundle = bundle
+
+    def set_budget(self, budget_mb):
+        """修改内存预算（MB），超出部分立即淘汰"""
+        with self._lock:
+            self.budget_bytes = int(budget_mb * 1024 * 1024)
+            self._evict_locked()
+
+    def get(self, key):
+        """查询缓存，命中时移到最近使用位置"""
+        return self._lookup(key, count=True)
+
+    def _lookup(self, key, count=False):
+        """查询缓存；count 为 False 时不计入命中统计（公开方法内部的附带查询）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def put(self, key, img):
+        """加入缓存，超出预算时淘汰最久未使用的条目"""
+        nbytes = self._image_bytes(img)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            if nbytes > self.budget_bytes:
+                # 单张超过预算的图片不缓存
+                return
+            self._entries[key] = (img, nbytes)
+            self.current_bytes += nbytes
+            self._evict_locked()
+
+    def _evict_locked(self):
+        while self.current_bytes > self.budget_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.current_bytes -= nbytes
+            self.evictions += 1
+
+    def get_size(self, path):
+        """获取图片原始尺寸，只读取文件头"""
+        size_key = (path, self._mtime(path))
+        size = self._sizes.get(size_key)
+        if size is None:
+            with archives.open_image(path) as img:
+                size = img.size
+            self._sizes[size_key] = size
+        return size
+
+    def get_original(self, path):
+        """获取完整解码的原始图片"""
+        return self._original(path, self._mtime(path), count=True)
+
+    def _original(self, path, mtime, count=False):
+        key = (path, mtime, None, None)
+        img = self._lookup(key, count)
+        if img is None:
+            img = archives.open_image(path)
+            img.load()
+            self._sizes[key[:2]] = img.size
+            self.put(key, img)
+        return img
+
+    def get_scaled(self, path, size, resample=Image.Resampling.LANCZOS, keep_original=True):
+        """获取缩放到指定尺寸的图片
+
+        keep_original 为 False 时原始图片解码后不放入缓存，
+        适合连续模式等只需要缩放结果的场景。
+        每次调用只按缩放结果计一次命中或未命中，查找原始图片不计入统计。
+        """
+        size = (int(size[0]), int(size[1]))
+        mtime = self._mtime(path)
+        img = self._cached_or_baked(path, mtime, size, resample)
+        if img is not None:
+            return img
+
+        key = (path, mtime, size, resample)
+        if keep_original:
+            original = self._original(path, mtime)
+        else:
+            original = self._lookup((path, mtime, None, None))
+            if original is None:
+                original = archives.open_image(path)
+                original.load()
+
+        if original.size == size:
+            img = original
+        else:
+            img = original.resize(size, resample)
+        self.put(key, img)
+        return img
+
+    def get_scaled_fast(self, path, size, resample=Image.Resampling.LANCZOS):
+        """只从缓存或预渲染包获取缩放后的图片，需要解码源文件时返回None"""
+        size = (int(size[0]), int(size[1]))
+        return self._cached_or_baked(path, self._mtime(path), size, resample)
+
+    def _cached_or_baked(self, path, mtime, size, resample):
+        key = (path, mtime, size, resample)
+        img = self.get(key)
+        if img is not None:
+            return img
+
+        # 预渲染包中有足够宽的页面时，不解码原始大图
+        bundle = self.bundle
+        if bundle is not None:
+            baked = bundle.load(path, mtime, size[0])
+            if baked is not None:
+                img = baked if baked.size == size else baked.resize(size, resample)
+                self.put(key, img)
+                return img
+        return None
+
+    def invalidate(self, path):
+        """移除某个文件的所有缓存条目"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                _, nbytes = self._entries.pop(key)
+                self.current_bytes -= nbytes
+            for size_key in [k for k in self._sizes if k[0] == path]:
+                del self._sizes[size_key]
+
+    def clear(self):
+        """清空缓存（保留统计计数）"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """缓存统计信息，用于调整内存预算"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "budget_bytes": self.budget_bytes,
+            }
@@ -0,0 +1,134 @@
+"""
+连续模式页面布局表
+
+只读取图片文件头获取尺寸（不解码像素），用紧凑数组保存每页
+缩放后的尺寸和累计Y偏移，画布宽度变化时直接重新计算，无需解码。
+"""
+from array import array
+from bisect import bisect_right
+
+from archives import open_image
+
+
+class PageLayout:
+    """一个目录（文件列表）的页面布局表"""
+
+    def __init__(self, image_files, gap=10, width_ratio=0.95, known_sizes=None):
+        """known_sizes: 已知的原始尺寸 {路径: (宽, 高)}（例如来自漫画库索引），可跳过读取文件头"""
+        self.image_files = list(image_files)
+        self.gap = gap  # 页面之间的分隔距离
+        self.width_ratio = width_ratio  # 页面宽度占画布宽度的比例
+
+        count = len(self.image_files)
+        self.native_widths = array('I', bytes(4 * count))
+        self.native_heights = array('I', bytes(4 * count))
+        self.scaled_widths = array('I', bytes(4 * count))
+        self.scaled_heights = array('I', bytes(4 * count))
+        self.offsets = array('q', bytes(8 * count))
+
+        self.canvas_width = 0
+        self.total_height = 0
+
+        self._read_headers(known_sizes or {})
+
+    def _read_headers(self, known_sizes, start=0):
+        """只读取图片头获取原始尺寸"""
+        for i in range(start, len(self.image_files)):
+            path = self.image_files[i]
+            size = known_sizes.get(path)
+            if size is not None:
+                self.native_widths[i], self.native_heights[i] = size
+                continue
+            try:
+                with open_image(path) as img:
+                    width, height = img.size
+            except Exception as e:
+                print(f"读取图片尺寸失败: {path}, {str(e)}")
+                continue
+            self.native_widths[i] = width
+            self.native_heights[i] = height
+
+    def __len__(self):
+        return len(self.image_files)
+
+    def extend(self, image_files, known_sizes=None):
+        """在末尾追加页面（例如流式加载的后续目录），已有页面的位置不变"""
+        start = len(self.image_files)
+        count = len(image_files)
+        if not count:
+            return
+        self.image_files.extend(image_files)
+        for values in (self.native_widths, self.native_heights, self.scaled_widths, self.scaled_heights):
+            values.frombytes(bytes(4 * count))
+        self.offsets.frombytes(bytes(8 * count))
+        self._read_headers(known_sizes or {}, start)
+
+        if self.canvas_width:
+            # 原来的最后一页之后没有分隔距离，现在需要补上
+            y_offset = self.total_height
+            if start and self.native_widths[start - 1]:
+                y_offset += self.gap
+            self.total_height = self._layout_pages(start, y_offset)
+
+    def relayout(self, canvas_width):
+        """按新的画布宽度重新计算布局，宽度未变化时直接返回False"""
+        if canvas_width == self.canvas_width:
+            return False
+
+        self.canvas_width = canvas_width
+        self.total_height = self._layout_pages(0, 0)
+        return True
+
+    def _layout_pages(self, start, y_offset):
+        """从 start 开始按当前画布宽度计算页面尺寸和偏移，返回总高度"""
+        target_width = self.canvas_width * self.width_ratio
+        native_widths = self.native_widths
+        native_heights = self.native_heights
+        scaled_widths = self.scaled_widths
+        scaled_heights = self.scaled_heights
+        offsets = self.offsets
+        last_index = len(self.image_files) - 1
+
+        for i in range(start, len(self.image_files)):
+            offsets[i] = y_offset
+            img_width = native_widths[i]
+            if not img_width:
+                # 无法读取的图片不占位置
+                scaled_widths[i] = scaled_heights[i] = 0
+                continue
+
+            scale = target_width / img_width
+            new_width = int(img_width * scale)
+            new_height = int(native_heights[i] * scale)
+            scaled_widths[i] = new_width
+            scaled_heights[i] = new_height
+
+            y_offset += new_height
+            if i < last_index:
+                y_offset += self.gap
+        return y_offset
+
+    def position(self, index):
+        """页面的Y偏移"""
+        return self.offsets[index]
+
+    def extent(self, index):
+        """页面缩放后的 (宽, 高)"""
+        return self.scaled_widths[index], self.scaled_heights[index]
+
+    def page_x(self, index):
+        """页面水平居中时的X坐标"""
+        return (self.canvas_width - self.scaled_widths[index]) // 2
+
+    def page_at(self, y):
+        """二分查找Y偏移所在的页面序号"""
+        if not self.image_files:
+            return -1
+        index = bisect_right(self.offsets, y) - 1
+        return min(max(index, 0), len(self.image_files) - 1)
+
+    def page_range(self, top, bottom):
+        """与 [top, bottom] 区间相交的页面序号范围（含两端）"""
+        if not self.image_files:
+            return 0, -1
+        return self.page_at(top), self.page_at(bottom)
@@ -0,0 +1,95 @@
+"""
+翻页模式后台预取
+
+根据阅读方向在线程池中提前解码并缩放后续N页（以及之前M页），
+结果存入页面缓存，并通过 root.after 交回界面线程转换为可直接显示的位图。
+跳转时取消所有过期任务。
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+
+class PagePrefetcher:
+    """方向感知的页面预取器"""
+
+    def __init__(self, root, page_cache, ahead=3, behind=1, workers=2):
+        self.root = root
+        self.page_cache = page_cache
+        self.ahead = ahead  # 阅读方向上预取的页数
+        self.behind = behind  # 反方向预取的页数
+        self.direction = 1  # 1: 向后阅读, -1: 向前阅读
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._futures = []
+        self._last_index = None
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def _prefetch_order(self, index, count):
+        """按阅读方向生成需要预取的页面序号"""
+        forward = [index + self.direction * step for step in range(1, self.ahead + 1)]
+        backward = [index - self.direction * step for step in range(1, self.behind + 1)]
+        return [i for i in forward + backward if 0 <= i < count]
+
+    def update(self, files, index, size_for, on_ready, include_current=False):
+        """当前页变化后调用，按阅读方向重新安排预取
+
+        size_for(宽, 高) 返回目标尺寸，会在后台线程中调用，不能访问Tk；
+        on_ready(generation, index, path, size, image) 在界面线程中调用。
+        include_current 为 True 时当前页最先处理（当前只显示了预览）。
+        """
+        if self._last_index is not None and index != self._last_index:
+            self.direction = 1 if index > self._last_index else -1
+        self._last_index = index
+
+        generation = self._cancel_pending()
+        order = self._prefetch_order(index, len(files))
+        if include_current:
+            order.insert(0, index)
+        for i in order:
+            future = self._executor.submit(self._prefetch, generation, i, files[i], size_for, on_ready)
+            self._futures.append(future)
+
+    def cancel(self):
+        """取消所有未完成的预取（跳转时调用）"""
+        self._cancel_pending()
+        self._last_index = None
+
+    def _cancel_pending(self):
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        return generation
+
+    def _prefetch(self, generation, index, path, size_for, on_ready):
+        """后台线程：解码并缩放一页"""
+        if generation != self._generation:
+            return
+        try:
+            img_width, img_height = self.page_cache.get_size(path)
+            size = size_for(img_width, img_height)
+            # 预取的页面只缓存缩放结果，避免原图占满缓存
+            img = self.page_cache.get_scaled(path, size, keep_original=False)
+        except Exception as e:
+            print(f"预取图片失败: {path}, {str(e)}")
+            return
+
+        if generation != self._generation:
+            return
+        try:
+            self.root.after(0, lambda: on_ready(generation, index, path, size, img))
+        except RuntimeError:
+            # 主窗口已关闭
+            pass
+
+    def shutdown(self):
+        """停止预取线程池"""
+        self._cancel_pending()
+        self._executor.shutdown(wait=False)
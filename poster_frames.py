@@ -0,0 +1,125 @@
+"""
+视频封面帧
+
+从视频中间部分选取一帧有代表性的画面（跳过黑屏片头和纯色画面），
+缩放后保存到缩略图库：同一帧生成主显示用的大封面和缩略图列表用的小图，
+每个视频只需打开一次。缩略图库按路径、尺寸和修改时间判断是否失效。
+生成在线程池中进行，完成后交回界面线程。
+"""
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from thumbnail_store import THUMBNAIL_SIZE
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+POSTER_SIZE = 960  # 主显示区域使用的封面最大边长
+POSTER_POSITIONS = (0.1, 0.25, 0.5, 0.75, 0.0)  # 依次尝试的位置（占总帧数的比例）
+BLACK_LEVEL = 24  # 平均亮度低于此值视为黑屏
+FLAT_LEVEL = 8  # 亮度标准差低于此值视为纯色画面
+
+
+def extract_poster(video_path, max_size=POSTER_SIZE):
+    """选取一帧有代表性的画面，返回等比缩小到不超过 max_size 的PIL图片"""
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        capture.release()
+        raise OSError(f"无法打开视频: {video_path}")
+    try:
+        count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        best, best_score = None, -1.0
+        for fraction in POSTER_POSITIONS:
+            if count > 0:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, int(count * fraction))
+            elif fraction:
+                continue  # 不知道总帧数时只能读取第一帧
+            ret, frame = capture.read()
+            if not ret:
+                continue
+            mean, std = _brightness(frame)
+            if mean >= BLACK_LEVEL and std >= FLAT_LEVEL:
+                best = frame
+                break
+            # 都不合格时使用最亮、对比度最高的一帧
+            if mean + std > best_score:
+                best, best_score = frame, mean + std
+    finally:
+        capture.release()
+    if best is None:
+        raise OSError(f"无法读取视频帧: {video_path}")
+
+    height, width = best.shape[:2]
+    scale = min(max_size / width, max_size / height, 1.0)
+    if scale < 1.0:
+        best = cv2.resize(best, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                          interpolation=cv2.INTER_AREA)
+    return Image.fromarray(cv2.cvtColor(best, cv2.COLOR_BGR2RGB))
+
+
+def _brightness(frame):
+    """缩小后的灰度画面的平均亮度和标准差"""
+    small = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    mean, std = cv2.meanStdDev(gray)
+    return float(mean[0][0]), float(std[0][0])
+
+
+class PosterFrames:
+    """带持久化缓存的视频封面服务"""
+
+    def __init__(self, root, get_store, workers=2):
+        """get_store() 返回当前的缩略图库（ThumbnailStore）"""
+        self.root = root
+        self.get_store = get_store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="poster")
+        self._locks = {}  # 路径 -> 锁，同一视频只生成一次
+        self._locks_lock = threading.Lock()
+
+    def get_cached(self, path, size=POSTER_SIZE):
+        """只从缩略图库读取封面，没有时返回None"""
+        try:
+            return self.get_store().get(path, size)
+        except (OSError, sqlite3.Error):
+            return None
+
+    def get_or_create(self, path, size):
+        """读取封面，不存在或已失效时生成大小两种尺寸并保存（在后台线程调用）"""
+        with self._locks_lock:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock:
+            store = self.get_store()
+            img = store.get(path, size)
+            if img is not None:
+                return img
+            poster = extract_poster(path, POSTER_SIZE)
+            thumbnail = poster.copy()
+            thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
+            store.put(path, poster, POSTER_SIZE)
+            store.put(path, thumbnail, THUMBNAIL_SIZE)
+            return poster if size == POSTER_SIZE else thumbnail
+
+    def request(self, path, on_ready, size=POSTER_SIZE):
+        """在后台生成封面，on_ready(path, image) 在界面线程中调用（失败时 image 为None）"""
+        self._executor.submit(self._load, path, size, on_ready)
+
+    def _load(self, path, size, on_ready):
+        try:
+            img = self.get_or_create(path, size)
+        except Exception as e:
+            print(f"生成视频封面失败: {path}, {str(e)}")
+            img = None
+        try:
+            self.root.after(0, on_ready, path, img)
+        except RuntimeError:
+            # 主窗口已关闭
+            pass
+
+    def shutdown(self):
+        """停止封面线程池"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,175 @@
+"""
+无界面的页面渲染引擎
+
+页面显示的计算和缩放都在这里完成，不依赖Tk：按对齐方式和缩放计算目标
+尺寸、翻页和全屏模式的居中位置与滚动区域、是否改用分块显示、连续模式
+每页和长图分片的位置，以及实际的重采样。输入页面路径和视口尺寸，输出
+PIL图片和放置位置（视口坐标）。
+
+阅读器界面只读取画布尺寸并把结果放到画布上；引擎可以在后台线程、基准
+测试或没有显示器的服务器上直接使用。
+"""
+from collections import namedtuple
+
+from PIL import Image
+
+from image_decode import open_preview
+from page_layout import PageLayout
+from slice_pyramid import is_tall
+from tile_renderer import TileGrid, render_tile
+
+PAGE_MARGIN = 0.95  # 页面占视口的比例（与连续模式的页面宽度比例相同）
+TILE_THRESHOLD = 4.0  # 缩放后的页面超过视口面积的这个倍数时分块显示
+
+# 放置位置：左上角坐标和尺寸
+Placement = namedtuple("Placement", ["x", "y", "width", "height"])
+# 翻页/全屏模式一页的显示方案；size_for 是同一视口下其他页面的目标尺寸函数（用于预取）
+PagePlan = namedtuple("PagePlan", ["size", "placement", "scroll_region", "tiled", "size_for"])
+# 渲染结果；final 为False时是低质量预览
+RenderedPage = namedtuple("RenderedPage", ["image", "placement", "final"])
+
+
+def page_size_function(align, viewport, zoom=1.0, margin=PAGE_MARGIN):
+    """返回按对齐方式（width/height/fit）和缩放计算目标尺寸的函数（可在后台线程调用）"""
+    viewport_width, viewport_height = viewport
+
+    def size_for(img_width, img_height):
+        if align == "width":
+            # 按宽度对齐
+            scale = (viewport_width * margin) / img_width
+        elif align == "height":
+            # 按高度对齐
+            scale = (viewport_height * margin) / img_height
+        else:
+            # 适应窗口
+            scale_x = (viewport_width * margin) / img_width
+            scale_y = (viewport_height * margin) / img_height
+            scale = min(scale_x, scale_y)
+
+        # 应用用户缩放
+        scale *= zoom
+        return int(img_width * scale), int(img_height * scale)
+
+    return size_for
+
+
+def fit_size_function(viewport):
+    """返回铺满视口（等比、不留边距）的目标尺寸函数，用于全屏模式"""
+    viewport_width, viewport_height = viewport
+
+    def size_for(img_width, img_height):
+        scale = min(viewport_width / img_width, viewport_height / img_height)
+        return int(img_width * scale), int(img_height * scale)
+
+    return size_for
+
+
+def centered(size, viewport):
+    """页面在视口中居中的位置，比视口大的方向从0开始"""
+    width, height = size
+    viewport_width, viewport_height = viewport
+    return Placement(max(0, (viewport_width - width) // 2), max(0, (viewport_height - height) // 2), width, height)
+
+
+def scroll_region(size, viewport):
+    """显示页面需要的滚动区域 (0, 0, 宽, 高)"""
+    return 0, 0, max(viewport[0], size[0]), max(viewport[1], size[1])
+
+
+class RenderEngine:
+    """页面渲染引擎（线程安全程度与页面缓存相同）"""
+
+    def __init__(self, page_cache, tile_threshold=TILE_THRESHOLD):
+        self.page_cache = page_cache
+        self.tile_threshold = tile_threshold
+
+    # 翻页和全屏模式
+
+    def plan_page(self, path, viewport, align="width", zoom=1.0):
+        """翻页模式的显示方案：目标尺寸、位置、滚动区域和是否分块显示"""
+        size_for = page_size_function(align, viewport, zoom)
+        size = size_for(*self.page_cache.get_size(path))
+        tiled = size[0] * size[1] > self.tile_threshold * viewport[0] * viewport[1]
+        return PagePlan(size, centered(size, viewport), scroll_region(size, viewport), tiled, size_for)
+
+    def plan_fullscreen(self, path, screen):
+        """全屏模式的显示方案：等比铺满屏幕并居中，不分块"""
+        size_for = fit_size_function(screen)
+        size = size_for(*self.page_cache.get_size(path))
+        placement = Placement((screen[0] - size[0]) // 2, (screen[1] - size[1]) // 2, *size)
+        return PagePlan(size, placement, (0, 0) + tuple(screen), False, size_for)
+
+    def render(self, path, size, keep_original=True):
+        """高质量（LANCZOS）缩放到指定尺寸"""
+        return self.page_cache.get_scaled(path, size, keep_original=keep_original)
+
+    def render_fast(self, path, size, fallback=None):
+        """尽快得到指定尺寸的图片，返回 (图片, 是否为最终质量)
+
+        已缓存或已烘焙的缩放结果直接返回；否则生成低质量预览，
+        fallback() 可以提供一张小图（例如缩略图）用于无法缩小解码的格式。
+        """
+        img = self.page_cache.get_scaled_fast(path, size)
+        if img is not None:
+            return img, True
+        return open_preview(path, size, fallback=fallback), False
+
+    # 放大后的分块显示
+
+    def tile_grid(self, path, size):
+        """页面缩放到 size 时的图块划分"""
+        return TileGrid(self.page_cache.get_size(path), size)
+
+    def render_tile(self, path, grid, tile):
+        """从原始图片重采样一个图块"""
+        return render_tile(self.page_cache.get_original(path), grid, tile)
+
+    # 连续模式
+
+    @staticmethod
+    def continuous_layout(image_files, viewport_width, known_sizes=None):
+        """按视口宽度排好的连续模式布局表（只读取图片头）"""
+        layout = PageLayout(image_files, width_ratio=PAGE_MARGIN, known_sizes=known_sizes)
+        layout.relayout(viewport_width)
+        return layout
+
+    @staticmethod
+    def continuous_placement(layout, index):
+        """连续模式一页在整条长图中的位置"""
+        return Placement(layout.page_x(index), layout.position(index), *layout.extent(index))
+
+    @staticmethod
+    def is_tall_page(layout, index):
+        """连续模式的一页是否按分片显示"""
+        return is_tall(layout.native_widths[index], layout.native_heights[index])
+
+    # 超长图片的分片
+
+    @staticmethod
+    def slice_level(pyramid, placement):
+        """分片金字塔中用于显示的层级和该层级到显示尺寸的缩放比例"""
+        level = pyramid.level_for(placement.width)
+        return level, placement.height / pyramid.levels[level]["height"]
+
+    def slices_in(self, pyramid, placement, top, bottom):
+        """与显示范围 [top, bottom) 相交的分片序号"""
+        level, scale = self.slice_level(pyramid, placement)
+        return pyramid.slices_in(level, (top - placement.y) / scale, (bottom - placement.y) / scale)
+
+    def slice_placement(self, pyramid, placement, index):
+        """分片的显示位置（相邻分片取整后首尾相接，没有缝隙）"""
+        level, scale = self.slice_level(pyramid, placement)
+        slice_top, slice_bottom = pyramid.slice_rows(level, index)
+        top = round(slice_top * scale)
+        return Placement(placement.x, placement.y + top, placement.width, round(slice_bottom * scale) - top)
+
+    def render_slice(self, pyramid, placement, index):
+        """读取一个分片并缩放到显示尺寸，返回 RenderedPage（高度为0时返回None）"""
+        target = self.slice_placement(pyramid, placement, index)
+        if target.height <= 0:
+            return None
+        level, _ = self.slice_level(pyramid, placement)
+        img = pyramid.load(level, index)
+        if img.size != (target.width, target.height):
+            img = img.resize((target.width, target.height), Image.Resampling.LANCZOS)
+        return RenderedPage(img, target, True)
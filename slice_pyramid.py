@@ -0,0 +1,168 @@
+"""
+超长条漫的分片金字塔
+
+宽800、高几万像素的条漫整张缩放后会产生巨大的位图，超出Tk的图片尺寸限制。
+这类图片第一次显示时解码一次，切成固定高度的横向分片，并逐级缩小一半
+生成多个层级（mipmap），全部写入缓存目录中的一个文件，末尾是偏移索引
+（格式与预渲染章节包相同）。之后按显示宽度选择最接近的层级，只读取和
+缩放可见范围内的分片，内存占用只与可见高度有关。
+
+索引记录源文件的大小和修改时间，源文件变化后金字塔失效并被删除。
+"""
+import io
+import json
+import mmap
+import os
+import struct
+
+from PIL import Image
+
+import archives
+from cache_paths import cache_dir, library_key
+
+SLICE_HEIGHT = 1024  # 每个分片的高度（各层级相同）
+TALL_RATIO = 4  # 高度超过宽度的这个倍数且超过 TALL_MIN_HEIGHT 时按分片显示
+TALL_MIN_HEIGHT = 4 * SLICE_HEIGHT
+MIN_LEVEL_WIDTH = 200  # 最小层级的宽度
+
+MAGIC = b"MRSLCE01"
+_TRAILER = struct.Struct("<Q8s")  # 索引偏移 + MAGIC
+
+
+def is_tall(width, height):
+    """图片是否需要按分片显示"""
+    return height >= TALL_RATIO * width and height > TALL_MIN_HEIGHT
+
+
+class SlicePyramid:
+    """一张长图的分片金字塔（只读，在界面线程中读取分片）"""
+
+    def __init__(self, path, mapping, index):
+        self.path = path
+        self._map = mapping
+        self.source = index["source"]
+        # 每个层级: {"width", "height", "slices": [[偏移, 长度], ...]}，第0级是原始尺寸
+        self.levels = index["levels"]
+
+    @staticmethod
+    def path_for(source):
+        """源图片对应的金字塔文件路径"""
+        return os.path.join(cache_dir("slices"), library_key(source) + ".slices")
+
+    @classmethod
+    def open(cls, source):
+        """打开源图片的金字塔，不存在或已失效时返回None（失效的文件会被删除）"""
+        path = cls.path_for(source)
+        try:
+            with open(path, "rb") as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            index_offset, magic = _TRAILER.unpack_from(mapping, len(mapping) - _TRAILER.size)
+            if mapping[:len(MAGIC)] != MAGIC or magic != MAGIC:
+                raise ValueError("文件头损坏")
+            index = json.loads(mapping[index_offset:len(mapping) - _TRAILER.size].decode("utf-8"))
+            st = archives.stat(source)
+            current = index["source"] == source and (index["size"], index["mtime_ns"]) == (st.st_size, st.st_mtime_ns)
+        except (struct.error, ValueError, KeyError, OSError) as e:
+            print(f"分片金字塔损坏: {path}, {str(e)}")
+            current = False
+        if not current:
+            mapping.close()
+            cls.remove(source)
+            return None
+        return cls(path, mapping, index)
+
+    @classmethod
+    def remove(cls, source):
+        try:
+            os.remove(cls.path_for(source))
+        except OSError:
+            pass
+
+    @classmethod
+    def build(cls, source):
+        """解码源图片一次，生成并打开金字塔
+
+        生成时需要完整解码一次原图（在后台线程中进行），之后显示只读取分片。
+        先写入临时文件，完成后替换旧文件。
+        """
+        st = archives.stat(source)
+        img = archives.open_image(source)
+        lossless = img.format != "JPEG"
+        img.load()
+        if img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+        path = cls.path_for(source)
+        temp_path = path + ".tmp"
+        levels = []
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(MAGIC)
+                while True:
+                    slices = []
+                    for top in range(0, img.height, SLICE_HEIGHT):
+                        box = (0, top, img.width, min(top + SLICE_HEIGHT, img.height))
+                        data = cls._encode(img.crop(box), lossless)
+                        slices.append([f.tell(), len(data)])
+                        f.write(data)
+                    levels.append({"width": img.width, "height": img.height, "slices": slices})
+                    if img.width // 2 < MIN_LEVEL_WIDTH:
+                        break
+                    img = img.reduce(2)
+
+                index_offset = f.tell()
+                index = {"source": source, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "levels": levels}
+                f.write(json.dumps(index, ensure_ascii=False).encode("utf-8"))
+                f.write(_TRAILER.pack(index_offset, MAGIC))
+        except BaseException:
+            # 编码或写入失败时不留下临时文件
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        os.replace(temp_path, path)
+        return cls.open(source)
+
+    @staticmethod
+    def _encode(img, lossless):
+        """原图不是JPEG（或有透明通道）时无损保存为PNG，否则保存为JPEG"""
+        buffer = io.BytesIO()
+        if lossless or img.mode in ("RGBA", "LA"):
+            img.save(buffer, "PNG", compress_level=1)
+        else:
+            img.save(buffer, "JPEG", quality=92)
+        return buffer.getvalue()
+
+    def level_for(self, width):
+        """显示宽度对应的层级：不比显示宽度窄的最小层级"""
+        for level in range(len(self.levels) - 1, -1, -1):
+            if self.levels[level]["width"] >= width:
+                return level
+        return 0
+
+    def slices_in(self, level, top, bottom):
+        """层级中与行范围 [top, bottom) 相交的分片序号"""
+        count = len(self.levels[level]["slices"])
+        first = max(int(top // SLICE_HEIGHT), 0)
+        last = min(int(max(bottom - 1, 0) // SLICE_HEIGHT), count - 1)
+        return range(first, last + 1)
+
+    def slice_rows(self, level, index):
+        """分片在层级中的行范围 (top, bottom)"""
+        top = index * SLICE_HEIGHT
+        return top, min(top + SLICE_HEIGHT, self.levels[level]["height"])
+
+    def load(self, level, index):
+        """读取一个分片"""
+        offset, length = self.levels[level]["slices"][index]
+        img = Image.open(io.BytesIO(self._map[offset:offset + length]))
+        img.load()
+        return img
+
+    def close(self):
+        self._map.close()
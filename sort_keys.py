@@ -0,0 +1,70 @@
+"""
+排序键
+
+文件名按自然顺序排序：比较所有数字段（vol1_ch3 在 vol2_ch10 之前），
+文字部分不区分大小写；名称中没有数字时按修改时间排序。目录按名称中的
+日期（yyyy-mm-dd）排序。名称相关的部分只计算一次，按名称缓存，
+修改时间由调用方提供（例如 DirEntry 缓存的 stat 结果或索引中的记录）。
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+
+SORT_VERSION = 2  # 排序规则变化时递增，持久化的排序结果需要重新计算
+NO_DATE = datetime.min
+
+_DIGITS_RE = re.compile(r'(\d+)')
+_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+_CACHE_SIZE = 1 << 20
+
+
+def natural_key(name):
+    """自然排序键，名称中没有数字时返回None
+
+    每个数字段编码为 "\\0" + 长度字符 + 去掉前导零的数字，整个键是一个字符串：
+    数字按数值比较，文字不区分大小写，比较时不需要逐段比较元组。
+    """
+    parts = _DIGITS_RE.split(name.casefold())
+    if len(parts) == 1:
+        return None
+    for i in range(1, len(parts), 2):
+        digits = parts[i].lstrip("0") or "0"
+        parts[i] = "\0" + chr(len(digits)) + digits
+    return "".join(parts)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def name_sort_key(name):
+    """只由名称决定的排序键（按名称缓存），名称中没有数字时返回None"""
+    natural = natural_key(name)
+    if natural is None:
+        return None
+    return (0, natural, name)
+
+
+def file_sort_key(name, get_mtime=None):
+    """文件排序键：名称含数字时自然排序，否则按修改时间排序
+
+    get_mtime() 只在名称不含数字时调用，返回修改时间，可以抛出 OSError。
+    """
+    key = name_sort_key(name)
+    if key is not None:
+        return key
+    if get_mtime is not None:
+        try:
+            return (1, get_mtime(), name)
+        except OSError:
+            pass
+    return (2, 0, name)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def date_key(name):
+    """名称中第一个 yyyy-mm-dd 格式的日期，没有或无效时返回 NO_DATE"""
+    match = _DATE_RE.search(name)
+    if match:
+        try:
+            return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        except ValueError:
+            pass
+    return NO_DATE
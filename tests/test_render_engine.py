@@ -0,0 +1,84 @@
+"""
+渲染引擎的无界面测试：翻页、全屏和连续模式的尺寸、居中位置和滚动区域
+
+用法: python -m unittest discover -s tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_cache import PageCache  # noqa: E402
+from render_engine import Placement, RenderEngine  # noqa: E402
+
+
+class RenderEngineTest(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.portrait = self._make("portrait.png", (400, 600))
+        self.landscape = self._make("landscape.png", (800, 400))
+        self.engine = RenderEngine(PageCache(budget_mb=16))
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def _make(self, name, size):
+        path = os.path.join(self._temp.name, name)
+        Image.new("RGB", size, "white").save(path)
+        return path
+
+    def test_plan_page_width(self):
+        plan = self.engine.plan_page(self.portrait, (1000, 800), "width")
+        self.assertEqual(plan.size, (950, 1425))
+        # 水平居中，比视口高的方向从0开始
+        self.assertEqual(plan.placement, Placement(25, 0, 950, 1425))
+        self.assertEqual(plan.scroll_region, (0, 0, 1000, 1425))
+        self.assertFalse(plan.tiled)
+        self.assertEqual(plan.size_for(800, 400), (950, 475))
+
+    def test_plan_page_fit(self):
+        plan = self.engine.plan_page(self.portrait, (1000, 800), "fit")
+        self.assertEqual(plan.size, (506, 760))
+        self.assertEqual(plan.placement, Placement(247, 20, 506, 760))
+        self.assertEqual(plan.scroll_region, (0, 0, 1000, 800))
+
+    def test_plan_page_zoom_tiled(self):
+        plan = self.engine.plan_page(self.portrait, (1000, 800), "width", zoom=3.0)
+        self.assertEqual(plan.size, (2850, 4275))
+        self.assertEqual(plan.placement, Placement(0, 0, 2850, 4275))
+        self.assertEqual(plan.scroll_region, (0, 0, 2850, 4275))
+        self.assertTrue(plan.tiled)
+
+    def test_plan_fullscreen(self):
+        plan = self.engine.plan_fullscreen(self.portrait, (1920, 1080))
+        self.assertEqual(plan.size, (720, 1080))
+        self.assertEqual(plan.placement, Placement(600, 0, 720, 1080))
+        self.assertEqual(plan.scroll_region, (0, 0, 1920, 1080))
+        self.assertFalse(plan.tiled)
+
+    def test_render_size(self):
+        plan = self.engine.plan_page(self.landscape, (1000, 800), "fit")
+        self.assertEqual(self.engine.render(self.landscape, plan.size).size, plan.size)
+
+    def test_continuous_placement(self):
+        files = [self.portrait, self.landscape]
+        layout = RenderEngine.continuous_layout(files, 1000)
+        self.assertEqual(RenderEngine.continuous_placement(layout, 0), Placement(25, 0, 950, 1425))
+        # 页面之间留有分隔距离
+        self.assertEqual(RenderEngine.continuous_placement(layout, 1), Placement(25, 1435, 950, 475))
+        self.assertEqual(layout.total_height, 1910)
+        self.assertFalse(RenderEngine.is_tall_page(layout, 0))
+
+    def test_continuous_known_sizes(self):
+        # 已知尺寸时不读取文件头
+        missing = os.path.join(self._temp.name, "missing.png")
+        layout = RenderEngine.continuous_layout([missing], 1000, known_sizes={missing: (800, 400)})
+        self.assertEqual(RenderEngine.continuous_placement(layout, 0), Placement(25, 0, 950, 475))
+
+
+if __name__ == "__main__":
+    unittest.main()
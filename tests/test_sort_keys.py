@@ -0,0 +1,110 @@
+"""
+排序键和有序插入的测试：多个数字段、前导零、大小写、按修改时间排序
+
+用法: python -m unittest discover -s tests
+"""
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_scanner import insert_sorted, path_sort_key  # noqa: E402
+from sort_keys import file_sort_key, natural_key  # noqa: E402
+
+
+def sort_names(names, mtimes=None):
+    mtimes = mtimes or {}
+    return sorted(names, key=lambda name: file_sort_key(name, lambda: mtimes[name]))
+
+
+class NaturalKeyTest(unittest.TestCase):
+    def test_multiple_numbers(self):
+        # 每个数字段都按数值比较，不只是第一个
+        self.assertEqual(sort_names(["vol2_ch10.jpg", "vol1_ch3.jpg", "vol2_ch9.jpg", "vol1_ch12.jpg"]),
+                         ["vol1_ch3.jpg", "vol1_ch12.jpg", "vol2_ch9.jpg", "vol2_ch10.jpg"])
+
+    def test_leading_zeros(self):
+        self.assertEqual(sort_names(["010.jpg", "9.jpg", "002.jpg", "1.jpg"]),
+                         ["1.jpg", "002.jpg", "9.jpg", "010.jpg"])
+        self.assertEqual(natural_key("001.jpg"), natural_key("1.jpg"))
+        # 数值相同时按名称区分，顺序稳定
+        self.assertEqual(sort_names(["01.jpg", "1.jpg", "001.jpg"]), ["001.jpg", "01.jpg", "1.jpg"])
+
+    def test_case_folding(self):
+        self.assertEqual(natural_key("Page1.JPG"), natural_key("page1.jpg"))
+        self.assertEqual(sort_names(["b1.jpg", "A2.jpg", "a1.jpg"]), ["a1.jpg", "A2.jpg", "b1.jpg"])
+
+    def test_no_digits(self):
+        self.assertIsNone(natural_key("cover.jpg"))
+
+    def test_mtime_fallback(self):
+        mtimes = {"cover.jpg": 30.0, "back.jpg": 10.0, "extra.jpg": 20.0}
+        # 名称含数字的排在前面，不含数字的按修改时间排序
+        self.assertEqual(sort_names(["cover.jpg", "2.jpg", "back.jpg", "extra.jpg", "1.jpg"], mtimes),
+                         ["1.jpg", "2.jpg", "back.jpg", "extra.jpg", "cover.jpg"])
+
+    def test_mtime_unavailable(self):
+        def missing():
+            raise OSError("无法访问")
+
+        # 无法取得修改时间的排在最后
+        self.assertEqual(file_sort_key("gone.jpg", missing), (2, 0, "gone.jpg"))
+        self.assertLess(file_sort_key("cover.jpg", lambda: 1e12), file_sort_key("gone.jpg", missing))
+
+
+class InsertSortedTest(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.directory = self._temp.name
+        self.mtimes = {}
+        names = ["1.jpg", "2.jpg", "10.jpg", "vol1_ch3.jpg", "vol2_ch10.jpg",
+                 "cover.jpg", "back.jpg", "extra.jpg", "Zeta.jpg"]
+        for number, name in enumerate(names):
+            path = self._path(name)
+            open(path, "wb").close()
+            # 修改时间与名称顺序无关
+            mtime = 1000000 + (number * 7919) % 97
+            os.utime(path, (mtime, mtime))
+            self.mtimes[path] = float(mtime)
+        self.paths = sorted(self.mtimes)
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _expected(self, paths):
+        return sorted(paths, key=path_sort_key)
+
+    def test_mixed_names(self):
+        for seed in range(20):
+            shuffled = list(self.paths)
+            random.Random(seed).shuffle(shuffled)
+            existing, new = shuffled[:4], shuffled[4:]
+            paths = self._expected(existing)
+            insert_sorted(paths, new)
+            self.assertEqual(paths, self._expected(self.paths))
+
+    def test_known_mtimes(self):
+        # 传入的修改时间优先于文件的实际修改时间
+        new = [self._path("cover.jpg"), self._path("5.jpg")]
+        paths = self._expected([path for path in self.paths if path not in new])
+        insert_sorted(paths, new, {self._path("cover.jpg"): 0.0})
+        names = [os.path.basename(path) for path in paths]
+        self.assertLess(names.index("5.jpg"), names.index("10.jpg"))
+        self.assertGreater(names.index("5.jpg"), names.index("2.jpg"))
+        # 修改时间最早，排在不含数字的名称最前面
+        self.assertEqual(names.index("cover.jpg"), names.index("vol2_ch10.jpg") + 1)
+
+    def test_into_empty(self):
+        paths = []
+        insert_sorted(paths, list(reversed(self.paths)))
+        self.assertEqual(paths, self._expected(self.paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+持久化缩略图库
+
+每个漫画库（根目录）一个SQLite文件，按 (路径, 缩略图尺寸) 保存
+压缩后的缩略图，并记录源文件大小和修改时间用于失效判断。
+"""
+import io
+import os
+import sqlite3
+import threading
+import time
+
+from PIL import Image, features
+
+import archives
+from cache_paths import cache_dir, library_key
+from image_decode import open_reduced
+
+THUMBNAIL_SIZE = 120
+COMPACT_INTERVAL = 7 * 24 * 3600  # 自动压缩的最短间隔（秒）
+
+
+class ThumbnailStore:
+    """单文件缩略图库"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            " path TEXT NOT NULL,"
+            " thumb_size INTEGER NOT NULL,"
+            " file_size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " data BLOB NOT NULL,"
+            " PRIMARY KEY (path, thumb_size))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+        # 支持WebP时用WebP保存（保留透明通道），否则用JPEG
+        self.format = "WEBP" if features.check("webp") else "JPEG"
+
+    @classmethod
+    def for_library(cls, directory):
+        """打开某个漫画库对应的缩略图库"""
+        db_path = os.path.join(cache_dir("thumbnails"), library_key(directory) + ".db")
+        return cls(db_path)
+
+    def get(self, path, thumb_size=THUMBNAIL_SIZE, stat=None):
+        """读取缩略图，源文件已变化或不存在时返回None"""
+        if stat is None:
+            stat = archives.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_size, mtime_ns, data FROM thumbnails WHERE path=? AND thumb_size=?",
+                (path, thumb_size)
+            ).fetchone()
+        if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+            return None
+        img = Image.open(io.BytesIO(row[2]))
+        img.load()
+        return img
+
+    def put(self, path, img, thumb_size=THUMBNAIL_SIZE, stat=None):
+        """保存缩略图（覆盖旧记录）"""
+        if stat is None:
+            stat = archives.stat(path)
+        buffer = io.BytesIO()
+        if self.format == "JPEG":
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.save(buffer, "JPEG", quality=85)
+        else:
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            img.save(buffer, "WEBP", quality=85)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO thumbnails (path, thumb_size, file_size, mtime_ns, data)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (path, thumb_size, stat.st_size, stat.st_mtime_ns, sqlite3.Binary(buffer.getvalue()))
+            )
+            self._conn.commit()
+
+    def get_or_create(self, path, thumb_size=THUMBNAIL_SIZE):
+        """读取缩略图，不存在或已失效时重新生成并保存"""
+        stat = archives.stat(path)
+        img = self.get(path, thumb_size, stat)
+        if img is None:
+            img = open_reduced(path, (thumb_size, thumb_size))
+            self.put(path, img, thumb_size, stat)
+        return img
+
+    def invalidate(self, path):
+        """删除某个文件的所有缩略图"""
+        with self._lock:
+            self._conn.execute("DELETE FROM thumbnails WHERE path=?", (path,))
+            self._conn.commit()
+
+    def compact(self):
+        """删除源文件已不存在的记录并整理数据库文件，返回删除的条数"""
+        with self._lock:
+            paths = [row[0] for row in self._conn.execute("SELECT DISTINCT path FROM thumbnails")]
+        missing = [(path,) for path in paths if not archives.exists(path)]
+        with self._lock:
+            self._conn.executemany("DELETE FROM thumbnails WHERE path=?", missing)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_compact', ?)",
+                (str(int(time.time())),)
+            )
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        return len(missing)
+
+    def compact_if_due(self):
+        """距离上次压缩超过间隔时执行压缩（可在后台线程调用）"""
+        try:
+            return self._compact_if_due()
+        except sqlite3.ProgrammingError:
+            # 压缩期间缩略图库已被关闭
+            return 0
+
+    def _compact_if_due(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key='last_compact'").fetchone()
+        if row is None:
+            # 新建的库不需要压缩，只记录时间
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_compact', ?)",
+                    (str(int(time.time())),)
+                )
+                self._conn.commit()
+            return 0
+        if time.time() - int(row[0]) < COMPACT_INTERVAL:
+            return 0
+        return self.compact()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,282 @@
+"""
+虚拟缩略图列表
+
+在一个Canvas上只绘制可见的缩略图单元格，滚动时复用单元格，
+可以覆盖完整的文件列表（包括视频）。切换当前项时只重新设置
+旧的和新的高亮单元格样式。缩略图在线程池中生成，完成一个显示一个。
+"""
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageTk
+
+import archives
+
+CELL_HEIGHT = 126
+THUMB_AREA = 124
+PHOTO_CACHE_SIZE = 300  # 保留的缩略图位图数量
+
+_NOT_FAILED = object()
+
+
+def _mtime(path):
+    """文件的修改时间，无法访问时返回None"""
+    try:
+        return archives.stat(path).st_mtime_ns
+    except (OSError, KeyError):
+        return None
+
+
+class _Cell:
+    """一个可复用的单元格（一组画布项目）"""
+
+    def __init__(self, canvas):
+        self.index = None
+        self.background = canvas.create_rectangle(0, 0, 0, 0, fill="white", outline="")
+        self.image = canvas.create_image(0, 0, anchor="center")
+        self.number = canvas.create_text(0, 0, anchor="nw", font=("Arial", 8, "bold"))
+        self.name = canvas.create_text(0, 0, anchor="nw", font=("Arial", 7))
+
+    def hide(self, canvas):
+        self.index = None
+        for item in (self.background, self.image, self.number, self.name):
+            canvas.itemconfigure(item, state="hidden")
+
+    def show(self, canvas):
+        for item in (self.background, self.image, self.number, self.name):
+            canvas.itemconfigure(item, state="normal")
+
+
+class ThumbnailStrip:
+    """画布实现的虚拟缩略图列表"""
+
+    def __init__(self, canvas, scrollbar, on_select, load_thumbnail, workers=4):
+        """
+        on_select(index) 点击单元格时调用；
+        load_thumbnail(index, path, is_video) 在后台线程中调用，返回缩略图（PIL图片）或None。
+        """
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.on_select = on_select
+        self.load_thumbnail = load_thumbnail
+
+        self.paths = []
+        self.image_count = 0
+        self.current_index = None
+
+        self._cells = []
+        self._visible = {}  # 序号 -> 单元格
+        self._photos = OrderedDict()  # 路径 -> 缩略图位图
+        self._failed = {}  # 生成失败的路径 -> 失败时的修改时间，文件变化前不再重试
+        self._redraw_pending = None
+        self._video_placeholder = None
+        
+        # 后台生成缩略图
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+        self._pending = set()  # 正在生成缩略图的序号
+        self._generation = 0
+
+        self.canvas.configure(yscrollcommand=self._on_yscroll, yscrollincrement=CELL_HEIGHT // 2)
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+
+    def set_items(self, image_files, video_files, current_index=0, keep_position=False):
+        """设置完整的文件列表（图片在前，视频在后）
+
+        keep_position 为 True 时保持当前滚动位置（用于目录内容的增量变化），
+        已生成的缩略图按路径保留（变化的文件由 forget 丢弃）；否则丢弃已生成的
+        缩略图，重新进入的目录中原地替换的文件不会显示旧图。
+        """
+        if not keep_position:
+            self._photos.clear()
+            self._failed = {path: mtime for path, mtime in self._failed.items() if _mtime(path) == mtime}
+        self.paths = list(image_files) + list(video_files)
+        self.image_count = len(image_files)
+        self.current_index = current_index
+        self._pending.clear()
+        self._generation += 1
+        for cell in self._visible.values():
+            cell.hide(self.canvas)
+        self._visible = {}
+
+        self.canvas.configure(scrollregion=(0, 0, 1, len(self.paths) * CELL_HEIGHT))
+        if not keep_position:
+            self.canvas.yview_moveto(0)
+        self.see(current_index)
+        self._redraw()
+
+    def set_current(self, index):
+        """切换高亮项，只重新设置两个单元格的样式"""
+        previous = self.current_index
+        self.current_index = index
+        for i in (previous, index):
+            cell = self._visible.get(i)
+            if cell is not None:
+                self._style_cell(cell, i)
+        self.see(index)
+
+    def see(self, index):
+        """当前项不在可见范围内时滚动到该项"""
+        if not self.paths or index is None or index >= len(self.paths):
+            return
+        height = max(self.canvas.winfo_height(), 1)
+        top = self.canvas.canvasy(0)
+        cell_top = index * CELL_HEIGHT
+        if cell_top < top or cell_top + CELL_HEIGHT > top + height:
+            total = len(self.paths) * CELL_HEIGHT
+            self.canvas.yview_moveto(max(0, cell_top - (height - CELL_HEIGHT) / 2) / total)
+
+    def forget(self, path):
+        """丢弃某个文件的缩略图（文件已变化），可见时重新加载"""
+        self._photos.pop(path, None)
+        self._failed.pop(path, None)
+        for index, cell in self._visible.items():
+            if self.paths[index] == path:
+                self._fill_cell(cell, index)
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_redraw()
+
+    def _on_configure(self, event):
+        """宽度变化时重新摆放可见单元格"""
+        for i, cell in self._visible.items():
+            self._place_cell(cell, i)
+        self._schedule_redraw()
+
+    def _schedule_redraw(self):
+        if self._redraw_pending is None:
+            self._redraw_pending = self.canvas.after_idle(self._redraw)
+
+    def _redraw(self):
+        """为可见范围内的序号分配单元格，回收不可见的单元格"""
+        self._redraw_pending = None
+        height = max(self.canvas.winfo_height(), 1)
+        top = self.canvas.canvasy(0)
+        first = max(int(top // CELL_HEIGHT), 0)
+        last = min(int((top + height) // CELL_HEIGHT), len(self.paths) - 1)
+
+        # 回收离开可见范围的单元格
+        for i in list(self._visible):
+            if i < first or i > last:
+                self._visible.pop(i).hide(self.canvas)
+        free = [cell for cell in self._cells if cell.index is None]
+
+        # 为新进入可见范围的序号分配单元格
+        for i in range(first, last + 1):
+            if i in self._visible:
+                continue
+            if free:
+                cell = free.pop()
+            else:
+                cell = _Cell(self.canvas)
+                self._cells.append(cell)
+            self._visible[i] = cell
+            self._place_cell(cell, i)
+
+    def _place_cell(self, cell, index):
+        """把单元格移动到指定序号的位置并填充内容"""
+        width = max(self.canvas.winfo_width(), THUMB_AREA + 40)
+        y = index * CELL_HEIGHT
+        cell.index = index
+        self.canvas.coords(cell.background, 0, y + 1, width, y + CELL_HEIGHT - 1)
+        self.canvas.coords(cell.image, 2 + THUMB_AREA // 2, y + CELL_HEIGHT // 2)
+        self.canvas.coords(cell.number, THUMB_AREA + 9, y + 4)
+        self.canvas.coords(cell.name, THUMB_AREA + 9, y + 20)
+
+        filename = os.path.basename(self.paths[index])
+        if len(filename) > 20:
+            filename = filename[:17] + "..."
+        self.canvas.itemconfigure(cell.number, text=f"{index+1}")
+        self.canvas.itemconfigure(cell.name, text=filename)
+        self._style_cell(cell, index)
+        self._fill_cell(cell, index)
+        cell.show(self.canvas)
+
+    def _style_cell(self, cell, index):
+        bg_color = "lightblue" if index == self.current_index else "white"
+        self.canvas.itemconfigure(cell.background, fill=bg_color)
+
+    def _fill_cell(self, cell, index):
+        """设置单元格的缩略图，尚未生成时先显示占位并提交后台任务"""
+        is_video = index >= self.image_count
+        path = self.paths[index]
+        photo = self._photos.get(path)
+        if photo is None:
+            photo = self._get_video_placeholder() if is_video else ""
+            if path not in self._failed:
+                self._request_thumbnail(index)
+        else:
+            self._photos.move_to_end(path)
+        self.canvas.itemconfigure(cell.image, image=photo)
+
+    def _request_thumbnail(self, index):
+        if index in self._pending:
+            return
+        self._pending.add(index)
+        is_video = index >= self.image_count
+        self._executor.submit(self._load_in_worker, self._generation, index, self.paths[index], is_video)
+
+    def _load_in_worker(self, generation, index, path, is_video):
+        """后台线程：生成缩略图后交回界面线程"""
+        img = None
+        failed = _NOT_FAILED  # 生成失败时为文件的修改时间（无法访问时为None）
+        # 已经滚出可见范围或列表已更换的任务直接跳过
+        if generation == self._generation and index in self._visible:
+            try:
+                img = self.load_thumbnail(index, path, is_video)
+            except Exception as e:
+                print(f"创建缩略图失败: {path}, {str(e)}")
+            if img is None:
+                failed = _mtime(path)
+        try:
+            self.canvas.after(0, self._on_thumbnail_loaded, generation, index, img, failed)
+        except RuntimeError:
+            # 主窗口已关闭
+            pass
+
+    def _on_thumbnail_loaded(self, generation, index, img, failed=_NOT_FAILED):
+        """界面线程：显示生成好的缩略图，记录生成失败的文件"""
+        if generation != self._generation:
+            return
+        self._pending.discard(index)
+        if img is None:
+            if failed is not _NOT_FAILED:
+                self._failed[self.paths[index]] = failed
+            return
+        photo = self._remember_photo(self.paths[index], ImageTk.PhotoImage(img))
+        cell = self._visible.get(index)
+        if cell is not None:
+            self.canvas.itemconfigure(cell.image, image=photo)
+
+    def _remember_photo(self, path, photo):
+        self._photos[path] = photo
+        self._photos.move_to_end(path)
+        while len(self._photos) > PHOTO_CACHE_SIZE:
+            self._photos.popitem(last=False)
+        return photo
+
+    def _get_video_placeholder(self):
+        """视频缩略图占位图（灰底白色播放图标）"""
+        if self._video_placeholder is None:
+            img = Image.new("RGB", (THUMB_AREA - 4, (THUMB_AREA - 4) * 3 // 4), "gray")
+            draw = ImageDraw.Draw(img)
+            cx, cy = img.width // 2, img.height // 2
+            draw.polygon([(cx - 12, cy - 15), (cx - 12, cy + 15), (cx + 15, cy)], fill="white")
+            self._video_placeholder = ImageTk.PhotoImage(img)
+        return self._video_placeholder
+
+    def shutdown(self):
+        """停止缩略图线程池"""
+        self._generation += 1
+        self._executor.shutdown(wait=False)
+
+    def _on_click(self, event):
+        index = int(self.canvas.canvasy(event.y) // CELL_HEIGHT)
+        if 0 <= index < len(self.paths):
+            self.on_select(index)
+
+    def _on_mousewheel(self, event):
+        self.canvas.yview_scroll(-1 if event.delta > 0 else 1, "units")
@@ -0,0 +1,153 @@
+"""
+深度缩放的分块渲染
+
+放大后的页面不再缩放成一整张位图，而是划分为固定大小的图块，只对覆盖
+可见区域（及外面一圈）的图块从原始图片中重采样。图块按 (路径, 缩放尺寸,
+列, 行) 缓存，缓存容量按视口大小计算，与缩放倍数无关。
+图块在线程池中生成，完成一块显示一块，滚动时取消已不需要的任务。
+"""
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+TILE_SIZE = 512
+TILE_MARGIN = 1  # 可见区域外额外准备的图块圈数
+
+
+class TileGrid:
+    """一页缩放到某个尺寸时的图块划分（只做计算，可在后台线程使用）"""
+
+    def __init__(self, image_size, size):
+        self.image_width, self.image_height = image_size
+        self.width, self.height = size
+        self.columns = max(math.ceil(self.width / TILE_SIZE), 1)
+        self.rows = max(math.ceil(self.height / TILE_SIZE), 1)
+
+    def tile_rect(self, column, row):
+        """图块在缩放后页面中的矩形 (x0, y0, x1, y1)"""
+        x0 = column * TILE_SIZE
+        y0 = row * TILE_SIZE
+        return x0, y0, min(x0 + TILE_SIZE, self.width), min(y0 + TILE_SIZE, self.height)
+
+    def source_box(self, column, row):
+        """图块对应的原始图片区域（浮点坐标，相邻图块之间没有缝隙）"""
+        x0, y0, x1, y1 = self.tile_rect(column, row)
+        scale_x = self.image_width / self.width
+        scale_y = self.image_height / self.height
+        return x0 * scale_x, y0 * scale_y, x1 * scale_x, y1 * scale_y
+
+    def tiles_in(self, left, top, right, bottom, margin=TILE_MARGIN):
+        """覆盖区域（加外圈）的图块，按到区域中心的距离排序，先生成可见的图块"""
+        first_column = max(int(left // TILE_SIZE) - margin, 0)
+        last_column = min(int(max(right - 1, 0) // TILE_SIZE) + margin, self.columns - 1)
+        first_row = max(int(top // TILE_SIZE) - margin, 0)
+        last_row = min(int(max(bottom - 1, 0) // TILE_SIZE) + margin, self.rows - 1)
+        center_x = (left + right) / 2 / TILE_SIZE - 0.5
+        center_y = (top + bottom) / 2 / TILE_SIZE - 0.5
+        tiles = [(column, row)
+                 for row in range(first_row, last_row + 1)
+                 for column in range(first_column, last_column + 1)]
+        tiles.sort(key=lambda tile: (tile[0] - center_x) ** 2 + (tile[1] - center_y) ** 2)
+        return tiles
+
+
+def render_tile(original, grid, tile):
+    """从原始图片重采样一个图块（相邻图块的源区域首尾相接，拼接后与整图缩放一致）"""
+    x0, y0, x1, y1 = grid.tile_rect(*tile)
+    return original.resize((x1 - x0, y1 - y0), Image.Resampling.LANCZOS, box=grid.source_box(*tile))
+
+
+class TileRenderer:
+    """在线程池中生成图块，并按视口大小缓存"""
+
+    def __init__(self, root, page_cache, workers=2):
+        self.root = root
+        self.page_cache = page_cache
+        self.max_tiles = 64
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile")
+        self._tiles = OrderedDict()  # (路径, 宽, 高, 列, 行) -> 图块
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._futures = []
+
+    @staticmethod
+    def _key(path, grid, tile):
+        return (path, grid.width, grid.height) + tuple(tile)
+
+    def set_viewport(self, width, height):
+        """按视口大小设置缓存容量：可见范围加外圈的图块数的两倍（来回滚动时可以复用）"""
+        columns = math.ceil(width / TILE_SIZE) + 1 + 2 * TILE_MARGIN
+        rows = math.ceil(height / TILE_SIZE) + 1 + 2 * TILE_MARGIN
+        with self._lock:
+            self.max_tiles = columns * rows * 2
+            self._evict_locked()
+
+    def get(self, path, grid, tile):
+        """已生成的图块，没有时返回None"""
+        key = self._key(path, grid, tile)
+        with self._lock:
+            img = self._tiles.get(key)
+            if img is not None:
+                self._tiles.move_to_end(key)
+            return img
+
+    def request(self, path, grid, tiles, on_ready):
+        """取消之前的请求，按顺序在后台生成图块
+
+        on_ready(path, grid, tile, image) 在界面线程中调用。
+        """
+        generation = self.cancel()
+        for tile in tiles:
+            self._futures.append(self._executor.submit(self._render, generation, path, grid, tile, on_ready))
+
+    def cancel(self):
+        """取消所有未开始的图块任务，返回新的代数"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        return generation
+
+    def _render(self, generation, path, grid, tile, on_ready):
+        """后台线程：从原始图片重采样一个图块"""
+        if generation != self._generation:
+            return
+        # 被取消前已经开始的同一图块可能刚刚生成好
+        img = self.get(path, grid, tile)
+        if img is None:
+            try:
+                img = render_tile(self.page_cache.get_original(path), grid, tile)
+            except Exception as e:
+                print(f"生成图块失败: {path}, {tile}, {str(e)}")
+                return
+            with self._lock:
+                self._tiles[self._key(path, grid, tile)] = img
+                self._evict_locked()
+
+        # 生成后即使请求已更换也交回界面线程，仍然可见的图块可以直接显示
+        try:
+            self.root.after(0, on_ready, path, grid, tile, img)
+        except RuntimeError:
+            # 主窗口已关闭
+            pass
+
+    def _evict_locked(self):
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+
+    def invalidate(self, path):
+        """丢弃某个文件的所有图块"""
+        with self._lock:
+            for key in [key for key in self._tiles if key[0] == path]:
+                del self._tiles[key]
+
+    def shutdown(self):
+        """停止图块线程池"""
+        self.cancel()
+        self._executor.shutdown(wait=False)
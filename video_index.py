@@ -0,0 +1,296 @@
+"""
+视频关键帧索引和拖动预览图
+
+OpenCV 按帧号或毫秒定位时要从前一个关键帧解码到目标位置，长视频（尤其是
+MKV）拖动进度条会很慢。每个视频在后台建立一次索引并保存到缓存目录：
+
+- 关键帧时间表：跳转时先定位到目标之前最近的关键帧（不需要向前解码），
+  再只抓取（不转换）到目标帧为止；
+- 预览图集（sprite sheet）：均匀选取的一百张小图拼成一张JPEG，拖动和
+  悬停时直接裁剪显示，不需要解码视频。
+
+安装了 PyAV 时只解复用数据包就能得到精确的关键帧时间，预览帧取自关键帧
+（每张只解码一帧）；没有 PyAV 时用 OpenCV 按固定间隔取预览帧，不记录
+关键帧，跳转交给 OpenCV 自己定位。
+索引记录视频的大小和修改时间，视频变化后重新生成。
+"""
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from cache_paths import cache_dir, library_key
+
+try:
+    import av
+except ImportError:
+    av = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+SPRITE_COUNT = 100  # 预览图数量上限
+SPRITE_WIDTH = 160  # 预览图宽度
+SPRITE_COLUMNS = 10  # 预览图集每行的图数
+MIN_SPRITE_INTERVAL = 1.0  # 预览图之间的最小间隔（秒），短视频少取几张
+
+
+def _discard(path):
+    """删除文件，不存在时忽略"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def format_time(seconds):
+    """把秒数格式化为 m:ss 或 h:mm:ss"""
+    seconds = max(int(seconds), 0)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class VideoIndex:
+    """一个视频的关键帧时间表和预览图集（只读）"""
+
+    def __init__(self, index, sheet):
+        self.source = index["source"]
+        self.duration = index["duration"]
+        self.fps = index["fps"]
+        self.keyframes = index["keyframes"]  # 关键帧时间（秒，升序）
+        self.exact = index["exact"]  # 关键帧时间是否来自数据包（没有PyAV时为False）
+        self.sprite_times = index["sprite_times"]  # 每张预览图的时间（秒，升序）
+        self.sprite_size = tuple(index["sprite_size"])
+        self.columns = index["columns"]
+        self.sheet = sheet
+
+    @staticmethod
+    def paths_for(source):
+        """视频对应的索引文件和预览图集路径"""
+        base = os.path.join(cache_dir("video_index"), library_key(source))
+        return base + ".json", base + ".jpg"
+
+    @classmethod
+    def open(cls, source):
+        """读取视频的索引，不存在或已失效时返回None（失效的文件会被删除）"""
+        index_path, sheet_path = cls.paths_for(source)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            st = os.stat(source)
+            current = index["source"] == source and (index["size"], index["mtime_ns"]) == (st.st_size, st.st_mtime_ns)
+            sheet = None
+            if current and index["sprite_times"]:
+                sheet = Image.open(sheet_path)
+                sheet.load()
+        except (OSError, KeyError) as e:
+            print(f"视频索引损坏: {index_path}, {str(e)}")
+            current = False
+        if not current:
+            cls.remove(source)
+            return None
+        return cls(index, sheet)
+
+    @classmethod
+    def remove(cls, source):
+        for path in cls.paths_for(source):
+            _discard(path)
+
+    @classmethod
+    def build(cls, source):
+        """扫描视频生成索引和预览图集并打开（在后台线程中调用）"""
+        st = os.stat(source)
+        if av is not None:
+            info, sprites = _scan_with_av(source)
+        elif cv2 is not None:
+            info, sprites = _scan_with_cv2(source)
+        else:
+            raise OSError("需要安装PyAV或OpenCV才能建立视频索引")
+
+        index_path, sheet_path = cls.paths_for(source)
+        sprite_times = [t for t, _ in sprites]
+        sprite_size = (0, 0)
+        if sprites:
+            first = sprites[0][1]
+            sprite_size = (SPRITE_WIDTH, max(round(SPRITE_WIDTH * first.height / first.width), 1))
+            rows = (len(sprites) + SPRITE_COLUMNS - 1) // SPRITE_COLUMNS
+            sheet = Image.new("RGB", (sprite_size[0] * min(len(sprites), SPRITE_COLUMNS), sprite_size[1] * rows))
+            for number, (_, img) in enumerate(sprites):
+                row, column = divmod(number, SPRITE_COLUMNS)
+                sheet.paste(img.convert("RGB").resize(sprite_size, Image.Resampling.BILINEAR),
+                            (column * sprite_size[0], row * sprite_size[1]))
+            try:
+                sheet.save(sheet_path + ".tmp", "JPEG", quality=80)
+            except BaseException:
+                # 写入失败时不留下临时文件
+                _discard(sheet_path + ".tmp")
+                raise
+            os.replace(sheet_path + ".tmp", sheet_path)
+
+        index = dict(info, source=source, size=st.st_size, mtime_ns=st.st_mtime_ns,
+                     sprite_times=sprite_times, sprite_size=sprite_size, columns=SPRITE_COLUMNS)
+        # 索引最后写入，预览图集写到一半时不会被当作有效
+        try:
+            with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+        except BaseException:
+            _discard(index_path + ".tmp")
+            raise
+        os.replace(index_path + ".tmp", index_path)
+        return cls.open(source)
+
+    def keyframe_before(self, seconds):
+        """不晚于指定时间的最近关键帧时间，没有精确索引时返回None"""
+        if not self.exact or not self.keyframes:
+            return None
+        position = bisect.bisect_right(self.keyframes, seconds + 1e-6) - 1
+        return self.keyframes[max(position, 0)]
+
+    def preview(self, seconds):
+        """最接近指定时间的预览图，返回 (图片, 预览图时间)，没有预览图时返回None"""
+        times = self.sprite_times
+        if not times or self.sheet is None:
+            return None
+        position = bisect.bisect_left(times, seconds)
+        if position == len(times) or (position > 0 and seconds - times[position - 1] < times[position] - seconds):
+            position -= 1
+        row, column = divmod(position, self.columns)
+        width, height = self.sprite_size
+        box = (column * width, row * height, (column + 1) * width, (row + 1) * height)
+        return self.sheet.crop(box), times[position]
+
+
+def _sprite_times(duration):
+    """均匀分布的预览时间（每段的中点）"""
+    if duration <= 0:
+        return [0.0]
+    count = max(min(SPRITE_COUNT, int(duration / MIN_SPRITE_INTERVAL)), 1)
+    return [(number + 0.5) * duration / count for number in range(count)]
+
+
+def _scan_with_av(source):
+    """用PyAV解复用得到关键帧时间，从关键帧中均匀选取预览帧"""
+    with av.open(source) as container:
+        stream = container.streams.video[0]
+        time_base = stream.time_base
+        start = float(stream.start_time * time_base) if stream.start_time is not None else 0.0
+        fps = float(stream.average_rate) if stream.average_rate else 30.0
+
+        keyframes = []
+        for packet in container.demux(stream):
+            if packet.pts is not None and packet.is_keyframe:
+                keyframes.append(float(packet.pts * time_base) - start)
+        keyframes.sort()
+        if stream.duration is not None:
+            duration = float(stream.duration * time_base)
+        elif container.duration is not None:
+            duration = container.duration / av.time_base
+        else:
+            duration = keyframes[-1] if keyframes else 0.0
+
+        # 每个预览时间取它之前的关键帧，定位后只解码一帧
+        chosen = []
+        for t in _sprite_times(duration):
+            position = max(bisect.bisect_right(keyframes, t) - 1, 0)
+            if keyframes and (not chosen or chosen[-1] != keyframes[position]):
+                chosen.append(keyframes[position])
+        sprites = []
+        for t in chosen:
+            container.seek(int((t + start) / time_base), stream=stream)
+            for frame in container.decode(stream):
+                img = frame.to_image()
+                img.thumbnail((SPRITE_WIDTH, SPRITE_WIDTH * 4), Image.Resampling.BILINEAR)
+                sprites.append((t, img))
+                break
+    info = {"duration": duration, "fps": fps, "keyframes": keyframes, "exact": True}
+    return info, sprites
+
+
+def _scan_with_cv2(source):
+    """没有PyAV时用OpenCV按时间定位取预览帧（不记录关键帧）"""
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        capture.release()
+        raise OSError(f"无法打开视频: {source}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        fps = fps if fps and fps > 0 else 30.0
+        count = capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        duration = count / fps if count > 0 else 0.0
+        sprites = []
+        for t in _sprite_times(duration):
+            capture.set(cv2.CAP_PROP_POS_MSEC, t * 1000)
+            ret, frame = capture.read()
+            if not ret:
+                continue
+            height, width = frame.shape[:2]
+            small = cv2.resize(frame, (SPRITE_WIDTH, max(round(SPRITE_WIDTH * height / width), 1)),
+                               interpolation=cv2.INTER_AREA)
+            sprites.append((t, Image.fromarray(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))))
+    finally:
+        capture.release()
+    info = {"duration": duration, "fps": fps, "keyframes": [], "exact": False}
+    return info, sprites
+
+
+class VideoIndexes:
+    """在后台读取或生成视频索引，最近用过的几个保留在内存中"""
+
+    def __init__(self, root, max_items=8):
+        self.root = root
+        self.max_items = max_items
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="video-index")
+        self._items = OrderedDict()  # 路径 -> VideoIndex
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """内存中的索引，没有时返回None"""
+        with self._lock:
+            index = self._items.get(path)
+            if index is not None:
+                self._items.move_to_end(path)
+            return index
+
+    def request(self, path, on_ready):
+        """在后台读取或生成索引，on_ready(path, index) 在界面线程中调用（失败时 index 为None）"""
+        with self._lock:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+        self._executor.submit(self._load, path, on_ready)
+
+    def _load(self, path, on_ready):
+        try:
+            index = VideoIndex.open(path) or VideoIndex.build(path)
+        except Exception as e:
+            print(f"建立视频索引失败: {path}, {str(e)}")
+            index = None
+        with self._lock:
+            self._pending.discard(path)
+            if index is not None:
+                self._items[path] = index
+                while len(self._items) > self.max_items:
+                    self._items.popitem(last=False)
+        try:
+            self.root.after(0, on_ready, path, index)
+        except RuntimeError:
+            # 主窗口已关闭
+            pass
+
+    def shutdown(self):
+        """停止索引线程"""
+        self._executor.shutdown(wait=False)
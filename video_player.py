@@ -0,0 +1,272 @@
+"""
+按时钟播放视频
+
+解码线程读取帧，用 cv2.resize 缩放到显示尺寸后放入有界队列；界面线程按
+单调时钟在每帧的显示时间取出并显示。处理跟不上时丢弃已经过时的帧：
+解码线程对落后超过一帧的帧只解码不转换，界面线程只显示到期帧中最新的一帧。
+不再按固定间隔 sleep，解码耗时不会累积成播放变慢。
+
+解码本身比实时慢时跳过转换也追不上，这时不再跳帧，每帧都显示，落后超过
+MAX_LAG 时把时钟重新对齐到当前帧（播放变慢但不卡顿）。
+
+跳转时队列中的帧按代数（epoch）作废。有视频关键帧索引时先定位到目标之前
+最近的关键帧，再只抓取不转换到目标帧；没有索引时由 OpenCV 自己定位。
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+from PIL import Image
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+CV2_AVAILABLE = cv2 is not None  # 没有OpenCV时无法播放视频
+
+_END = object()  # 队列中表示视频结束
+MAX_LAG = 0.25  # 落后超过这个秒数时重新对齐时钟
+
+
+class VideoPlayer:
+    """一次视频播放（停止后不能重新开始）"""
+
+    def __init__(self, root, video_path, on_frame, on_end, target_size, queue_size=4, start=0.0, index=None):
+        """
+        on_frame(image) 在界面线程中显示一帧（PIL图片，已缩放）；
+        on_end() 在界面线程中于播放结束或出错时调用；
+        target_size 为显示区域尺寸，帧等比缩小到不超过该尺寸（不放大）；
+        start 为开始播放的时间（秒），index 为视频关键帧索引（VideoIndex，可以稍后设置）。
+        """
+        self.root = root
+        self.on_frame = on_frame
+        self.on_end = on_end
+        self.target_size = target_size  # 界面线程可以随时修改
+
+        self._capture = cv2.VideoCapture(video_path)
+        if not self._capture.isOpened():
+            self._capture.release()
+            raise OSError(f"无法打开视频: {video_path}")
+        fps = self._capture.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 30.0
+        count = self._capture.get(cv2.CAP_PROP_FRAME_COUNT)
+        self.duration = count / self.fps if count and count > 0 else 0.0
+        self.index = index
+        self.position = start  # 当前显示帧的时间（秒）
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopped = threading.Event()
+        self._clock_start = None  # 第0帧的单调时钟时间
+        self._next = None  # 已从队列取出、尚未到期的帧
+        self._after_id = None
+
+        # 跳转请求由界面线程设置，解码线程取走
+        self._epoch = 0
+        self._seek_request = (0, start) if start > 0 else None
+        self._seek_lock = threading.Lock()
+        self._seek_event = threading.Event()  # 有跳转请求或已停止
+
+        # 统计
+        self.presented = 0
+        self.dropped_late = 0  # 界面线程丢弃的帧
+        self.skipped = 0  # 解码线程跳过转换的帧
+        self.resyncs = 0  # 重新对齐时钟的次数
+        self._present_times = deque(maxlen=120)
+
+        self._thread = threading.Thread(target=self._decode, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self._after_id = self.root.after(1, self._present)
+
+    def stop(self):
+        """停止播放（可以重复调用），不再调用 on_frame / on_end"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._seek_event.set()
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def seek(self, seconds):
+        """跳转到指定时间（界面线程），之前解码的帧全部作废"""
+        if self._stopped.is_set() or not self._thread.is_alive():
+            # 解码线程出错退出后不再跳转，让已放入的结束标记照常结束播放
+            return
+        seconds = max(seconds, 0.0)
+        with self._seek_lock:
+            self._epoch += 1
+            self._seek_request = (self._epoch, seconds)
+            self._seek_event.set()
+        self._next = None
+        self._clock_start = None
+        self.position = seconds
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    @property
+    def dropped(self):
+        return self.dropped_late + self.skipped
+
+    def effective_fps(self):
+        """最近一秒实际显示的帧率"""
+        times = self._present_times
+        if len(times) < 2:
+            return 0.0
+        now = time.monotonic()
+        recent = [t for t in times if now - t <= 1.0]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / (recent[-1] - recent[0]) if recent[-1] > recent[0] else 0.0
+
+    def _elapsed(self):
+        start = self._clock_start
+        return None if start is None else time.monotonic() - start
+
+    # 解码线程
+
+    def _decode(self):
+        capture = self._capture
+        frame_time = 1.0 / self.fps
+        grab_time = 0.0  # 解码一帧的平均耗时
+        epoch = 0
+        index = 0
+        try:
+            while not self._stopped.is_set():
+                request = self._take_seek()
+                if request is not None:
+                    epoch, target = request
+                    index = self._seek_capture(target)
+                    continue
+                started = time.monotonic()
+                if not capture.grab():
+                    self._wait_at_end(epoch)
+                    continue
+                grab_time = grab_time * 0.9 + (time.monotonic() - started) * 0.1
+                pts = index * frame_time
+                index += 1
+                # 已经落后一帧以上的帧不转换不缩放，直接丢弃（只有解码比实时快时才追得上）
+                elapsed = self._elapsed()
+                if elapsed is not None and pts < elapsed - frame_time and grab_time < frame_time:
+                    self.skipped += 1
+                    continue
+                ret, frame = capture.retrieve()
+                if not ret:
+                    self._wait_at_end(epoch)
+                    continue
+                self._put((epoch, pts, self._convert(frame)))
+        except Exception as e:
+            print(f"视频解码失败: {str(e)}")
+            self._put((epoch, None, _END))
+        finally:
+            capture.release()
+
+    def _wait_at_end(self, epoch):
+        """放入结束标记，然后等待跳转或停止（跳转请求可能在结束标记显示之前到达）"""
+        self._put((epoch, None, _END))
+        self._seek_event.wait()
+
+    def _take_seek(self):
+        with self._seek_lock:
+            request = self._seek_request
+            self._seek_request = None
+            if not self._stopped.is_set():
+                self._seek_event.clear()
+            return request
+
+    def _seek_capture(self, target):
+        """定位到目标时间，返回下一次 grab 得到的帧号"""
+        capture = self._capture
+        target_index = int(target * self.fps)
+        index = self.index
+        keyframe = index.keyframe_before(target) if index is not None else None
+        if keyframe is None:
+            # 没有关键帧索引，由 OpenCV 定位（从前一个关键帧解码到目标）
+            capture.set(cv2.CAP_PROP_POS_MSEC, target * 1000)
+            position = capture.get(cv2.CAP_PROP_POS_FRAMES)
+            return int(position) if position and position > 0 else target_index
+        # 定位到关键帧不需要向前解码，之后只抓取不转换，到目标帧为止
+        capture.set(cv2.CAP_PROP_POS_MSEC, keyframe * 1000)
+        frame_index = int(round(keyframe * self.fps))
+        while frame_index < target_index and not self._stopped.is_set() and self._seek_request is None:
+            if not capture.grab():
+                break
+            frame_index += 1
+        return frame_index
+
+    def _convert(self, frame):
+        """缩放（只缩小）并转换为RGB的PIL图片"""
+        height, width = frame.shape[:2]
+        target_width, target_height = self.target_size
+        if target_width > 1 and target_height > 1:
+            scale = min(target_width / width, target_height / height, 1.0)
+            size = (max(int(width * scale), 1), max(int(height * scale), 1))
+            if size != (width, height):
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    def _put(self, item):
+        """放入队列，队列满时等待，停止后放弃"""
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    # 界面线程
+
+    def _present(self):
+        """显示已到期帧中最新的一帧，安排下一次检查"""
+        self._after_id = None
+        if self._stopped.is_set():
+            return
+
+        frame = None
+        delay = 5  # 队列为空（解码落后）时的轮询间隔
+        while True:
+            if self._next is None:
+                try:
+                    self._next = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            epoch, pts, img = self._next
+            if epoch != self._epoch:
+                # 跳转之前解码的帧
+                self._next = None
+                continue
+            if img is _END:
+                if frame is None:
+                    self.stop()
+                    self.on_end()
+                    return
+                delay = 1
+                break
+            if self._clock_start is None:
+                # 第一帧到达时开始计时
+                self._clock_start = time.monotonic() - pts
+            wait = pts - self._elapsed()
+            if wait > 0:
+                delay = max(int(wait * 1000), 1)
+                break
+            if frame is not None:
+                self.dropped_late += 1
+            frame, lag = img, -wait
+            self.position = pts
+            self._next = None
+
+        if frame is not None:
+            if lag > MAX_LAG:
+                self._clock_start += lag
+                self.resyncs += 1
+            self.presented += 1
+            self._present_times.append(time.monotonic())
+            self.on_frame(frame)
+        if not self._stopped.is_set():
+            self._after_id = self.root.after(delay, self._present)